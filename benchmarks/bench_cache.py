@@ -0,0 +1,86 @@
+"""
+Eviction policy benchmark for the provider cache
+Replays a synthetic dashboard access trace (Zipf-popular symbols, quotes of ~1 KB,
+statements of ~8 KB, price histories of ~200 KB, plus periodic universe-wide screener
+scans) through TTLCache under each policy and a fixed byte budget
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# (endpoint, approximate bytes, share of page accesses)
+ENDPOINTS = (("quote", 1_000, 0.35), ("key-metrics-ttm", 2_500, 0.15), ("ratios-ttm", 2_000, 0.15),
+             ("income-statement", 8_000, 0.1), ("cash-flow-statement", 8_000, 0.1),
+             ("historical-price-full", 200_000, 0.15))
+
+
+def make_trace(n_accesses, n_symbols=2_000, zipf_s=1.1, scan_every=5_000, scan_size=500, seed=0):
+    """List of (key, size) accesses"""
+    rng = random.Random(seed)
+    weights = [1 / (rank ** zipf_s) for rank in range(1, n_symbols + 1)]
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    names = [e[0] for e in ENDPOINTS]
+    sizes = {e[0]: e[1] for e in ENDPOINTS}
+    shares = [e[2] for e in ENDPOINTS]
+    picks = rng.choices(symbols, weights, k=n_accesses)
+    endpoints = rng.choices(names, shares, k=n_accesses)
+    trace = []
+    scan_start = 0
+    for i, (symbol, endpoint) in enumerate(zip(picks, endpoints)):
+        trace.append(((endpoint, symbol), sizes[endpoint]))
+        if scan_every and i and i % scan_every == 0:
+            # A screener run touches quotes for a whole universe once
+            for j in range(scan_size):
+                trace.append((("quote", symbols[(scan_start + j) % n_symbols]), sizes["quote"]))
+            scan_start += scan_size
+    return trace
+
+
+def replay(trace, policy, max_bytes):
+    from provider.cache import TTLCache
+
+    cache = TTLCache(max_bytes=max_bytes, policy=policy)
+    hit_bytes = total_bytes = 0
+    started = time.perf_counter()
+    for key, size in trace:
+        total_bytes += size
+        if cache.get(key) is not None:
+            hit_bytes += size
+        else:
+            cache.set(key, True, 3600, size=size)
+    elapsed = time.perf_counter() - started
+    stats = cache.stats()
+    stats["byte_hit_rate"] = hit_bytes / total_bytes if total_bytes else 0.0
+    stats["us_per_access"] = elapsed / len(trace) * 1e6
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cache eviction policies on a synthetic trace")
+    parser.add_argument("-n", "--accesses", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=2_000)
+    parser.add_argument("--budget-mb", type=float, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--policies", default="lru,lfu,tinylfu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    trace = make_trace(args.accesses, args.symbols, seed=args.seed)
+    print(f"{len(trace)} accesses over {args.symbols} symbols")
+    print(f"{'budget':>8} {'policy':<8} {'hit rate':>9} {'byte hits':>10} {'entries':>8} {'evictions':>10} "
+          f"{'us/access':>10}")
+    for budget in args.budget_mb:
+        for policy in args.policies.split(","):
+            stats = replay(trace, policy.strip(), int(budget * 1024 * 1024))
+            print(f"{budget:>6g}MB {stats['policy']:<8} {stats['hit_rate']:>8.1%} {stats['byte_hit_rate']:>9.1%} "
+                  f"{stats['entries']:>8} {stats['evictions']:>10} {stats['us_per_access']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
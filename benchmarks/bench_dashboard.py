@@ -0,0 +1,166 @@
+"""
+End-to-end benchmark for the Flask dashboard
+Drives full page loads against a local FMP stand-in (the index() HTML plus the chart and
+backtest requests the page makes after it renders) and reports latency percentiles,
+throughput and upstream call counts
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_fmp import FakeFMPServer
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def load_dashboard(base_url, rate_limit=0):
+    """Import the dashboard module pointed at the given FMP base URL"""
+    os.environ["FMP_BASE_URL"] = base_url
+    os.environ["FMP_MAX_CALLS_PER_MINUTE"] = str(rate_limit)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    import stock_dashboard
+    return stock_dashboard
+
+
+def run_benchmark(requests_count=50, concurrency=4, symbols=("AAPL",), latency_ms=50.0,
+                  jitter_ms=10.0, error_rate=0.0, warmup=1, seed=0, verbose=False, cold=False,
+                  rate_limit=0, slow_endpoints=None):
+    """Run the end-to-end benchmark and return a results dict"""
+    with FakeFMPServer(latency_ms, jitter_ms, error_rate, seed=seed, slow_endpoints=slow_endpoints) as fake:
+        dashboard = load_dashboard(fake.base_url, rate_limit)
+        from provider import get_provider
+        local = threading.local()
+
+        def one_request(i):
+            if not hasattr(local, "client"):
+                local.client = dashboard.app.test_client()
+            if cold:
+                get_provider().cache.clear()
+            symbol = symbols[i % len(symbols)]
+            form = {"api_key": "bench", "symbol": symbol}
+            started = time.perf_counter()
+            statuses = [local.client.post("/", data=form).status_code]
+            first_paint = time.perf_counter() - started
+            # What the page requests once rendered (the browser issues these in parallel)
+            for kind in ("price", "trend"):
+                statuses.append(local.client.post("/api/chart", data=dict(form, kind=kind)).status_code)
+            statuses.append(local.client.post("/api/backtest", data=form).status_code)
+            elapsed = time.perf_counter() - started
+            return elapsed, first_paint, next((status for status in statuses if status != 200), 200)
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            for i in range(warmup):
+                one_request(i)
+            fake.reset_counters()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(one_request, range(requests_count)))
+            wall = time.perf_counter() - started
+
+        latencies = [elapsed * 1000 for elapsed, _, _ in results]
+        first_paints = [first_paint * 1000 for _, first_paint, _ in results]
+        failures = sum(1 for _, _, status in results if status != 200)
+        upstream = dict(fake.calls)
+        upstream_total = sum(upstream.values())
+        return {
+            "requests": requests_count,
+            "concurrency": concurrency,
+            "symbols": list(symbols),
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies) if latencies else 0.0,
+            "first_paint_p50_ms": percentile(first_paints, 50),
+            "first_paint_p95_ms": percentile(first_paints, 95),
+            "throughput_rps": requests_count / wall if wall > 0 else 0.0,
+            "wall_s": wall,
+            "failed_requests": failures,
+            "upstream_calls": upstream_total,
+            "upstream_calls_per_request": upstream_total / requests_count if requests_count else 0.0,
+            "upstream_by_endpoint": upstream,
+            "upstream_errors": dict(fake.errors),
+            "cache": get_provider().cache.stats(),
+            "breakers": get_provider().stats()["breakers"],
+        }
+
+
+def print_report(results):
+    """Human readable summary of a benchmark run"""
+    print("Dashboard end-to-end benchmark")
+    print(f"  requests={results['requests']} concurrency={results['concurrency']} "
+          f"symbols={','.join(results['symbols'])}")
+    print(f"  upstream latency={results['latency_ms']}ms jitter=±{results['jitter_ms']}ms "
+          f"error_rate={results['error_rate']:.1%}")
+    print(f"  p50={results['p50_ms']:.1f}ms p95={results['p95_ms']:.1f}ms "
+          f"p99={results['p99_ms']:.1f}ms max={results['max_ms']:.1f}ms (full page)")
+    print(f"  first paint (HTML only) p50={results['first_paint_p50_ms']:.1f}ms "
+          f"p95={results['first_paint_p95_ms']:.1f}ms")
+    print(f"  throughput={results['throughput_rps']:.2f} req/s wall={results['wall_s']:.2f}s "
+          f"failed={results['failed_requests']}")
+    tripped = {endpoint: state for endpoint, state in results["breakers"].items() if state != "closed"}
+    if tripped:
+        print("  breakers: " + ", ".join(f"{endpoint}={state}" for endpoint, state in sorted(tripped.items())))
+    cache = results["cache"]
+    print(f"  cache hit rate={cache['hit_rate']:.1%} entries={cache['entries']} "
+          f"size={cache['bytes'] / 1024:.0f}KB/{cache['max_bytes'] / 1024 / 1024:g}MB policy={cache['policy']} "
+          f"evictions={cache['evictions']}")
+    print(f"  upstream calls={results['upstream_calls']} "
+          f"({results['upstream_calls_per_request']:.2f} per page)")
+    for endpoint, count in sorted(results["upstream_by_endpoint"].items()):
+        errors = results["upstream_errors"].get(endpoint, 0)
+        print(f"    {endpoint:<28} {count:>6}" + (f"  ({errors} injected errors)" if errors else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against a local FMP stand-in")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="number of page loads")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--symbols", default="AAPL,MSFT,GOOGL,AMZN,NVDA", help="comma separated tickers")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="upstream latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="uniform latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls failing")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed warmup page loads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cold", action="store_true", help="clear the provider cache before every page load")
+    parser.add_argument("--rate-limit", type=float, default=0, help="upstream calls per minute (0 = unlimited)")
+    parser.add_argument("--slow", action="append", default=[], metavar="ENDPOINT=MS",
+                        help="degrade one upstream endpoint by this much extra latency (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show dashboard output")
+    args = parser.parse_args(argv)
+
+    symbols = tuple(s.strip().upper() for s in args.symbols.split(",") if s.strip())
+    slow = {name: float(ms) for name, ms in (item.split("=", 1) for item in args.slow)}
+    results = run_benchmark(args.requests, args.concurrency, symbols, args.latency_ms,
+                            args.jitter_ms, args.error_rate, args.warmup, args.seed, args.verbose,
+                            args.cold, args.rate_limit, slow)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Microbenchmarks for the indicator and valuation kernels
+Times calculate_bollinger_bands, calculate_ema, calculate_linear_regression,
+calculate_trend_line and calculate_dcf_valuation on synthetic data, records peak
+memory, and compares against a stored baseline so regressions fail loudly
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kernel_baseline.json")
+
+SERIES_SIZES = [250, 1_000, 10_000, 100_000, 1_000_000]
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+QUICK_SERIES_SIZES = [250, 1_000, 10_000]
+QUICK_BATCH_SIZES = [1, 10, 100]
+BATCH_BARS = 250
+
+
+def load_kernels():
+    """Import the dashboard module holding the kernels"""
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    import stock_dashboard
+    return stock_dashboard
+
+
+def synthetic_series(n_bars, seed=0):
+    """Random-walk closes with matching ISO date strings"""
+    rng = random.Random(seed)
+    closes = []
+    price = 100.0
+    for _ in range(n_bars):
+        price = max(price * (1 + rng.gauss(0.0003, 0.015)), 0.5)
+        closes.append(price)
+    start = datetime(1970, 1, 1)
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_bars)]
+    return closes, dates
+
+
+def synthetic_fundamentals(seed=0):
+    """Statement, growth and quote inputs for calculate_dcf_valuation"""
+    rng = random.Random(seed)
+    revenue = rng.uniform(5e9, 4e11)
+    fcf = revenue * rng.uniform(0.05, 0.25)
+    shares = rng.uniform(2e8, 1.6e10)
+    cash_flow = [{"freeCashFlow": fcf * (0.9 ** i)} for i in range(5)]
+    income = [{"revenue": revenue * (0.92 ** i)} for i in range(5)]
+    balance = [{"totalDebt": revenue * 0.3, "cashAndCashEquivalents": revenue * 0.1} for _ in range(5)]
+    growth = {"revenueGrowth": rng.uniform(-0.05, 0.3)}
+    quote = {"sharesOutstanding": shares, "marketCap": shares * 150.0, "price": 150.0}
+    return cash_flow, income, balance, growth, quote
+
+
+def series_cases(kernels, closes, dates):
+    """Kernel callables for one price series"""
+    return {
+        "bollinger": lambda: kernels.calculate_bollinger_bands(closes),
+        "ema": lambda: kernels.calculate_ema(closes, 20),
+        "linear_regression": lambda: kernels.calculate_linear_regression(closes, dates),
+        "trend_line": lambda: kernels.calculate_trend_line(closes, dates),
+    }
+
+
+def measure(func, repeat):
+    """Best wall time over repeats plus peak traced memory of one extra run"""
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_kernels(series_sizes, batch_sizes, repeat=3, verbose=True):
+    """Benchmark every kernel and return {case name: {seconds, peak_bytes}}"""
+    kernels = load_kernels()
+    results = {}
+
+    def record(name, seconds, peak):
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+        if verbose:
+            print(f"  {name:<40} {seconds * 1000:>12.3f} ms {peak / 1024 / 1024:>10.2f} MiB")
+
+    # Single long series per kernel
+    for n_bars in series_sizes:
+        closes, dates = synthetic_series(n_bars)
+        runs = repeat if n_bars <= 100_000 else 1
+        for kernel, func in series_cases(kernels, closes, dates).items():
+            record(f"series/{kernel}/{n_bars}", *measure(func, runs))
+
+    # Many symbols with one year of bars each (DCF is per symbol, so it only appears here)
+    for n_symbols in batch_sizes:
+        batch = [synthetic_series(BATCH_BARS, seed) for seed in range(n_symbols)]
+        fundamentals = [synthetic_fundamentals(seed) for seed in range(n_symbols)]
+        runs = repeat if n_symbols <= 1_000 else 1
+        for kernel in ("bollinger", "ema", "linear_regression", "trend_line"):
+            cases = [series_cases(kernels, closes, dates)[kernel] for closes, dates in batch]
+            record(f"batch/{kernel}/{n_symbols}", *measure(lambda: [case() for case in cases], runs))
+        record(f"batch/dcf/{n_symbols}",
+               *measure(lambda: [kernels.calculate_dcf_valuation(*f) for f in fundamentals], runs))
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Return regression messages for cases slower or larger than the baseline allows"""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        # Ignore sub-millisecond noise when judging time regressions
+        if current["seconds"] > max(reference["seconds"], 1e-3) * time_tolerance:
+            regressions.append(f"{name}: {current['seconds'] * 1000:.3f} ms vs baseline "
+                               f"{reference['seconds'] * 1000:.3f} ms")
+        if current["peak_bytes"] > max(reference["peak_bytes"], 64 * 1024) * memory_tolerance:
+            regressions.append(f"{name}: {current['peak_bytes'] / 1024:.0f} KiB peak vs baseline "
+                               f"{reference['peak_bytes'] / 1024:.0f} KiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark the indicator and valuation kernels")
+    parser.add_argument("--quick", action="store_true", help="small sizes only (250-10k bars, 1-100 symbols)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repeats per case (best is kept)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=1.5, help="allowed slowdown factor")
+    parser.add_argument("--memory-tolerance", type=float, default=1.25, help="allowed peak memory growth factor")
+    args = parser.parse_args(argv)
+
+    series_sizes = QUICK_SERIES_SIZES if args.quick else SERIES_SIZES
+    batch_sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    print("Kernel microbenchmarks (best time, peak memory)")
+    results = run_kernels(series_sizes, batch_sizes, args.repeat)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"REGRESSIONS ({len(regressions)}):")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Price history parsing benchmark
+Decodes synthetic historical-price-full payloads (same shape as FMP, 13 fields per row)
+the old way (json.loads into row dicts, then columns picked out) and through
+jsonstream's field-projected streaming parser, reporting time and peak traced memory
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from fake_fmp import make_historical_price_full
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def whole_json(payload):
+    """The previous path: every row as a dict, then one list comprehension per column"""
+    rows = json.loads(payload)["historical"][::-1]
+    series = {"dates": np.array([row["date"][:10] for row in rows], dtype="datetime64[D]")}
+    for field in FIELDS:
+        series[field] = np.array([row.get(field) or 0.0 for row in rows], dtype=np.float64)
+    return series
+
+
+def measure(parse, payloads, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            parse(payload)
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    results = [parse(payload) for payload in payloads]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare whole-body and streamed price history parsing")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    from jsonstream import DECODER, stream_columns
+
+    end = datetime.now()
+    start = end - timedelta(days=365 * args.years)
+    payloads = [json.dumps(make_historical_price_full(f"SYM{i}", start, end)).encode()
+                for i in range(args.symbols)]
+    chunk = args.chunk_kb * 1024
+    capacity = (end - start).days + 1
+
+    def streamed(payload):
+        chunks = (payload[i:i + chunk] for i in range(0, len(payload), chunk))
+        return stream_columns(chunks, FIELDS, capacity)
+
+    total_mb = sum(len(p) for p in payloads) / 1024 / 1024
+    print(f"{args.symbols} payloads x {args.years}y daily, {total_mb:.1f} MB of JSON, decoder={DECODER}")
+    baseline = None
+    for name, parse in (("json.loads + columns", whole_json), (f"streamed ({DECODER})", streamed)):
+        elapsed, peak, results = measure(parse, payloads, args.repeat)
+        if baseline is None:
+            baseline = results
+        else:
+            same = all(np.array_equal(a[k], b[k]) for a, b in zip(baseline, results) for k in a)
+            name += "" if same else " MISMATCH"
+        print(f"  {name:<24} {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
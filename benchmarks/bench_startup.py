@@ -0,0 +1,93 @@
+"""
+Startup benchmark for the Flask dashboard
+Starts fresh interpreters and times the dashboard import and the first served page
+(import-to-ready), the cost a new or restarted worker pays before taking traffic.
+--top lists the slowest imports from python -X importtime
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import stock_dashboard
+imported = time.perf_counter()
+response = stock_dashboard.app.test_client().get("/")
+ready = time.perf_counter()
+heavy = sorted({name.split(".")[0] for name in sys.modules} & {"pandas", "pyarrow", "scipy", "matplotlib"})
+print(json.dumps({"import_ms": (imported - started) * 1000, "ready_ms": (ready - started) * 1000,
+                  "status": response.status_code, "heavy": heavy}))
+"""
+
+
+def run_child(env):
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=SRC_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def interpreter_ms(env, runs):
+    """Median wall time of a bare interpreter, for reference"""
+    script = "import time, subprocess, sys; t = time.perf_counter(); " \
+             "subprocess.run([sys.executable, '-c', 'pass']); print((time.perf_counter() - t) * 1000)"
+    return statistics.median(float(subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                                                  capture_output=True, text=True).stdout) for _ in range(runs))
+
+
+def slowest_imports(env, top):
+    """(cumulative ms, module) for the slowest top-level imports under stock_dashboard"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import stock_dashboard"], cwd=SRC_DIR,
+                            env=env, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            rows.append((int(parts[1]) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure dashboard import-to-ready time in fresh interpreters")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, FMP_MAX_CALLS_PER_MINUTE=os.environ.get("FMP_MAX_CALLS_PER_MINUTE", "0"))
+    samples = [run_child(env) for _ in range(args.runs)]
+    results = {
+        "runs": args.runs,
+        "interpreter_ms": interpreter_ms(env, args.runs),
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "ready_ms": statistics.median(s["ready_ms"] for s in samples),
+        "ready_min_ms": min(s["ready_ms"] for s in samples),
+        "heavy_modules": samples[0]["heavy"],
+        "status": samples[0]["status"],
+    }
+    if args.top:
+        results["slowest_imports"] = slowest_imports(env, args.top)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("Dashboard startup (median of fresh interpreters)")
+    print(f"  runs={results['runs']} bare interpreter={results['interpreter_ms']:.0f}ms")
+    print(f"  import={results['import_ms']:.0f}ms ready (import + first page)={results['ready_ms']:.0f}ms "
+          f"(min {results['ready_min_ms']:.0f}ms) status={results['status']}")
+    print(f"  heavy modules loaded: {', '.join(results['heavy_modules']) or 'none'}")
+    for ms, name in results.get("slowest_imports", []):
+        print(f"  {ms:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+Local stand-in for the Financial Modeling Prep API
+Serves realistic payloads with configurable latency, jitter and error injection
+"""
+
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _symbol_rng(symbol, salt=""):
+    """Deterministic random generator per symbol so payloads are reproducible"""
+    return random.Random(zlib.crc32(f"{symbol}:{salt}".encode()))
+
+
+def _base_price(symbol):
+    """Stable starting price for a symbol"""
+    return 20 + _symbol_rng(symbol, "price").random() * 480
+
+
+def make_quote(symbol):
+    """Quote payload entry"""
+    rng = _symbol_rng(symbol, "quote")
+    price = round(_base_price(symbol) * (1 + rng.uniform(-0.05, 0.05)), 2)
+    previous_close = round(price * (1 + rng.uniform(-0.03, 0.03)), 2)
+    shares = rng.randint(200_000_000, 16_000_000_000)
+    change = round(price - previous_close, 2)
+    return {
+        "symbol": symbol,
+        "name": f"{symbol} Holdings Inc.",
+        "price": price,
+        "changesPercentage": round(change / previous_close * 100, 4),
+        "change": change,
+        "dayLow": round(price * 0.98, 2),
+        "dayHigh": round(price * 1.02, 2),
+        "yearHigh": round(price * 1.35, 2),
+        "yearLow": round(price * 0.7, 2),
+        "marketCap": int(price * shares),
+        "priceAvg50": round(price * 0.97, 2),
+        "priceAvg200": round(price * 0.92, 2),
+        "exchange": "NASDAQ",
+        "volume": rng.randint(1_000_000, 90_000_000),
+        "avgVolume": rng.randint(1_000_000, 90_000_000),
+        "open": round(previous_close * 1.002, 2),
+        "previousClose": previous_close,
+        "eps": round(price / rng.uniform(12, 40), 2),
+        "pe": round(rng.uniform(12, 40), 2),
+        "earningsAnnouncement": "2025-01-30T21:30:00.000+0000",
+        "sharesOutstanding": shares,
+        "timestamp": int(time.time()),
+    }
+
+
+def make_key_metrics_ttm(symbol):
+    """Key metrics TTM payload entry"""
+    rng = _symbol_rng(symbol, "metrics")
+    keys = [
+        "revenuePerShareTTM", "netIncomePerShareTTM", "operatingCashFlowPerShareTTM",
+        "freeCashFlowPerShareTTM", "cashPerShareTTM", "bookValuePerShareTTM",
+        "tangibleBookValuePerShareTTM", "shareholdersEquityPerShareTTM", "interestDebtPerShareTTM",
+        "marketCapTTM", "enterpriseValueTTM", "peRatioTTM", "priceToSalesRatioTTM", "pocfratioTTM",
+        "pfcfRatioTTM", "pbRatioTTM", "ptbRatioTTM", "evToSalesTTM", "enterpriseValueOverEBITDATTM",
+        "evToOperatingCashFlowTTM", "evToFreeCashFlowTTM", "earningsYieldTTM", "freeCashFlowYieldTTM",
+        "debtToEquityTTM", "debtToAssetsTTM", "netDebtToEBITDATTM", "currentRatioTTM",
+        "interestCoverageTTM", "incomeQualityTTM", "dividendYieldTTM", "payoutRatioTTM",
+        "salesGeneralAndAdministrativeToRevenueTTM", "researchAndDevelopementToRevenueTTM",
+        "intangiblesToTotalAssetsTTM", "capexToOperatingCashFlowTTM", "capexToRevenueTTM",
+        "capexToDepreciationTTM", "stockBasedCompensationToRevenueTTM", "grahamNumberTTM",
+        "roicTTM", "returnOnTangibleAssetsTTM", "grahamNetNetTTM", "workingCapitalTTM",
+        "tangibleAssetValueTTM", "netCurrentAssetValueTTM", "investedCapitalTTM",
+        "averageReceivablesTTM", "averagePayablesTTM", "averageInventoryTTM",
+        "daysSalesOutstandingTTM", "daysPayablesOutstandingTTM", "daysOfInventoryOnHandTTM",
+        "receivablesTurnoverTTM", "payablesTurnoverTTM", "inventoryTurnoverTTM", "roeTTM",
+        "capexPerShareTTM", "dividendPerShareTTM", "debtToMarketCapTTM", "pegRatioTTM",
+        "roaTTM", "psRatioTTM", "evToSales", "numberOfSharesTTM",
+    ]
+    data = {key: round(rng.uniform(0.01, 40), 4) for key in keys}
+    data["numberOfSharesTTM"] = make_quote(symbol)["sharesOutstanding"]
+    return data
+
+
+def make_ratios_ttm(symbol):
+    """Financial ratios TTM payload entry"""
+    rng = _symbol_rng(symbol, "ratios")
+    keys = [
+        "dividendYielTTM", "dividendYielPercentageTTM", "peRatioTTM", "pegRatioTTM", "payoutRatioTTM",
+        "currentRatioTTM", "quickRatioTTM", "cashRatioTTM", "daysOfSalesOutstandingTTM",
+        "daysOfInventoryOutstandingTTM", "operatingCycleTTM", "daysOfPayablesOutstandingTTM",
+        "cashConversionCycleTTM", "grossProfitMarginTTM", "operatingProfitMarginTTM",
+        "pretaxProfitMarginTTM", "netProfitMarginTTM", "effectiveTaxRateTTM", "returnOnAssetsTTM",
+        "returnOnEquityTTM", "returnOnCapitalEmployedTTM", "netIncomePerEBTTTM", "ebtPerEbitTTM",
+        "ebitPerRevenueTTM", "debtRatioTTM", "debtEquityRatioTTM", "longTermDebtToCapitalizationTTM",
+        "totalDebtToCapitalizationTTM", "interestCoverageTTM", "cashFlowToDebtRatioTTM",
+        "companyEquityMultiplierTTM", "receivablesTurnoverTTM", "payablesTurnoverTTM",
+        "inventoryTurnoverTTM", "fixedAssetTurnoverTTM", "assetTurnoverTTM",
+        "operatingCashFlowPerShareTTM", "freeCashFlowPerShareTTM", "cashPerShareTTM",
+        "operatingCashFlowSalesRatioTTM", "freeCashFlowOperatingCashFlowRatioTTM",
+        "cashFlowCoverageRatiosTTM", "shortTermCoverageRatiosTTM", "capitalExpenditureCoverageRatioTTM",
+        "dividendPaidAndCapexCoverageRatioTTM", "priceBookValueRatioTTM", "priceToBookRatioTTM",
+        "priceToSalesRatioTTM", "priceEarningsRatioTTM", "priceToFreeCashFlowsRatioTTM",
+        "priceToOperatingCashFlowsRatioTTM", "priceCashFlowRatioTTM", "priceEarningsToGrowthRatioTTM",
+        "priceSalesRatioTTM", "enterpriseValueMultipleTTM", "priceFairValueTTM",
+        "returnOnTangibleAssetsTTM", "timesInterestEarnedTTM", "totalAssetsTurnoverTTM",
+    ]
+    data = {key: round(rng.uniform(0.01, 3), 4) for key in keys}
+    for key in ("daysOfSalesOutstandingTTM", "daysOfInventoryOutstandingTTM", "daysOfPayablesOutstandingTTM"):
+        data[key] = round(rng.uniform(10, 120), 2)
+    return data
+
+
+def make_financial_growth(symbol, limit):
+    """Financial growth payload (most recent year first)"""
+    rng = _symbol_rng(symbol, "growth")
+    keys = [
+        "revenueGrowth", "grossProfitGrowth", "ebitgrowth", "operatingIncomeGrowth", "netIncomeGrowth",
+        "epsgrowth", "epsdilutedGrowth", "weightedAverageSharesGrowth", "dividendsperShareGrowth",
+        "operatingCashFlowGrowth", "freeCashFlowGrowth", "tenYRevenueGrowthPerShare",
+        "fiveYRevenueGrowthPerShare", "threeYRevenueGrowthPerShare", "receivablesGrowth",
+        "inventoryGrowth", "assetGrowth", "bookValueperShareGrowth", "debtGrowth", "rdexpenseGrowth",
+        "sgaexpensesGrowth",
+    ]
+    year = datetime.now().year - 1
+    return [
+        dict({"symbol": symbol, "date": f"{year - i}-12-31", "calendarYear": str(year - i), "period": "FY"},
+             **{key: round(rng.uniform(-0.1, 0.3), 4) for key in keys})
+        for i in range(limit)
+    ]
+
+
+def _statement_years(symbol, limit):
+    """Yearly fundamentals shared by the three statement payloads"""
+    rng = _symbol_rng(symbol, "statements")
+    year = datetime.now().year - 1
+    revenue = rng.uniform(5e9, 4e11)
+    rows = []
+    for i in range(limit):
+        margin = rng.uniform(0.08, 0.3)
+        rows.append({
+            "year": year - i,
+            "revenue": revenue,
+            "netIncome": revenue * margin * 0.8,
+            "operatingCashFlow": revenue * margin,
+            "capex": revenue * rng.uniform(0.02, 0.06),
+            "debt": revenue * rng.uniform(0.1, 0.6),
+            "cash": revenue * rng.uniform(0.05, 0.3),
+        })
+        revenue /= 1 + rng.uniform(0.0, 0.15)
+    return rows
+
+
+def _statement_header(symbol, row):
+    """Fields common to every statement entry"""
+    return {
+        "date": f"{row['year']}-12-31",
+        "symbol": symbol,
+        "reportedCurrency": "USD",
+        "cik": "0000000000",
+        "fillingDate": f"{row['year'] + 1}-02-01",
+        "acceptedDate": f"{row['year'] + 1}-02-01 18:01:14",
+        "calendarYear": str(row["year"]),
+        "period": "FY",
+        "link": "https://www.sec.gov/",
+        "finalLink": "https://www.sec.gov/",
+    }
+
+
+def make_cash_flow_statement(symbol, limit):
+    """Annual cash flow statements (most recent first)"""
+    statements = []
+    for row in _statement_years(symbol, limit):
+        entry = _statement_header(symbol, row)
+        entry.update({
+            "netIncome": row["netIncome"],
+            "depreciationAndAmortization": row["capex"] * 0.8,
+            "stockBasedCompensation": row["revenue"] * 0.01,
+            "changeInWorkingCapital": row["revenue"] * 0.005,
+            "netCashProvidedByOperatingActivities": row["operatingCashFlow"],
+            "investmentsInPropertyPlantAndEquipment": -row["capex"],
+            "netCashUsedForInvestingActivites": -row["capex"] * 1.4,
+            "debtRepayment": -row["debt"] * 0.1,
+            "commonStockRepurchased": -row["netIncome"] * 0.4,
+            "dividendsPaid": -row["netIncome"] * 0.2,
+            "netCashUsedProvidedByFinancingActivities": -row["netIncome"] * 0.7,
+            "netChangeInCash": row["cash"] * 0.05,
+            "cashAtEndOfPeriod": row["cash"],
+            "operatingCashFlow": row["operatingCashFlow"],
+            "capitalExpenditure": -row["capex"],
+            "freeCashFlow": row["operatingCashFlow"] - row["capex"],
+        })
+        statements.append(entry)
+    return statements
+
+
+def make_income_statement(symbol, limit):
+    """Annual income statements (most recent first)"""
+    statements = []
+    for row in _statement_years(symbol, limit):
+        entry = _statement_header(symbol, row)
+        entry.update({
+            "revenue": row["revenue"],
+            "costOfRevenue": row["revenue"] * 0.55,
+            "grossProfit": row["revenue"] * 0.45,
+            "grossProfitRatio": 0.45,
+            "researchAndDevelopmentExpenses": row["revenue"] * 0.07,
+            "sellingGeneralAndAdministrativeExpenses": row["revenue"] * 0.08,
+            "operatingExpenses": row["revenue"] * 0.15,
+            "interestExpense": row["debt"] * 0.04,
+            "ebitda": row["netIncome"] * 1.5,
+            "operatingIncome": row["netIncome"] * 1.3,
+            "incomeBeforeTax": row["netIncome"] * 1.25,
+            "incomeTaxExpense": row["netIncome"] * 0.25,
+            "netIncome": row["netIncome"],
+            "netIncomeRatio": row["netIncome"] / row["revenue"],
+            "eps": row["netIncome"] / 1e9,
+            "epsdiluted": row["netIncome"] / 1.01e9,
+            "weightedAverageShsOut": 1e9,
+            "weightedAverageShsOutDil": 1.01e9,
+        })
+        statements.append(entry)
+    return statements
+
+
+def make_balance_sheet(symbol, limit):
+    """Annual balance sheet statements (most recent first)"""
+    statements = []
+    for row in _statement_years(symbol, limit):
+        entry = _statement_header(symbol, row)
+        total_assets = row["revenue"] * 1.2
+        entry.update({
+            "cashAndCashEquivalents": row["cash"],
+            "shortTermInvestments": row["cash"] * 0.5,
+            "netReceivables": row["revenue"] * 0.1,
+            "inventory": row["revenue"] * 0.05,
+            "totalCurrentAssets": total_assets * 0.4,
+            "propertyPlantEquipmentNet": total_assets * 0.3,
+            "goodwill": total_assets * 0.1,
+            "totalAssets": total_assets,
+            "accountPayables": row["revenue"] * 0.08,
+            "shortTermDebt": row["debt"] * 0.2,
+            "totalCurrentLiabilities": total_assets * 0.3,
+            "longTermDebt": row["debt"] * 0.8,
+            "totalLiabilities": total_assets * 0.6,
+            "totalStockholdersEquity": total_assets * 0.4,
+            "totalDebt": row["debt"],
+            "netDebt": row["debt"] - row["cash"],
+        })
+        statements.append(entry)
+    return statements
+
+
+def make_historical_price_full(symbol, start, end):
+    """Daily OHLCV history between two dates (most recent first, like FMP)"""
+    rng = _symbol_rng(symbol, "history")
+    # Walk forward from a fixed anchor so overlapping ranges agree with each other
+    anchor = datetime(1990, 1, 1)
+    day = anchor
+    close = _base_price(symbol) / 4
+    historical = []
+    while day <= end:
+        if day.weekday() < 5:
+            drift = rng.gauss(0.0003, 0.018)
+            open_price = close * (1 + rng.gauss(0, 0.004))
+            close = max(close * (1 + drift), 0.5)
+            high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.006)))
+            low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.006)))
+            if day >= start:
+                volume = rng.randint(1_000_000, 90_000_000)
+                historical.append({
+                    "date": day.strftime("%Y-%m-%d"),
+                    "open": round(open_price, 2),
+                    "high": round(high, 2),
+                    "low": round(low, 2),
+                    "close": round(close, 2),
+                    "adjClose": round(close, 2),
+                    "volume": volume,
+                    "unadjustedVolume": volume,
+                    "change": round(close - open_price, 2),
+                    "changePercent": round((close - open_price) / open_price * 100, 4),
+                    "vwap": round((high + low + close) / 3, 4),
+                    "label": day.strftime("%B %d, %y"),
+                    "changeOverTime": round((close - open_price) / open_price, 6),
+                })
+        day += timedelta(days=1)
+    historical.reverse()
+    return {"symbol": symbol, "historical": historical}
+
+
+def make_dcf(symbol):
+    """Discounted cash flow payload entry (v3)"""
+    quote = make_quote(symbol)
+    return {"symbol": symbol, "date": datetime.now().strftime("%Y-%m-%d"),
+            "dcf": round(quote["price"] * 1.1, 2), "Stock Price": quote["price"]}
+
+
+def make_advanced_dcf(symbol):
+    """Advanced discounted cash flow payload entry (v4)"""
+    quote = make_quote(symbol)
+    return {"symbol": symbol, "year": str(datetime.now().year), "price": quote["price"],
+            "intrinsicValue": round(quote["price"] * 1.05, 2), "wacc": 9.1}
+
+
+CONSTITUENT_COUNTS = {"sp500_constituent": 503, "nasdaq_constituent": 101, "dowjones_constituent": 30}
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Consumer Cyclical", "Industrials",
+           "Energy", "Utilities", "Real Estate", "Basic Materials", "Communication Services"]
+
+
+def make_constituents(index_name):
+    """Index membership list with synthetic but stable tickers"""
+    rng = _symbol_rng(index_name, "constituents")
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    symbols = []
+    seen = set()
+    while len(symbols) < CONSTITUENT_COUNTS[index_name]:
+        symbol = "".join(rng.choice(letters) for _ in range(rng.randint(2, 4)))
+        if symbol not in seen:
+            seen.add(symbol)
+            symbols.append(symbol)
+    return [{"symbol": symbol, "name": f"{symbol} Holdings Inc.", "sector": rng.choice(SECTORS)}
+            for symbol in symbols]
+
+
+BULK_STATEMENTS = {
+    "income-statement-bulk": make_income_statement,
+    "balance-sheet-statement-bulk": make_balance_sheet,
+    "cash-flow-statement-bulk": make_cash_flow_statement,
+}
+
+
+def make_statement_bulk_csv(endpoint, year):
+    """One fiscal year of a statement for every S&P 500 stand-in symbol, as FMP bulk CSV"""
+    depth = datetime.now().year - year
+    lines = []
+    header = None
+    for member in make_constituents("sp500_constituent"):
+        if depth < 1:
+            break
+        entry = BULK_STATEMENTS[endpoint](member["symbol"], depth)[-1]
+        if header is None:
+            header = list(entry)
+            lines.append(",".join(header))
+        lines.append(",".join(f'"{entry[key]}"' if isinstance(entry[key], str) else repr(entry[key])
+                              for key in header))
+    return ("\n".join(lines) + "\n").encode()
+
+
+class FakeFMPServer:
+    """Threaded HTTP server mimicking the FMP endpoints used by the dashboards"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0, host="127.0.0.1", port=0,
+                 slow_endpoints=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Extra latency in ms for degraded endpoints, e.g. {"key-metrics-ttm": 20000}
+        self.slow_endpoints = dict(slow_endpoints or {})
+        self.calls = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._history_cache = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _delay(self, endpoint=None):
+        """Simulated network latency for one request"""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self._rng.random() < self.error_rate
+        delay = max(self.latency_ms + jitter + self.slow_endpoints.get(endpoint, 0.0), 0.0) / 1000
+        return delay, fail
+
+    def _history(self, symbol, start, end):
+        key = (symbol, start, end)
+        if key not in self._history_cache:
+            self._history_cache[key] = json.dumps(make_historical_price_full(symbol, start, end)).encode()
+        return self._history_cache[key]
+
+    def payload(self, path, query):
+        """Return (status, body bytes, endpoint name) for a request path"""
+        parts = [p for p in path.split("/") if p]
+        if len(parts) < 3 or parts[0] != "api":
+            return 404, b'{"Error Message": "Unknown endpoint"}', "unknown"
+        endpoint = parts[2]
+        symbol = parts[3].upper() if len(parts) > 3 else query.get("symbol", [""])[0].upper()
+        limit = int(query.get("limit", ["5"])[0])
+        if endpoint == "quote":
+            body = [make_quote(s) for s in symbol.split(",") if s]
+        elif endpoint == "key-metrics-ttm":
+            body = [make_key_metrics_ttm(symbol)]
+        elif endpoint == "ratios-ttm":
+            body = [make_ratios_ttm(symbol)]
+        elif endpoint == "financial-growth":
+            body = make_financial_growth(symbol, limit)
+        elif endpoint == "cash-flow-statement":
+            body = make_cash_flow_statement(symbol, limit)
+        elif endpoint == "income-statement":
+            body = make_income_statement(symbol, limit)
+        elif endpoint == "balance-sheet-statement":
+            body = make_balance_sheet(symbol, limit)
+        elif endpoint == "discounted-cash-flow":
+            body = [make_dcf(symbol)]
+        elif endpoint == "advanced_discounted_cash_flow":
+            body = [make_advanced_dcf(symbol)]
+        elif endpoint in CONSTITUENT_COUNTS:
+            body = make_constituents(endpoint)
+        elif endpoint in BULK_STATEMENTS:
+            year = int(query.get("year", [str(datetime.now().year - 1)])[0])
+            return 200, make_statement_bulk_csv(endpoint, year), endpoint
+        elif endpoint == "historical-price-full":
+            end = datetime.strptime(query.get("to", [datetime.now().strftime("%Y-%m-%d")])[0], "%Y-%m-%d")
+            start = datetime.strptime(query.get("from", [(end - timedelta(days=365)).strftime("%Y-%m-%d")])[0], "%Y-%m-%d")
+            return 200, self._history(symbol, start, end), endpoint
+        else:
+            return 404, b'{"Error Message": "Unknown endpoint"}', endpoint
+        return 200, json.dumps(body).encode(), endpoint
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                status, body, endpoint = server.payload(parsed.path, parse_qs(parsed.query))
+                delay, fail = server._delay(endpoint)
+                if delay:
+                    time.sleep(delay)
+                with server._lock:
+                    server.calls[endpoint] += 1
+                    if fail:
+                        server.errors[endpoint] += 1
+                if fail:
+                    status, body = 500, b'{"Error Message": "Injected upstream failure"}'
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up waiting (timeouts and deadlines)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local FMP stand-in server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow", action="append", default=[], metavar="ENDPOINT=MS",
+                        help="extra latency for one endpoint (repeatable)")
+    args = parser.parse_args()
+
+    slow = {name: float(ms) for name, ms in (item.split("=", 1) for item in args.slow)}
+    fake = FakeFMPServer(args.latency_ms, args.jitter_ms, args.error_rate, port=args.port, slow_endpoints=slow)
+    print(f"Fake FMP server listening on {fake.base_url}")
+    print(f"Run the dashboard with FMP_BASE_URL={fake.base_url}")
+    try:
+        fake._httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,145 @@
+"""
+Self-hosted, fingerprinted front-end bundles
+The Plotly bundle is pinned to PLOTLY_VERSION and served by the app under a name that
+carries a hash of its contents, so browsers cache it for a year without revalidating and
+a different build simply gets a different URL. It is read from PLOTLY_JS, then
+static/vendor, then the plotly Python package, taking the first whose version banner
+matches the pin; with none of those the pages fall back to the same pinned build on the
+CDN. `python assets.py --fetch` vendors it for air-gapped installs
+"""
+
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+
+PLOTLY_VERSION = os.environ.get("PLOTLY_VERSION", "2.35.2")
+PLOTLY_JS = os.environ.get("PLOTLY_JS", "")
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "vendor")
+CDN_URL = "https://cdn.plot.ly/plotly-{version}.min.js"
+ASSET_PREFIX = "/assets/"
+# The bundle's header comment: /** * plotly.js v2.35.2 ...
+BANNER_PATTERN = re.compile(rb"plotly\.js v(\d+\.\d+\.\d+)")
+# A fingerprinted name never changes content, so it can be cached for a year and never revalidated
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class Asset:
+    """A bundle held in memory under its fingerprinted file name, gzipped once on first request"""
+
+    def __init__(self, path, body, stem, suffix):
+        self.path = path
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.filename = f"{stem}.{self.digest}{suffix}"
+        self._gzipped = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return ASSET_PREFIX + self.filename
+
+    def gzipped(self):
+        with self._lock:
+            if self._gzipped is None:
+                self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+            return self._gzipped
+
+
+def vendored_plotly_path(version=PLOTLY_VERSION):
+    return os.path.join(VENDOR_DIR, f"plotly-{version}.min.js")
+
+
+def _package_plotly_path():
+    """plotly.min.js shipped inside the plotly Python package, found without importing it"""
+    spec = importlib.util.find_spec("plotly")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], "package_data", "plotly.min.js")
+    return path if os.path.exists(path) else None
+
+
+def bundle_version(path):
+    """plotly.js version from a bundle's banner, or None if it has none"""
+    try:
+        with open(path, "rb") as f:
+            match = BANNER_PATTERN.search(f.read(1024))
+    except OSError:
+        return None
+    return match.group(1).decode() if match else None
+
+
+def find_plotly(version=PLOTLY_VERSION):
+    """Path of the first available Plotly bundle whose banner matches `version`, or None"""
+    for path in (PLOTLY_JS, vendored_plotly_path(version), _package_plotly_path()):
+        if not path or not os.path.exists(path):
+            continue
+        found = bundle_version(path)
+        if found == version:
+            return path
+        print(f"Skipping Plotly bundle {path}: version {found or 'unknown'}, pinned to {version}")
+    return None
+
+
+_plotly = None
+_plotly_lock = threading.Lock()
+
+
+def plotly_asset():
+    """The local Plotly bundle (read once), or None when there is none to serve"""
+    global _plotly
+    with _plotly_lock:
+        if _plotly is None:
+            path = find_plotly()
+            if path is None:
+                _plotly = False
+            else:
+                try:
+                    with open(path, "rb") as f:
+                        _plotly = Asset(path, f.read(), "plotly", ".min.js")
+                except OSError as e:
+                    print(f"Error reading Plotly bundle {path}: {e}")
+                    _plotly = False
+        return _plotly or None
+
+
+def plotly_src():
+    """Script URL for the pages: the self-hosted bundle when present, else the pinned CDN build"""
+    asset = plotly_asset()
+    return asset.url if asset else CDN_URL.format(version=PLOTLY_VERSION)
+
+
+def fetch_plotly(version=PLOTLY_VERSION):
+    """Download the pinned CDN build into static/vendor"""
+    import requests
+
+    target = vendored_plotly_path(version)
+    response = requests.get(CDN_URL.format(version=version), timeout=60)
+    response.raise_for_status()
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp, target)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vendor and inspect the self-hosted Plotly bundle")
+    parser.add_argument("--fetch", action="store_true", help=f"download plotly-{PLOTLY_VERSION}.min.js into static/vendor")
+    args = parser.parse_args(argv)
+    if args.fetch:
+        print(f"Saved {fetch_plotly()}")
+    asset = plotly_asset()
+    if asset is None:
+        print(f"No local Plotly bundle; pages load {plotly_src()}")
+        return
+    print(f"Serving {asset.path} as {asset.url}")
+    print(f"  {len(asset.body) / 1024:.0f} KB, {len(asset.gzipped()) / 1024:.0f} KB gzipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Vectorized backtests of the dashboard's indicator signals
+EMA 20/50 and 50/200 crossovers and Bollinger band entries are turned into next-bar
+positions and scored on P&L, hit rate, Sharpe and drawdown. Every kernel works on a
+(bars x symbols) close matrix, and large universes are split across a process pool
+
+    python src/backtest.py --api-key KEY --universe sp500 --range 10Y
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from portfolio import TRADING_DAYS, align_closes, forward_fill, load_closes
+
+DEFAULT_COST_BPS = 5.0
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+# Below this many symbols a process pool costs more than it saves
+PARALLEL_MIN_SYMBOLS = 64
+
+STRATEGIES = {
+    "ema_20_50": "EMA 20/50 crossover",
+    "ema_50_200": "EMA 50/200 crossover",
+    "bollinger_reversion": "Bollinger mean reversion",
+    "bollinger_breakout": "Bollinger breakout",
+    "buy_and_hold": "Buy and hold",
+}
+METRICS = ("total_return", "annual_return", "sharpe", "max_drawdown", "trades", "hit_rate", "exposure")
+
+
+def ema_matrix(prices, span):
+    """EMA down each column, matching pandas ewm(span, adjust=False) from each column's first bar
+
+    span may be a scalar or one span per column. Columns must be gap-free after their first
+    bar (callers forward-fill), since a NaN restarts the average.
+    """
+    alpha = 2.0 / (np.asarray(span, dtype=np.float64) + 1)
+    out = np.empty_like(prices)
+    previous = prices[0].copy()
+    out[0] = previous
+    for t in range(1, len(prices)):
+        current = prices[t]
+        previous = np.where(np.isnan(previous), current, alpha * current + (1 - alpha) * previous)
+        out[t] = previous
+    return out
+
+
+def ema_series(values, span):
+    """EMA of one series, matching pandas ewm(span, adjust=False); NaN before the first value
+
+    Within a block the recurrence is a scaled cumulative sum, so it runs as a few array
+    operations per block. Rounding error tracks the block length, not the scale factors, so
+    blocks run until those reach e**60 (far from overflow) to keep the Python loop short.
+
+    Missing values repeat the last EMA. As in pandas, the first value after a gap of k bars
+    is averaged with the old EMA at weights alpha and (1 - alpha)**(k + 1).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    observed = np.flatnonzero(~np.isnan(values))
+    if not len(observed):
+        return out
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    block = max(1, int(60.0 / -np.log(decay))) if decay > 0 else 1
+    powers = decay ** np.arange(block + 1)
+    inverse = 1.0 / powers[:block]
+    carry = values[observed[0]]
+    previous = observed[0] - 1
+    # Gap-free runs of observed bars
+    for run in np.split(observed, np.flatnonzero(np.diff(observed) > 1) + 1):
+        head, end = run[0], run[-1] + 1
+        out[previous + 1:head] = carry
+        if head > observed[0]:
+            weight = decay ** (head - previous)
+            carry = (weight * carry + alpha * values[head]) / (weight + alpha)
+        out[head] = carry
+        for start in range(head + 1, end, block):
+            segment = values[start:min(start + block, end)]
+            m = len(segment)
+            smoothed = powers[1:m + 1] * carry + alpha * powers[:m] * np.cumsum(segment * inverse[:m])
+            out[start:start + m] = smoothed
+            carry = smoothed[-1]
+        previous = end - 1
+    out[previous + 1:] = carry
+    return out
+
+def rolling_mean_std(prices, window):
+    """Rolling mean and sample std down each column via cumulative sums (NaN until full)"""
+    mean = np.full(prices.shape, np.nan)
+    std = np.full(prices.shape, np.nan)
+    if len(prices) < window:
+        return mean, std
+    # Centre each column first so the running sums of squares keep their precision
+    valid_columns = ~np.isnan(prices).all(axis=0)
+    offset = np.zeros(prices.shape[1])
+    offset[valid_columns] = np.nanmean(prices[:, valid_columns], axis=0)
+    filled = np.nan_to_num(prices - offset)
+    counts = np.cumsum(~np.isnan(prices), axis=0)
+    sums = np.cumsum(filled, axis=0)
+    squares = np.cumsum(filled * filled, axis=0)
+    zero = np.zeros((1, prices.shape[1]))
+    window_counts = counts[window - 1:] - np.vstack([zero, counts[:-window]])
+    window_sums = sums[window - 1:] - np.vstack([zero, sums[:-window]])
+    window_squares = squares[window - 1:] - np.vstack([zero, squares[:-window]])
+    full = window_counts == window
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m = window_sums / window
+        var = np.maximum(window_squares - window * m * m, 0.0) / (window - 1)
+    mean[window - 1:] = np.where(full, m + offset, np.nan)
+    std[window - 1:] = np.where(full, np.sqrt(var), np.nan)
+    return mean, std
+
+
+def _latch(enter, exit_):
+    """Long/flat positions from entry and exit conditions: hold from an entry until the next exit"""
+    events = np.where(enter, 1.0, np.where(exit_, 0.0, np.nan))
+    return np.nan_to_num(forward_fill(events))
+
+
+def signals(prices, strategy):
+    """Desired position (0 or 1) at each close for a strategy"""
+    bars_seen = np.cumsum(~np.isnan(prices), axis=0)
+    if strategy == "buy_and_hold":
+        return (bars_seen > 0).astype(np.float64)
+    if strategy in ("ema_20_50", "ema_50_200"):
+        fast, slow = (20, 50) if strategy == "ema_20_50" else (50, 200)
+        long = ema_matrix(prices, fast) > ema_matrix(prices, slow)
+        return (long & (bars_seen >= slow)).astype(np.float64)
+    sma, std = rolling_mean_std(prices, 20)
+    upper, lower = sma + 2 * std, sma - 2 * std
+    with np.errstate(invalid="ignore"):
+        if strategy == "bollinger_reversion":
+            return _latch(prices < lower, prices >= sma)
+        if strategy == "bollinger_breakout":
+            return _latch(prices > upper, prices <= sma)
+    raise ValueError(f"Unknown strategy '{strategy}'")
+
+
+def evaluate(prices, positions, cost_bps=DEFAULT_COST_BPS):
+    """Per-column metrics for positions taken at each close and held over the next bar"""
+    n_bars, n_symbols = prices.shape
+    returns = np.zeros(prices.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+    held = np.zeros(prices.shape)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    strategy_returns = held * returns - turnover * cost_bps / 10_000
+
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    total_return = equity[-1] - 1
+    active = np.cumsum(~np.isnan(prices), axis=0) > 1
+    years = active.sum(axis=0) / TRADING_DAYS
+    with np.errstate(invalid="ignore", divide="ignore"):
+        annual_return = np.where(years > 0, np.maximum(1 + total_return, 0) ** (1 / years) - 1, np.nan)
+        mean = (strategy_returns * active).sum(axis=0) / active.sum(axis=0)
+        var = (((strategy_returns - mean) * active) ** 2).sum(axis=0) / (active.sum(axis=0) - 1)
+        sharpe = np.where(var > 0, mean / np.sqrt(var) * np.sqrt(TRADING_DAYS), np.nan)
+    max_drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+
+    # Each entry starts a trade; bincount the log P&L of every held bar by (symbol, trade)
+    entries = (held > 0) & (np.vstack([np.zeros((1, n_symbols)), held[:-1]]) == 0)
+    trade_ids = np.cumsum(entries, axis=0)
+    trades = trade_ids[-1]
+    in_trade = held > 0
+    keys = (np.arange(n_symbols) * (n_bars + 1) + trade_ids)[in_trade]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl = np.bincount(keys, weights=np.log1p(strategy_returns[in_trade]),
+                          minlength=n_symbols * (n_bars + 1))
+    won = (pnl.reshape(n_symbols, n_bars + 1) > 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(trades > 0, won / trades, np.nan)
+        exposure = in_trade.sum(axis=0) / np.maximum(active.sum(axis=0), 1)
+    return {"total_return": total_return, "annual_return": annual_return, "sharpe": sharpe,
+            "max_drawdown": max_drawdown, "trades": trades.astype(np.float64), "hit_rate": hit_rate,
+            "exposure": exposure}
+
+
+def run_backtest(closes, strategies=tuple(STRATEGIES), cost_bps=DEFAULT_COST_BPS):
+    """{strategy: {metric: per-symbol array}} for an aligned (bars x symbols) close matrix"""
+    prices = forward_fill(np.asarray(closes, dtype=np.float64))
+    return {strategy: evaluate(prices, signals(prices, strategy), cost_bps) for strategy in strategies}
+
+
+def _run_chunk(args):
+    closes, strategies, cost_bps = args
+    return run_backtest(closes, strategies, cost_bps)
+
+
+def run_parallel(closes, strategies=tuple(STRATEGIES), cost_bps=DEFAULT_COST_BPS, workers=BACKTEST_WORKERS):
+    """run_backtest with symbol columns split across worker processes"""
+    n_symbols = closes.shape[1]
+    if workers <= 1 or n_symbols < PARALLEL_MIN_SYMBOLS:
+        return run_backtest(closes, strategies, cost_bps)
+    chunks = [chunk for chunk in np.array_split(closes, workers, axis=1) if chunk.shape[1]]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        parts = list(pool.map(_run_chunk, [(chunk, strategies, cost_bps) for chunk in chunks]))
+    return {strategy: {metric: np.concatenate([part[strategy][metric] for part in parts])
+                       for metric in METRICS}
+            for strategy in strategies}
+
+
+def backtest_symbols(symbols, api_key, period="5Y", strategies=tuple(STRATEGIES), cost_bps=DEFAULT_COST_BPS,
+                     workers=BACKTEST_WORKERS):
+    """Backtest a symbol list over a range from the cached daily history"""
+    series = load_closes(list(dict.fromkeys(symbols)), api_key, period)
+    _, loaded, closes = align_closes(series)
+    if not loaded:
+        return None, []
+    return run_parallel(closes, strategies, cost_bps, workers), loaded
+
+
+def summary_rows(results, column=0):
+    """Template rows (one per strategy) for a single symbol's column, NaN as None"""
+    rows = []
+    for strategy, metrics in results.items():
+        row = {"strategy": STRATEGIES[strategy]}
+        for metric in METRICS:
+            value = metrics[metric][column]
+            row[metric] = None if np.isnan(value) else float(value)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    from screener import UNIVERSES, universe_symbols
+
+    parser = argparse.ArgumentParser(description="Backtest the dashboard's indicator signals across symbols")
+    parser.add_argument("--api-key", default=os.environ.get("FMP_API_KEY", ""))
+    parser.add_argument("--universe", default="custom", choices=list(UNIVERSES) + ["custom"])
+    parser.add_argument("--symbols", default="", help="comma separated tickers for the custom universe")
+    parser.add_argument("--range", default="5Y", help="history range such as 1Y, 5Y, 10Y or MAX")
+    parser.add_argument("--cost-bps", type=float, default=DEFAULT_COST_BPS, help="cost per position change")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("--api-key (or FMP_API_KEY) is required")
+
+    symbols, _ = universe_symbols(args.universe, args.api_key, args.symbols)
+    started = time.perf_counter()
+    series = load_closes(symbols, args.api_key, args.range)
+    _, loaded, closes = align_closes(series)
+    loaded_at = time.perf_counter()
+    if not loaded:
+        print("No price history loaded")
+        return 1
+    results = run_parallel(closes, tuple(STRATEGIES), args.cost_bps, args.workers)
+    finished = time.perf_counter()
+    print(f"{len(loaded)} symbols x {closes.shape[0]} bars: load {loaded_at - started:.2f}s, "
+          f"backtest {finished - loaded_at:.2f}s ({args.workers} workers)")
+    print(f"{'strategy':<26} {'median return':>14} {'median sharpe':>14} {'hit rate':>9} {'beat hold':>10}")
+    hold = results["buy_and_hold"]["total_return"]
+    for strategy, metrics in results.items():
+        print(f"{STRATEGIES[strategy]:<26} {np.nanmedian(metrics['total_return']):>13.1%} "
+              f"{np.nanmedian(metrics['sharpe']):>14.2f} {np.nanmean(metrics['hit_rate']):>8.1%} "
+              f"{np.mean(metrics['total_return'] > hold):>9.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Multi-symbol comparison of normalized prices and EMAs
+Histories for up to MAX_COMPARE_SYMBOLS tickers are fetched concurrently through the
+shared OHLCV cache, aligned on one date axis, rebased to 100 and smoothed with an EMA
+in a single matrix pass, then packed into one compact chart payload
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backtest import ema_matrix
+from portfolio import align_closes, forward_fill
+from timeframes import get_ohlcv, normalize_interval, normalize_range
+
+MAX_COMPARE_SYMBOLS = 20
+COMPARE_EMA_SPANS = (20, 50, 200)
+DEFAULT_COMPARE_EMA = 50
+COMPARE_WORKERS = int(os.environ.get("COMPARE_WORKERS", str(MAX_COMPARE_SYMBOLS)))
+
+
+def parse_symbols(text, limit=MAX_COMPARE_SYMBOLS):
+    """Unique upper-case tickers from a comma or space separated list, and any past the limit"""
+    symbols = list(dict.fromkeys(s.upper() for s in text.replace(",", " ").split()))
+    return symbols[:limit], symbols[limit:]
+
+
+def load_series(symbols, api_key, period, interval, workers=COMPARE_WORKERS):
+    """OHLCV per symbol at the requested range and interval, fetched in parallel"""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(symbols) or 1))) as pool:
+        return dict(zip(symbols, pool.map(lambda s: get_ohlcv(s, api_key, period, interval), symbols)))
+
+
+def compare(series_by_symbol, ema_span=DEFAULT_COMPARE_EMA):
+    """Aligned dates, prices rebased to 100 at each symbol's first bar, and their EMAs"""
+    dates, symbols, closes = align_closes(series_by_symbol)
+    if not symbols:
+        return None
+    prices = forward_fill(closes)
+    first = prices[np.argmax(~np.isnan(prices), axis=0), np.arange(len(symbols))]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = prices / first * 100
+    ema = ema_matrix(normalized, ema_span)
+    ema[np.isnan(normalized)] = np.nan
+    return {
+        "dates": dates,
+        "symbols": symbols,
+        "normalized": normalized,
+        "ema": ema,
+        "ema_span": ema_span,
+        "change": normalized[-1] / 100 - 1,
+        "above_ema": normalized[-1] > ema[-1],
+        "missing": [s for s in series_by_symbol if s not in symbols],
+    }
+
+
+def compare_symbols(symbols, api_key, period="1Y", interval="daily", ema_span=DEFAULT_COMPARE_EMA):
+    """Load and compare a symbol list; None when no history loaded"""
+    series = load_series(symbols, api_key, normalize_range(period), normalize_interval(interval))
+    return compare(series, ema_span)
+
+
+def _rounded(values, digits):
+    return [None if np.isnan(v) else float(v) for v in np.round(values, digits)]
+
+
+def chart_payload(result, max_points=None, digits=2):
+    """One compact dict for the page: shared dates once, then a rounded column per symbol
+
+    Long ranges are thinned to max_points evenly spaced bars (always keeping the last).
+    """
+    n_bars = len(result["dates"])
+    rows = np.arange(n_bars)
+    if max_points and n_bars > max_points:
+        rows = np.unique(np.r_[np.linspace(0, n_bars - 1, max_points).astype(int), n_bars - 1])
+    return {
+        "dates": np.datetime_as_string(result["dates"][rows], unit="D").tolist(),
+        "symbols": result["symbols"],
+        "price": [_rounded(result["normalized"][rows, j], digits) for j in range(len(result["symbols"]))],
+        "ema": [_rounded(result["ema"][rows, j], digits) for j in range(len(result["symbols"]))],
+        "ema_span": result["ema_span"],
+    }
+
+
+def summary_rows(result):
+    """Per-symbol change over the range and position against the EMA"""
+    return [{"symbol": symbol,
+             "change": None if np.isnan(result["change"][j]) else float(result["change"][j]),
+             "above_ema": bool(result["above_ema"][j])}
+            for j, symbol in enumerate(result["symbols"])]
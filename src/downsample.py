@@ -0,0 +1,109 @@
+"""
+Server-side downsampling for chart payloads
+LTTB (Largest-Triangle-Three-Buckets) picks representative points for line traces,
+and min/max bucketing merges candlesticks, so long histories ship only about as
+many points as the chart has pixels
+"""
+
+import bisect
+
+import numpy as np
+
+DEFAULT_CHART_POINTS = 1500
+MIN_CHART_POINTS = 100
+MAX_CHART_POINTS = 5000
+# Candles need a few pixels each to stay legible
+PIXELS_PER_CANDLE = 3
+
+
+def target_points(width):
+    """Point budget for a chart of the given pixel width"""
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        return DEFAULT_CHART_POINTS
+    return min(max(width, MIN_CHART_POINTS), MAX_CHART_POINTS)
+
+
+def lttb_indices(values, n_out):
+    """Indices of the points LTTB keeps when reducing `values` to n_out points"""
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    missing = np.isnan(y)
+    if missing.any():
+        y = np.where(missing, np.nanmean(y) if not missing.all() else 0.0, y)
+
+    # Buckets over the interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    lo, hi = edges[:-1], edges[1:]
+    cumulative = np.r_[0.0, np.cumsum(y)]
+    avg_x = (lo + hi - 1) / 2.0
+    avg_y = (cumulative[hi] - cumulative[lo]) / (hi - lo)
+    # Each bucket is scored against the average of the bucket after it
+    next_x = np.r_[avg_x[1:], n - 1]
+    next_y = np.r_[avg_y[1:], y[-1]]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        xs = np.arange(lo[i], hi[i])
+        areas = np.abs((a - next_x[i]) * (y[lo[i]:hi[i]] - y[a]) - (a - xs) * (next_y[i] - y[a]))
+        a = lo[i] + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_bounds(n, n_out):
+    """(starts, ends) index arrays splitting n bars into at most n_out contiguous buckets"""
+    if n_out >= n:
+        idx = np.arange(n)
+        return idx, idx
+    starts = np.unique(np.linspace(0, n, n_out + 1).astype(np.int64)[:-1])
+    ends = np.r_[starts[1:], n] - 1
+    return starts, ends
+
+
+def first_valid(values, starts, ends):
+    """First non-NaN value in each [start, end] bucket, NaN where the bucket has none"""
+    n = len(values)
+    first = np.minimum.reduceat(np.where(np.isnan(values), n, np.arange(n)), starts)
+    return np.where(first <= ends, values[np.minimum(first, n - 1)], np.nan)
+
+
+def last_valid(values, starts, ends):
+    """Last non-NaN value in each [start, end] bucket, NaN where the bucket has none"""
+    last = np.maximum.reduceat(np.where(np.isnan(values), -1, np.arange(len(values))), starts)
+    return np.where(last >= starts, values[last], np.nan)
+
+
+def minmax_ohlc(opens, highs, lows, closes, n_out):
+    """Merge candlesticks into n_out buckets; returns (starts, ends, open, high, low, close)
+
+    Missing (NaN) prices are skipped, so a bucket is only NaN where all of its bars are.
+    """
+    opens, highs, lows, closes = (np.asarray(a, dtype=np.float64) for a in (opens, highs, lows, closes))
+    starts, ends = bucket_bounds(len(closes), n_out)
+    return (starts, ends, first_valid(opens, starts, ends), np.fmax.reduceat(highs, starts),
+            np.fmin.reduceat(lows, starts), last_valid(closes, starts, ends))
+
+
+def take(values, indices):
+    """Pick indices from a list that may contain None"""
+    return [values[i] for i in indices]
+
+
+def window_bounds(dates, window):
+    """(lo, hi) slice bounds of ISO date strings inside a (start, end) window
+
+    One extra point is kept on each side so lines run to the edges of the view.
+    """
+    if not window:
+        return 0, len(dates)
+    start, end = window
+    lo = bisect.bisect_left(dates, start[:10]) - 1 if start else 0
+    hi = bisect.bisect_right(dates, end[:10]) + 1 if end else len(dates)
+    return max(lo, 0), max(min(hi, len(dates)), lo)
@@ -0,0 +1,176 @@
+"""
+Streamed table exports as CSV, Parquet or Arrow IPC
+Callers hand over a schema and an iterator of column chunks (one symbol at a time);
+each chunk is encoded and yielded as bytes as soon as it is ready, so a multi-symbol
+export never holds more than one chunk in memory. Parquet and Arrow need pyarrow,
+which is optional
+"""
+
+import csv
+import io
+import math
+import os
+
+import numpy as np
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+# Long series are split so no single encoded chunk grows without bound
+CHUNK_ROWS = 50_000
+# Symbols per export request, and how many are fetched at once before streaming starts
+MAX_EXPORT_SYMBOLS = int(os.environ.get("MAX_EXPORT_SYMBOLS", "50"))
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "8"))
+
+
+class ExportError(ValueError):
+    """Unknown format, or a format whose optional dependency is missing"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401  (registers pyarrow.parquet)
+    except ImportError:
+        raise ExportError("Parquet and Arrow exports need pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def check_format(fmt):
+    """Validate a format name before a response starts streaming"""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format '{fmt}' (expected {', '.join(FORMATS)})")
+    if fmt != "csv":
+        _pyarrow()
+    return fmt
+
+
+def split_rows(columns, chunk_rows=CHUNK_ROWS):
+    """Yield slices of a column chunk with at most chunk_rows rows each"""
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    if n_rows <= chunk_rows:
+        yield columns
+        return
+    for start in range(0, n_rows, chunk_rows):
+        yield {name: values[start:start + chunk_rows] for name, values in columns.items()}
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return "" if math.isnan(value) else repr(value)
+    if isinstance(value, np.datetime64):
+        return str(value.astype("datetime64[D]"))
+    return value
+
+
+def stream_csv(schema, chunks):
+    """CSV bytes: a header row, then each chunk's rows"""
+    names = [name for name, _ in schema]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    yield buffer.getvalue().encode()
+    for columns in chunks:
+        for part in split_rows(columns):
+            buffer.seek(0)
+            buffer.truncate()
+            values = [part[name] for name in names]
+            for row in zip(*values):
+                writer.writerow([_csv_cell(v) for v in row])
+            yield buffer.getvalue().encode()
+
+
+class _Drain:
+    """Write-only file that hands back whatever was written since the last drain()"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+_ARROW_TYPES = {"string": "string", "float": "float64", "int": "int64", "date": "date32"}
+
+
+def _arrow_schema(pa, schema):
+    return pa.schema([(name, getattr(pa, _ARROW_TYPES[kind])()) for name, kind in schema])
+
+
+def _record_batch(pa, arrow_schema, schema, columns):
+    arrays = []
+    for name, kind in schema:
+        values = columns[name]
+        if kind == "float":
+            values = np.asarray([np.nan if v is None else v for v in values], dtype=np.float64) \
+                if isinstance(values, list) else np.asarray(values, dtype=np.float64)
+            arrays.append(pa.array(values, type=pa.float64(), from_pandas=True))
+        elif kind == "date":
+            arrays.append(pa.array(np.asarray(values, dtype="datetime64[D]"), type=pa.date32()))
+        else:
+            arrays.append(pa.array(list(values), type=arrow_schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema)
+
+
+def stream_arrow(schema, chunks):
+    """Arrow IPC stream bytes, one record batch per chunk"""
+    pa = _pyarrow()
+    arrow_schema = _arrow_schema(pa, schema)
+    sink = _Drain()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), arrow_schema) as writer:
+        yield sink.drain()
+        for columns in chunks:
+            for part in split_rows(columns):
+                writer.write_batch(_record_batch(pa, arrow_schema, schema, part))
+                yield sink.drain()
+    yield sink.drain()
+
+
+def stream_parquet(schema, chunks):
+    """Parquet bytes, one row group per chunk; the footer follows the last chunk"""
+    pa = _pyarrow()
+    arrow_schema = _arrow_schema(pa, schema)
+    sink = _Drain()
+    writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), arrow_schema, compression="zstd")
+    try:
+        for columns in chunks:
+            for part in split_rows(columns):
+                writer.write_batch(_record_batch(pa, arrow_schema, schema, part))
+                yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream(fmt, schema, chunks):
+    """Encoded bytes for schema [(name, "string"|"float"|"int"|"date")] and an iterator of column dicts"""
+    check_format(fmt)
+    writer = {"csv": stream_csv, "parquet": stream_parquet, "arrow": stream_arrow}[fmt]
+    return (data for data in writer(schema, chunks) if data)
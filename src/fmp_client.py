@@ -0,0 +1,191 @@
+"""
+Shared HTTP access to the Financial Modeling Prep API
+Requests go over one pooled session, and responses can be recorded to and
+replayed from a local fixture store, letting both dashboards run offline
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from jsonstream import CHUNK_BYTES, loads, stream_columns
+
+# Base URL for the Financial Modeling Prep API (override to point at a local stand-in)
+FMP_BASE_URL = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com").rstrip("/")
+
+# live: call the API, record: call the API and save responses, replay: serve saved responses only,
+# store: call the API through a shared on-disk response store (see provider.backends)
+FMP_MODE = os.environ.get("FMP_MODE", "live").lower()
+FMP_FIXTURE_DIR = os.environ.get(
+    "FMP_FIXTURE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fixtures", "fmp"),
+)
+FMP_REPLAY_LATENCY_MS = float(os.environ.get("FMP_REPLAY_LATENCY_MS", "0"))
+FMP_REPLAY_JITTER_MS = float(os.environ.get("FMP_REPLAY_JITTER_MS", "0"))
+
+# Query parameters that never take part in fixture keys
+_UNKEYED_PARAMS = {"apikey"}
+# Date-window parameters a replay may substitute from another recording of the same request
+_WINDOW_PARAMS = {"from", "to"}
+
+_write_lock = threading.Lock()
+
+# One connection pool for every upstream call in the process
+FMP_POOL_SIZE = int(os.environ.get("FMP_POOL_SIZE", "32"))
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=FMP_POOL_SIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=FMP_POOL_SIZE))
+
+
+class FixtureMissingError(LookupError):
+    """Raised in replay mode when no fixture exists for a request"""
+
+
+class UpstreamServerError(requests.HTTPError):
+    """FMP answered with a 5xx status; the body is an outage, not data"""
+
+
+def build_url(path, api_key, params=None):
+    """Full FMP URL for an API path such as /api/v3/quote/AAPL"""
+    query = dict(params or {})
+    query["apikey"] = api_key
+    encoded = "&".join(f"{key}={value}" for key, value in query.items())
+    return f"{FMP_BASE_URL}{path}?{encoded}"
+
+
+def fixture_key(path, params=None):
+    """Stable fixture file stem for a request, ignoring the API key"""
+    slug = re.sub(r"[^A-Za-z0-9.,-]+", "_", path.strip("/"))
+    keyed = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in _UNKEYED_PARAMS)
+    digest = hashlib.sha1(json.dumps(keyed).encode()).hexdigest()[:12]
+    return f"{slug}-{digest}"
+
+
+def _fixture_path(path, params, directory=None):
+    return os.path.join(directory or FMP_FIXTURE_DIR, fixture_key(path, params) + ".json.gz")
+
+
+def save_fixture(path, params, status, body, directory=None):
+    """Write one response to the compressed fixture store"""
+    directory = directory or FMP_FIXTURE_DIR
+    target = _fixture_path(path, params, directory)
+    record = {
+        "path": path,
+        "params": {k: v for k, v in (params or {}).items() if k not in _UNKEYED_PARAMS},
+        "status": status,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "body": body,
+    }
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, target)
+
+
+def _fixed_params(params):
+    """Keyed parameters other than the date window, as strings"""
+    return {str(k): str(v) for k, v in (params or {}).items()
+            if k not in _UNKEYED_PARAMS and k not in _WINDOW_PARAMS}
+
+
+def load_fixture(path, params, directory=None, fallback=True):
+    """Read the fixture for a request, falling back to another date window of the same request
+
+    The fallback keeps date-windowed requests (historical prices use from/to
+    relative to today) replayable on later days. It only applies to requests with
+    from/to, and every other parameter must match the recording exactly.
+    """
+    directory = directory or FMP_FIXTURE_DIR
+    target = _fixture_path(path, params, directory)
+    if os.path.exists(target):
+        with gzip.open(target, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    if fallback and _WINDOW_PARAMS & set(params or {}):
+        slug = fixture_key(path).rsplit("-", 1)[0]
+        wanted = _fixed_params(params)
+        candidates = glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(slug)}-*.json.gz"))
+        for candidate in sorted(candidates, key=os.path.getmtime, reverse=True):
+            with gzip.open(candidate, "rt", encoding="utf-8") as f:
+                record = json.load(f)
+            # The slug can be shared by other paths that normalize the same way
+            if record.get("path") == path and _fixed_params(record.get("params")) == wanted:
+                return record
+    raise FixtureMissingError(f"No fixture recorded for {path}")
+
+
+def _simulate_latency():
+    delay = FMP_REPLAY_LATENCY_MS
+    if FMP_REPLAY_JITTER_MS:
+        delay += random.uniform(-FMP_REPLAY_JITTER_MS, FMP_REPLAY_JITTER_MS)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+
+def replay_json(path, params=None):
+    """Serve a recorded response body, with the configured simulated latency"""
+    record = load_fixture(path, params)
+    _simulate_latency()
+    return record["body"]
+
+
+def http_get_json(path, api_key, params=None, timeout=10, record=None):
+    """GET an FMP endpoint over the pooled session; saves a fixture when recording
+
+    Raises UpstreamServerError for 5xx responses so outages are not mistaken for data.
+    """
+    response = _session.get(build_url(path, api_key, params), timeout=timeout)
+    if response.status_code >= 500:
+        raise UpstreamServerError(f"{path} returned HTTP {response.status_code}", response=response)
+    body = loads(response.content)
+    if record is None:
+        record = FMP_MODE == "record"
+    if record:
+        try:
+            save_fixture(path, params, response.status_code, body)
+        except OSError as e:
+            print(f"Error recording fixture for {path}: {e}")
+    return body
+
+
+def expected_rows(params):
+    """Upper bound on daily bars for a from/to window (calendar days), or None if open-ended"""
+    try:
+        start = date.fromisoformat(str((params or {})["from"]))
+        end = date.fromisoformat(str(params.get("to") or date.today().isoformat()))
+    except (KeyError, ValueError):
+        return None
+    return max((end - start).days + 1, 1)
+
+
+def http_get_series(path, api_key, params=None, fields=("close",), timeout=15):
+    """GET a historical-price-full endpoint and stream its rows straight into numpy columns
+
+    Returns a dict of chronological arrays (dates plus `fields`), or None when the body has
+    no rows. Columns are preallocated from the from/to window.
+    """
+    with _session.get(build_url(path, api_key, params), timeout=timeout, stream=True) as response:
+        if response.status_code >= 500:
+            raise UpstreamServerError(f"{path} returned HTTP {response.status_code}", response=response)
+        return stream_columns(response.iter_content(CHUNK_BYTES), fields, expected_rows(params))
+
+
+def http_stream_lines(path, api_key, params=None, timeout=60):
+    """Yield the text lines of a (possibly very large) response without buffering it whole"""
+    with _session.get(build_url(path, api_key, params), timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            yield line
+
@@ -0,0 +1,364 @@
+"""
+Local columnar store of annual financial statements
+Bulk sources (FMP bulk CSV endpoints, or CSV/JSON dumps on disk) stream through a
+chunked column builder into one compressed .npz file per statement, sorted and indexed
+by symbol and fiscal year, so DCF and screening can run over a whole universe offline
+
+    python src/fundamentals_store.py --source fmp --api-key KEY --years 2019-2024
+    python src/fundamentals_store.py --source files --path dumps/
+    python src/fundamentals_store.py --info
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+
+import numpy as np
+
+from fmp_client import http_stream_lines
+
+FUNDAMENTALS_DIR = os.environ.get(
+    "FUNDAMENTALS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "fundamentals"),
+)
+
+# Statement name -> (FMP bulk endpoint, stored numeric fields)
+STATEMENTS = {
+    "income": ("income-statement-bulk", (
+        "revenue", "costOfRevenue", "grossProfit", "researchAndDevelopmentExpenses",
+        "sellingGeneralAndAdministrativeExpenses", "operatingExpenses", "interestExpense", "ebitda",
+        "operatingIncome", "incomeBeforeTax", "incomeTaxExpense", "netIncome", "eps", "epsdiluted",
+        "weightedAverageShsOut", "weightedAverageShsOutDil",
+    )),
+    "balance": ("balance-sheet-statement-bulk", (
+        "cashAndCashEquivalents", "shortTermInvestments", "netReceivables", "inventory",
+        "totalCurrentAssets", "propertyPlantEquipmentNet", "goodwill", "totalAssets",
+        "accountPayables", "shortTermDebt", "totalCurrentLiabilities", "longTermDebt",
+        "totalLiabilities", "totalStockholdersEquity", "totalDebt", "netDebt",
+    )),
+    "cash_flow": ("cash-flow-statement-bulk", (
+        "netIncome", "depreciationAndAmortization", "stockBasedCompensation", "changeInWorkingCapital",
+        "operatingCashFlow", "capitalExpenditure", "freeCashFlow", "dividendsPaid",
+        "commonStockRepurchased", "debtRepayment", "netChangeInCash", "cashAtEndOfPeriod",
+    )),
+}
+
+CHUNK_ROWS = 50_000
+# A year plus the filing window: once a symbol's newest stored fiscal year end is older than this,
+# a later annual report should exist and the store is out of date for that symbol
+FUNDAMENTALS_MAX_AGE_DAYS = int(os.environ.get("FUNDAMENTALS_MAX_AGE_DAYS", "456"))
+
+
+def superseded(fiscal_date, today=None):
+    """True when a later annual report should have been filed since the fiscal year ending on fiscal_date"""
+    try:
+        ended = date.fromisoformat(str(fiscal_date)[:10])
+    except ValueError:
+        return True
+    return (today or date.today()) - ended > timedelta(days=FUNDAMENTALS_MAX_AGE_DAYS)
+
+
+def _number(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ColumnBuilder:
+    """Accumulates statement rows column by column, freezing them into numpy chunks
+
+    Rows never pile up as dicts: each one is unpacked straight into typed arrays,
+    so memory stays proportional to the numeric payload.
+    """
+
+    def __init__(self, fields, chunk_rows=CHUNK_ROWS):
+        self.fields = fields
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.rows = 0
+        self._reset()
+
+    def _reset(self):
+        self._symbols = []
+        self._dates = []
+        self._years = array("i")
+        self._values = {field: array("d") for field in self.fields}
+
+    def add(self, row):
+        """Append one statement row (dict of strings or numbers); skips non-annual rows"""
+        symbol = (row.get("symbol") or "").strip().upper()
+        period = (row.get("period") or "FY").upper()
+        date = (row.get("date") or "")[:10]
+        year = row.get("calendarYear") or date[:4]
+        if not symbol or period not in ("FY", "ANNUAL") or not str(year).isdigit():
+            return
+        self._symbols.append(symbol)
+        self._dates.append(date)
+        self._years.append(int(year))
+        for field in self.fields:
+            self._values[field].append(_number(row.get(field)))
+        self.rows += 1
+        if len(self._symbols) >= self.chunk_rows:
+            self._freeze()
+
+    def _freeze(self):
+        if not self._symbols:
+            return
+        chunk = {"symbol": np.array(self._symbols), "date": np.array(self._dates, dtype="U10"),
+                 "year": np.frombuffer(self._years, dtype=np.int32).copy()}
+        for field in self.fields:
+            chunk[field] = np.frombuffer(self._values[field], dtype=np.float64).copy()
+        self.chunks.append(chunk)
+        self._reset()
+
+    def columns(self):
+        """All rows so far as one dict of arrays (unsorted, possibly with duplicates)"""
+        self._freeze()
+        if not self.chunks:
+            return None
+        return {key: np.concatenate([chunk[key] for chunk in self.chunks]) for key in self.chunks[0]}
+
+
+def _merge(existing, incoming, fields):
+    """Combine column sets, keeping the incoming row for a repeated (symbol, year), sorted"""
+    if existing is None:
+        merged = incoming
+    else:
+        merged = {"symbol": np.concatenate([existing["symbol"], incoming["symbol"]]),
+                  "date": np.concatenate([existing["date"], incoming["date"]]),
+                  "year": np.concatenate([existing["year"], incoming["year"]])}
+        for field in fields:
+            old = existing.get(field, np.full(len(existing["symbol"]), np.nan))
+            merged[field] = np.concatenate([old, incoming[field]])
+    n = len(merged["symbol"])
+    # Symbol ascending, year descending; among duplicates the later (incoming) row sorts first
+    order = np.lexsort((-np.arange(n), -merged["year"], merged["symbol"]))
+    symbols, years = merged["symbol"][order], merged["year"][order]
+    keep = np.ones(n, dtype=bool)
+    keep[1:] = (symbols[1:] != symbols[:-1]) | (years[1:] != years[:-1])
+    return {key: values[order][keep] for key, values in merged.items()}
+
+
+def _store_path(statement, directory):
+    return os.path.join(directory, f"{statement}.npz")
+
+
+def write_statement(statement, columns, directory=None):
+    """Merge columns into the statement file, replacing it atomically"""
+    directory = directory or FUNDAMENTALS_DIR
+    os.makedirs(directory, exist_ok=True)
+    fields = STATEMENTS[statement][1]
+    existing = read_statement(statement, directory)
+    merged = _merge(existing, columns, fields)
+    index_symbols, index_offsets = np.unique(merged["symbol"], return_index=True)
+    target = _store_path(statement, directory)
+    temp = f"{target}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        np.savez_compressed(f, index_symbols=index_symbols, index_offsets=index_offsets, **merged)
+    os.replace(temp, target)
+    return len(merged["symbol"])
+
+
+def read_statement(statement, directory=None):
+    """Every stored column for a statement, or None when nothing has been ingested"""
+    path = _store_path(statement, directory or FUNDAMENTALS_DIR)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def ingest(statement, rows, directory=None, chunk_rows=CHUNK_ROWS):
+    """Stream rows from any source into the store; returns (rows read, rows stored)"""
+    builder = ColumnBuilder(STATEMENTS[statement][1], chunk_rows)
+    for row in rows:
+        builder.add(row)
+    columns = builder.columns()
+    if columns is None:
+        return 0, 0
+    return builder.rows, write_statement(statement, columns, directory)
+
+
+def iter_csv_lines(lines):
+    """Dict rows from an iterable of CSV text lines"""
+    return csv.DictReader(lines)
+
+
+def iter_file(path):
+    """Dict rows from a CSV, JSON array or JSON lines dump (optionally gzipped)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    name = path[:-3] if path.endswith(".gz") else path
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if name.endswith(".csv"):
+            yield from iter_csv_lines(f)
+        elif name.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+
+
+def iter_fmp_bulk(statement, year, api_key):
+    """Dict rows for one fiscal year from the FMP bulk CSV endpoint, streamed"""
+    endpoint = STATEMENTS[statement][0]
+    return iter_csv_lines(http_stream_lines(f"/api/v4/{endpoint}", api_key,
+                                            {"year": year, "period": "annual"}, timeout=300))
+
+
+def dump_files(directory, statement):
+    """Dump files under a directory whose names mention the statement"""
+    names = {"income": ("income",), "balance": ("balance",), "cash_flow": ("cash_flow", "cash-flow", "cashflow")}
+    matches = []
+    for pattern in ("*.csv", "*.csv.gz", "*.json", "*.json.gz", "*.jsonl", "*.jsonl.gz"):
+        for path in glob.glob(os.path.join(glob.escape(directory), "**", pattern), recursive=True):
+            if any(n in os.path.basename(path).lower() for n in names[statement]):
+                matches.append(path)
+    return sorted(matches)
+
+
+class FundamentalsStore:
+    """Read side of the store, reloaded automatically when a statement file is rewritten"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or FUNDAMENTALS_DIR
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _table(self, statement):
+        path = _store_path(statement, self.directory)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._loaded.get(statement)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, read_statement(statement, self.directory))
+                self._loaded[statement] = cached
+            return cached[1]
+
+    def available(self, statement=None):
+        statements = [statement] if statement else list(STATEMENTS)
+        return any(os.path.exists(_store_path(s, self.directory)) for s in statements)
+
+    def symbols(self, statement):
+        table = self._table(statement)
+        return table["index_symbols"] if table is not None else np.array([], dtype=str)
+
+    def _span(self, table, symbol):
+        index = table["index_symbols"]
+        pos = int(np.searchsorted(index, symbol))
+        if pos >= len(index) or index[pos] != symbol:
+            return None
+        start = int(table["index_offsets"][pos])
+        end = int(table["index_offsets"][pos + 1]) if pos + 1 < len(index) else len(table["symbol"])
+        return start, end
+
+    def rows(self, statement, symbol, limit=None):
+        """FMP-shaped statement dicts for a symbol, most recent year first (missing fields omitted)"""
+        table = self._table(statement)
+        span = self._span(table, symbol) if table is not None else None
+        if span is None:
+            return []
+        start, end = span
+        if limit:
+            end = min(end, start + limit)
+        rows = []
+        for i in range(start, end):
+            row = {"symbol": symbol, "date": str(table["date"][i]), "calendarYear": str(table["year"][i]),
+                   "period": "FY"}
+            for field in STATEMENTS[statement][1]:
+                value = table[field][i]
+                if not np.isnan(value):
+                    row[field] = float(value)
+            rows.append(row)
+        return rows
+
+    def latest(self, statement, field):
+        """(symbols, values) holding each symbol's most recent fiscal year, for universe-wide math"""
+        table = self._table(statement)
+        if table is None:
+            return np.array([], dtype=str), np.array([])
+        return table["index_symbols"], table[field][table["index_offsets"]]
+
+    def column(self, statement, field, year):
+        """(symbols, values) for one fiscal year across the universe"""
+        table = self._table(statement)
+        if table is None:
+            return np.array([], dtype=str), np.array([])
+        rows = table["year"] == year
+        return table["symbol"][rows], table[field][rows]
+
+
+def _parse_years(text):
+    if "-" in text:
+        first, last = (int(part) for part in text.split("-", 1))
+        return list(range(first, last + 1))
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest annual statements into the local columnar store")
+    parser.add_argument("--source", choices=("fmp", "files"), help="FMP bulk endpoints or local dumps")
+    parser.add_argument("--api-key", default=os.environ.get("FMP_API_KEY", ""), help="FMP API key (fmp source)")
+    parser.add_argument("--years", default=str(time.localtime().tm_year - 1), help="e.g. 2019-2024 or 2022,2023")
+    parser.add_argument("--path", help="directory of CSV/JSON dumps (files source)")
+    parser.add_argument("--statements", default=",".join(STATEMENTS), help="comma separated subset")
+    parser.add_argument("--directory", default=FUNDAMENTALS_DIR, help="store location")
+    parser.add_argument("--info", action="store_true", help="describe the store and exit")
+    args = parser.parse_args(argv)
+
+    statements = [s.strip() for s in args.statements.split(",") if s.strip()]
+    unknown = [s for s in statements if s not in STATEMENTS]
+    if unknown:
+        parser.error(f"unknown statements {unknown}; choose from {list(STATEMENTS)}")
+
+    if args.info or not args.source:
+        for statement in statements:
+            table = read_statement(statement, args.directory)
+            if table is None:
+                print(f"{statement:<10} not ingested")
+                continue
+            years = table["year"]
+            size = os.path.getsize(_store_path(statement, args.directory))
+            outdated = sum(superseded(d) for d in table["date"][table["index_offsets"]])
+            print(f"{statement:<10} {len(years):>9} rows {len(table['index_symbols']):>7} symbols "
+                  f"years {years.min()}-{years.max()} {size / 1024 / 1024:.2f} MiB, {outdated} symbols out of date")
+        return 0
+
+    for statement in statements:
+        started = time.perf_counter()
+        if args.source == "fmp":
+            if not args.api_key:
+                parser.error("--api-key (or FMP_API_KEY) is required for the fmp source")
+            years = _parse_years(args.years)
+            rows = (row for year in years for row in iter_fmp_bulk(statement, year, args.api_key))
+        else:
+            if not args.path:
+                parser.error("--path is required for the files source")
+            rows = (row for path in dump_files(args.path, statement) for row in iter_file(path))
+        try:
+            read, stored = ingest(statement, rows, args.directory)
+        except Exception as e:
+            print(f"Error ingesting {statement}: {e}")
+            return 1
+        print(f"{statement:<10} read {read} rows, store now holds {stored} "
+              f"({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
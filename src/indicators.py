@@ -0,0 +1,286 @@
+"""
+Incremental indicator state for live updates
+Each indicator updates in O(1) per new bar (update) or per intrabar tick (revise),
+and round-trips through plain dicts so it can be stored in the cache
+"""
+
+import math
+from collections import deque
+
+
+class EmaState:
+    """Exponential moving average matching pandas ewm(span=..., adjust=False)"""
+
+    __slots__ = ("span", "alpha", "value", "previous", "count")
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+        self.previous = None
+        self.count = 0
+
+    def update(self, price):
+        """Add a new bar and return the current EMA"""
+        self.previous = self.value
+        self.value = price if self.value is None else self.value + self.alpha * (price - self.value)
+        self.count += 1
+        return self.value
+
+    def revise(self, price):
+        """Replace the latest bar's price (intrabar tick) and return the current EMA"""
+        if self.count == 0:
+            return self.update(price)
+        base = self.previous
+        self.value = price if base is None else base + self.alpha * (price - base)
+        return self.value
+
+    @property
+    def ready(self):
+        # calculate_ema only reports values once a full span of bars exists
+        return self.count >= self.span
+
+    def to_dict(self):
+        return {"type": "ema", "span": self.span, "value": self.value,
+                "previous": self.previous, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state["span"])
+        ema.value = state["value"]
+        ema.previous = state["previous"]
+        ema.count = state["count"]
+        return ema
+
+
+class RollingStats:
+    """Rolling mean and sample standard deviation over a fixed window (Welford-style)"""
+
+    __slots__ = ("window", "values", "mean", "m2")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _add(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    def _replace(self, old, new):
+        # Swap one sample for another without changing the count
+        n = len(self.values)
+        old_mean = self.mean
+        self.mean += (new - old) / n
+        self.m2 += (new - old) * (new - self.mean + old - old_mean)
+        if self.m2 < 0:
+            self.m2 = 0.0
+
+    def update(self, price):
+        """Add a new bar, dropping the oldest once the window is full"""
+        if len(self.values) < self.window:
+            self._add(price)
+        else:
+            oldest = self.values.popleft()
+            self.values.append(price)
+            self._replace(oldest, price)
+        return self.mean
+
+    def revise(self, price):
+        """Replace the latest bar's price (intrabar tick)"""
+        if not self.values:
+            return self.update(price)
+        old = self.values[-1]
+        self.values[-1] = price
+        self._replace(old, price)
+        return self.mean
+
+    @property
+    def ready(self):
+        return len(self.values) >= self.window
+
+    @property
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(self.m2 / (n - 1)) if n > 1 else None
+
+    def to_dict(self):
+        return {"type": "rolling", "window": self.window, "values": list(self.values),
+                "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(state["window"])
+        stats.values = deque(state["values"])
+        stats.mean = state["mean"]
+        stats.m2 = state["m2"]
+        return stats
+
+
+class BollingerState:
+    """Bollinger Bands (SMA ± num_std sample standard deviations) on rolling stats"""
+
+    __slots__ = ("num_std", "stats")
+
+    def __init__(self, window=20, num_std=2):
+        self.num_std = num_std
+        self.stats = RollingStats(window)
+
+    def update(self, price):
+        self.stats.update(price)
+        return self.bands()
+
+    def revise(self, price):
+        self.stats.revise(price)
+        return self.bands()
+
+    @property
+    def ready(self):
+        return self.stats.ready
+
+    def bands(self):
+        """(sma, upper, lower), or Nones until the window is full"""
+        if not self.ready:
+            return None, None, None
+        sma = self.stats.mean
+        width = self.stats.std * self.num_std
+        return sma, sma + width, sma - width
+
+    def to_dict(self):
+        return {"type": "bollinger", "num_std": self.num_std, "stats": self.stats.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        bollinger = cls(state["stats"]["window"], state["num_std"])
+        bollinger.stats = RollingStats.from_dict(state["stats"])
+        return bollinger
+
+
+class RsiState:
+    """Relative Strength Index with Wilder smoothing"""
+
+    __slots__ = ("period", "avg_gain", "avg_loss", "last_close", "count", "_undo")
+
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.last_close = None
+        self.count = 0
+        self._undo = None
+
+    def _apply(self, price):
+        if self.last_close is not None:
+            change = price - self.last_close
+            gain = max(change, 0.0)
+            loss = max(-change, 0.0)
+            self.count += 1
+            if self.count <= self.period:
+                # Seed with a simple average of the first period changes
+                self.avg_gain += (gain - self.avg_gain) / self.count
+                self.avg_loss += (loss - self.avg_loss) / self.count
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        self.last_close = price
+
+    def update(self, price):
+        """Add a new bar and return the current RSI (None while warming up)"""
+        self._undo = (self.avg_gain, self.avg_loss, self.last_close, self.count)
+        self._apply(price)
+        return self.value
+
+    def revise(self, price):
+        """Replace the latest bar's price (intrabar tick)"""
+        if self._undo is None:
+            return self.update(price)
+        self.avg_gain, self.avg_loss, self.last_close, self.count = self._undo
+        self._apply(price)
+        return self.value
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+    @property
+    def value(self):
+        if not self.ready:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+    def to_dict(self):
+        return {"type": "rsi", "period": self.period, "avg_gain": self.avg_gain,
+                "avg_loss": self.avg_loss, "last_close": self.last_close, "count": self.count,
+                "undo": list(self._undo) if self._undo else None}
+
+    @classmethod
+    def from_dict(cls, state):
+        rsi = cls(state["period"])
+        rsi.avg_gain = state["avg_gain"]
+        rsi.avg_loss = state["avg_loss"]
+        rsi.last_close = state["last_close"]
+        rsi.count = state["count"]
+        rsi._undo = tuple(state["undo"]) if state.get("undo") else None
+        return rsi
+
+
+class IndicatorSet:
+    """The dashboard overlays (EMA 20/50/200, Bollinger 20/2, RSI 14) for one symbol"""
+
+    def __init__(self, ema_spans=(20, 50, 200), bb_window=20, bb_std=2, rsi_period=14):
+        self.emas = {span: EmaState(span) for span in ema_spans}
+        self.bollinger = BollingerState(bb_window, bb_std)
+        self.rsi = RsiState(rsi_period)
+        self.bars = 0
+
+    @classmethod
+    def from_closes(cls, closes, **kwargs):
+        """Seed the state from a close history, skipping missing (None or NaN) closes"""
+        state = cls(**kwargs)
+        for price in closes:
+            if price is not None and not math.isnan(price):
+                state.update(price)
+        return state
+
+    def _parts(self):
+        return list(self.emas.values()) + [self.bollinger, self.rsi]
+
+    def update(self, price):
+        """Add a new bar and return the latest overlay values"""
+        for part in self._parts():
+            part.update(price)
+        self.bars += 1
+        return self.latest()
+
+    def revise(self, price):
+        """Apply an intrabar tick to the latest bar and return the latest overlay values"""
+        if self.bars == 0:
+            return self.update(price)
+        for part in self._parts():
+            part.revise(price)
+        return self.latest()
+
+    def latest(self):
+        sma, upper, lower = self.bollinger.bands()
+        values = {f"ema{span}": (ema.value if ema.ready else None) for span, ema in self.emas.items()}
+        values.update({"sma": sma, "bb_upper": upper, "bb_lower": lower, "rsi": self.rsi.value})
+        return values
+
+    def to_dict(self):
+        return {"bars": self.bars, "emas": [ema.to_dict() for ema in self.emas.values()],
+                "bollinger": self.bollinger.to_dict(), "rsi": self.rsi.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = cls(ema_spans=())
+        indicators.emas = {s["span"]: EmaState.from_dict(s) for s in state["emas"]}
+        indicators.bollinger = BollingerState.from_dict(state["bollinger"])
+        indicators.rsi = RsiState.from_dict(state["rsi"])
+        indicators.bars = state["bars"]
+        return indicators
@@ -0,0 +1,126 @@
+"""
+Fast and streaming JSON decoding for upstream payloads
+loads() uses orjson when it is installed and the standard library otherwise. Price
+histories skip the dict-per-row stage: the `historical` array is decoded a run of rows at
+a time as bytes arrive, and only the requested fields are copied into preallocated numpy
+columns, so peak memory follows the network chunk size rather than the payload
+"""
+
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DECODER = "orjson" if orjson is not None else "json"
+CHUNK_BYTES = 64 * 1024
+# Starting column length when the row count cannot be estimated
+DEFAULT_CAPACITY = 4096
+
+
+def loads(data):
+    """Decode a JSON document from bytes or str with the fastest available decoder"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is strict (no NaN/Infinity literals); the standard library is not
+            pass
+    return json.loads(data)
+
+
+class ColumnBuffer:
+    """Typed columns that rows are copied into, growing by doubling past the capacity"""
+
+    def __init__(self, fields, capacity=None):
+        self.fields = fields
+        self.size = 0
+        capacity = max(int(capacity or DEFAULT_CAPACITY), 16)
+        self.dates = np.empty(capacity, dtype="datetime64[D]")
+        self.columns = {field: np.empty(capacity, dtype=np.float64) for field in fields}
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self.dates)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, values in [("dates", self.dates)] + list(self.columns.items()):
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            if name == "dates":
+                self.dates = grown
+            else:
+                self.columns[name] = grown
+
+    def extend(self, rows):
+        """Copy the wanted fields of a list of row dicts; missing and null values become NaN"""
+        if not rows:
+            return
+        self._reserve(len(rows))
+        start, end = self.size, self.size + len(rows)
+        self.dates[start:end] = [row["date"][:10] for row in rows]
+        for field, values in self.columns.items():
+            values[start:end] = np.array([row.get(field) for row in rows], dtype=np.float64)
+        self.size = end
+
+    def series(self):
+        """Trimmed columns in chronological order (FMP sends the newest row first), or None if empty"""
+        if not self.size:
+            return None
+        series = {"dates": self.dates[:self.size][::-1].copy()}
+        for field, values in self.columns.items():
+            series[field] = values[:self.size][::-1].copy()
+        return series
+
+
+def columns_from_body(body, fields, capacity=None):
+    """Series from an already decoded historical-price-full body, or None without rows"""
+    rows = body.get("historical") if isinstance(body, dict) else None
+    if not rows:
+        return None
+    buffer = ColumnBuffer(fields, capacity or len(rows))
+    buffer.extend(rows)
+    return buffer.series()
+
+
+def stream_columns(chunks, fields, capacity=None):
+    """Series from the byte chunks of a historical-price-full response, or None without rows
+
+    Rows are flat objects (no brackets or braces inside their strings), so every
+    complete run of them in the buffer is wrapped in brackets and decoded in one call,
+    and the first closing bracket ends the array. A payload without a `historical`
+    array (an error body, or {} for an unknown symbol) is decoded whole.
+    """
+    buffer = bytearray()
+    chunks = iter(chunks)
+    for chunk in chunks:
+        buffer += chunk
+        key = buffer.find(b'"historical"')
+        bracket = buffer.find(b"[", key) if key >= 0 else -1
+        if bracket >= 0:
+            del buffer[:bracket + 1]
+            break
+    else:
+        return columns_from_body(loads(bytes(buffer)), fields, capacity) if buffer.strip() else None
+
+    columns = ColumnBuffer(fields, capacity)
+    while True:
+        close = buffer.find(b"]")
+        end = close if close >= 0 else buffer.rfind(b"}") + 1
+        if end > 0:
+            run = bytes(buffer[:end]).strip().strip(b",")
+            if run:
+                columns.extend(loads(b"[" + run + b"]"))
+            del buffer[:end]
+        if close >= 0:
+            break
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("historical array ended early")
+        buffer += chunk
+    return columns.series()
@@ -0,0 +1,275 @@
+"""
+Live quote fan-out for the dashboard
+One background poller fetches batched quotes for every subscribed symbol and pushes
+the deltas, with incrementally updated overlays, to each connected client's queue.
+Streams are opened with the token handed out when a page tracked its symbols, polls
+spend the API key of a connected subscriber, and state nobody watches is dropped. A
+dropped symbol's overlay state is kept in the provider cache (as IndicatorSet.to_dict())
+and picked up again when the symbol is next tracked
+"""
+
+import os
+import queue
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+from indicators import IndicatorSet
+from provider import get_provider
+
+QUOTE_POLL_SECONDS = float(os.environ.get("QUOTE_POLL_SECONDS", "5"))
+QUOTE_BATCH_SIZE = 50
+# Per-client buffer; slow clients drop old deltas instead of growing without bound
+CLIENT_QUEUE_SIZE = 100
+# Symbols and page tokens without a connected client are forgotten after this long
+QUOTE_IDLE_SECONDS = float(os.environ.get("QUOTE_IDLE_SECONDS", "300"))
+# How long a pruned symbol's overlay state stays in the provider cache
+INDICATOR_STATE_TTL = float(os.environ.get("INDICATOR_STATE_TTL", str(24 * 60 * 60)))
+
+
+def _state_key(symbol):
+    return ("indicator-state", symbol)
+
+
+def save_indicator_state(symbol, last_date, indicators):
+    """Store a symbol's overlay state in the provider cache as plain dicts"""
+    state = {"last_date": last_date, "indicators": indicators.to_dict()}
+    get_provider().cache.set(_state_key(symbol), state, INDICATOR_STATE_TTL)
+
+
+def load_indicator_state(symbol):
+    """(last_date, IndicatorSet) saved for a symbol, or (None, None)"""
+    state = get_provider().cache.get(_state_key(symbol))
+    if state is None:
+        return None, None
+    return state["last_date"], IndicatorSet.from_dict(state["indicators"])
+
+
+class _TrackedSymbol:
+    """Poll state for one symbol; subscribers map each client queue to its viewer's API key"""
+
+    __slots__ = ("last_date", "indicators", "last_quote", "subscribers", "idle_since")
+
+    def __init__(self):
+        self.last_date = None
+        self.indicators = None
+        self.last_quote = None
+        self.subscribers = {}
+        self.idle_since = time.monotonic()
+
+
+class _Viewer:
+    """A page's stream token: the API key and symbols it tracked"""
+
+    __slots__ = ("api_key", "symbols", "clients", "idle_since")
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.symbols = set()
+        self.clients = 0
+        self.idle_since = time.monotonic()
+
+
+class QuoteHub:
+    """Shares one upstream quote poll between every viewer of a symbol"""
+
+    def __init__(self, poll_seconds=QUOTE_POLL_SECONDS, batch_size=QUOTE_BATCH_SIZE, idle_seconds=QUOTE_IDLE_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.idle_seconds = idle_seconds
+        self._symbols = {}
+        self._viewers = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def track(self, symbol, api_key, token=None):
+        """Register a symbol for polling on behalf of a page; returns the token its stream must present
+
+        Passing an earlier token adds the symbol to that page's token.
+        """
+        self.prune()
+        with self._lock:
+            if symbol not in self._symbols:
+                tracked = self._symbols[symbol] = _TrackedSymbol()
+                tracked.last_date, tracked.indicators = load_indicator_state(symbol)
+            viewer = self._viewers.get(token)
+            if viewer is None or viewer.api_key != api_key:
+                token = secrets.token_urlsafe(16)
+                viewer = self._viewers[token] = _Viewer(api_key)
+            viewer.symbols.add(symbol)
+            return token
+
+    def seed(self, symbol, dates, closes):
+        """Seed a tracked symbol's overlays from the chart history"""
+        if not (dates and closes):
+            return
+        with self._lock:
+            tracked = self._symbols.get(symbol)
+            if tracked is not None:
+                tracked.last_date = dates[-1]
+                tracked.indicators = IndicatorSet.from_closes(closes)
+
+    def subscribe(self, symbols, token):
+        """Return a queue receiving deltas for the token's symbols among `symbols`, or None if there are none"""
+        client = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        with self._lock:
+            viewer = self._viewers.get(token)
+            if viewer is None:
+                return None
+            matched = [s for s in symbols if s in viewer.symbols and s in self._symbols]
+            if not matched:
+                return None
+            for symbol in matched:
+                tracked = self._symbols[symbol]
+                tracked.subscribers[client] = viewer.api_key
+                tracked.idle_since = None
+                if tracked.last_quote:
+                    client.put_nowait(tracked.last_quote)
+            viewer.clients += 1
+            viewer.idle_since = None
+            self._clients[client] = (token, matched)
+        self._ensure_running()
+        return client
+
+    def unsubscribe(self, client):
+        now = time.monotonic()
+        with self._lock:
+            token, symbols = self._clients.pop(client, (None, ()))
+            for symbol in symbols:
+                tracked = self._symbols.get(symbol)
+                if tracked is not None:
+                    tracked.subscribers.pop(client, None)
+                    if not tracked.subscribers:
+                        tracked.idle_since = now
+            viewer = self._viewers.get(token)
+            if viewer is not None:
+                viewer.clients -= 1
+                if viewer.clients <= 0:
+                    viewer.idle_since = now
+
+    def prune(self, now=None):
+        """Forget symbols and tokens that have had no connected client for idle_seconds
+
+        Overlay state of a forgotten symbol is saved to the provider cache first.
+        """
+        now = time.monotonic() if now is None else now
+        pruned = []
+        with self._lock:
+            for token, viewer in list(self._viewers.items()):
+                if viewer.idle_since is not None and now - viewer.idle_since > self.idle_seconds:
+                    del self._viewers[token]
+            for symbol, tracked in list(self._symbols.items()):
+                if tracked.idle_since is not None and now - tracked.idle_since > self.idle_seconds:
+                    del self._symbols[symbol]
+                    if tracked.indicators is not None:
+                        pruned.append((symbol, tracked.last_date, tracked.indicators))
+        for symbol, last_date, indicators in pruned:
+            save_indicator_state(symbol, last_date, indicators)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def stop(self):
+        self._stop.set()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="quote-hub", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.prune()
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling live quotes: {e}")
+            self._stop.wait(max(self.poll_seconds - (time.monotonic() - started), 0.1))
+
+    def _batches(self):
+        """[(api_key, [symbols])] for every symbol that has at least one viewer
+
+        Each symbol is polled with the key of its longest-connected subscriber, so a key
+        is only spent while its owner has a stream open.
+        """
+        by_key = {}
+        with self._lock:
+            for symbol, tracked in self._symbols.items():
+                if tracked.subscribers:
+                    by_key.setdefault(next(iter(tracked.subscribers.values())), []).append(symbol)
+        for api_key, symbols in by_key.items():
+            for i in range(0, len(symbols), self.batch_size):
+                yield api_key, symbols[i:i + self.batch_size]
+
+    def poll_once(self):
+        """Fetch one round of batched quotes and fan out the changes"""
+        for api_key, symbols in self._batches():
+            for quote in get_provider().quotes(symbols, api_key):
+                delta = self._apply_quote(quote)
+                if delta:
+                    self._publish(quote.get("symbol"), delta)
+
+    def _apply_quote(self, quote):
+        """Update a symbol's state from a quote; returns the delta or None if unchanged"""
+        symbol = quote.get("symbol")
+        price = quote.get("price")
+        with self._lock:
+            tracked = self._symbols.get(symbol)
+            if tracked is None or price is None:
+                return None
+            previous = tracked.last_quote
+            if previous and previous["price"] == price and previous["volume"] == quote.get("volume"):
+                return None
+
+            timestamp = quote.get("timestamp") or time.time()
+            date = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+            new_bar = tracked.last_date is None or date > tracked.last_date
+            overlays = {}
+            if tracked.indicators is not None:
+                if new_bar:
+                    overlays = tracked.indicators.update(price)
+                elif date == tracked.last_date:
+                    overlays = tracked.indicators.revise(price)
+            if new_bar:
+                tracked.last_date = date
+
+            delta = {
+                "symbol": symbol,
+                "date": date,
+                "new_bar": new_bar,
+                "price": price,
+                "change": quote.get("change"),
+                "changesPercentage": quote.get("changesPercentage"),
+                "volume": quote.get("volume"),
+                "dayLow": quote.get("dayLow"),
+                "dayHigh": quote.get("dayHigh"),
+                "open": quote.get("open"),
+                "timestamp": timestamp,
+                "indicators": overlays,
+            }
+            tracked.last_quote = delta
+            return delta
+
+    def _publish(self, symbol, delta):
+        with self._lock:
+            tracked = self._symbols.get(symbol)
+            subscribers = list(tracked.subscribers) if tracked is not None else []
+        for client in subscribers:
+            try:
+                client.put_nowait(delta)
+            except queue.Full:
+                try:
+                    client.get_nowait()
+                    client.put_nowait(delta)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+quote_hub = QuoteHub()
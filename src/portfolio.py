@@ -0,0 +1,194 @@
+"""
+Multi-symbol price matrix and portfolio risk analytics
+Closes for N symbols are aligned on a shared date axis (NaN where a symbol has no bar),
+and returns, volatility, correlation/covariance, drawdowns and beta are computed with
+pairwise-complete numpy matrix operations
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from provider import get_provider
+from timeframes import get_ohlcv, normalize_range
+
+TRADING_DAYS = 252
+DEFAULT_BENCHMARK = "SPY"
+PORTFOLIO_WORKERS = int(os.environ.get("PORTFOLIO_WORKERS", "16"))
+PORTFOLIO_CACHE_SECONDS = 15 * 60
+# Pairs with fewer overlapping returns than this get a NaN correlation
+MIN_OVERLAP = 20
+
+
+def align_closes(series_by_symbol):
+    """Union date axis plus a (dates x symbols) close matrix with NaN for missing bars
+
+    Every symbol's bars are scattered into the matrix in one step: the concatenated
+    dates are ranked once by np.unique and the closes land at (rank, column).
+    """
+    symbols = [s for s, series in series_by_symbol.items() if series is not None and len(series["dates"])]
+    if not symbols:
+        return np.array([], dtype="datetime64[D]"), [], np.empty((0, 0))
+    lengths = [len(series_by_symbol[s]["dates"]) for s in symbols]
+    dates, rows = np.unique(np.concatenate([series_by_symbol[s]["dates"] for s in symbols]), return_inverse=True)
+    columns = np.repeat(np.arange(len(symbols)), lengths)
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    matrix[rows, columns] = np.concatenate([series_by_symbol[s]["close"] for s in symbols])
+    return dates, symbols, matrix
+
+
+def forward_fill(matrix):
+    """Carry the last observed close across gaps, leaving the pre-listing head as NaN"""
+    valid = ~np.isnan(matrix)
+    rows = np.where(valid, np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = matrix[rows, np.arange(matrix.shape[1])]
+    started = np.logical_or.accumulate(valid, axis=0)
+    return np.where(started, filled, np.nan)
+
+
+def simple_returns(prices):
+    """Period returns of a filled price matrix; the first row and pre-listing rows are NaN"""
+    returns = np.full(prices.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = prices[1:] / prices[:-1] - 1
+    return returns
+
+
+def pairwise_cov(returns):
+    """Covariance, correlation and overlap counts using every pair's common observations
+
+    The four products below replace an N^2 loop of masked dot products, so a 500 x 500
+    matrix over ten years of returns stays a handful of BLAS calls.
+    """
+    mask = (~np.isnan(returns)).astype(np.float64)
+    x = np.where(mask > 0, returns, 0.0)
+    counts = mask.T @ mask
+    sums = x.T @ mask                    # sums[i, j]: sum of x_i where both i and j observed
+    squares = (x * x).T @ mask
+    cross = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (cross - sums * sums.T / counts) / (counts - 1)
+        var_i = (squares - sums * sums / counts) / (counts - 1)
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[counts < MIN_OVERLAP] = np.nan
+    cov[counts < 2] = np.nan
+    return cov, np.clip(corr, -1.0, 1.0), counts
+
+
+def drawdowns(prices):
+    """Drawdown from the running peak for each column, and each column's maximum drawdown"""
+    peaks = np.fmax.accumulate(prices, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = prices / peaks - 1
+    all_nan = np.isnan(drawdown).all(axis=0)
+    max_drawdown = np.full(prices.shape[1], np.nan)
+    if (~all_nan).any():
+        max_drawdown[~all_nan] = np.nanmin(drawdown[:, ~all_nan], axis=0)
+    return drawdown, max_drawdown
+
+
+def betas(returns, benchmark_returns):
+    """Beta of every column against a benchmark return series over their common dates"""
+    both = ~np.isnan(returns) & ~np.isnan(benchmark_returns)[:, None]
+    counts = both.sum(axis=0)
+    x = np.where(both, returns, 0.0)
+    b = np.where(both, benchmark_returns[:, None], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = x.sum(axis=0) / counts
+        mean_b = b.sum(axis=0) / counts
+        cov = ((x - mean_x) * (b - mean_b) * both).sum(axis=0) / (counts - 1)
+        var = (((b - mean_b) * both) ** 2).sum(axis=0) / (counts - 1)
+        beta = cov / var
+    beta[counts < MIN_OVERLAP] = np.nan
+    return beta
+
+
+def analyze(dates, symbols, closes, benchmark=None):
+    """Risk statistics for an aligned close matrix; benchmark is a close column or None"""
+    prices = forward_fill(closes)
+    returns = simple_returns(prices)
+    # Returns across a gap would credit several days' move to one bar; use observed bars only
+    returns[1:][np.isnan(closes[1:]) | np.isnan(closes[:-1])] = np.nan
+    cov, corr, _ = pairwise_cov(returns)
+    _, max_drawdown = drawdowns(prices)
+    observed = (~np.isnan(returns)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        first = prices[np.argmax(~np.isnan(prices), axis=0), np.arange(prices.shape[1])]
+        last = prices[-1] if len(prices) else np.full(len(symbols), np.nan)
+        total_return = last / first - 1
+        years = observed / TRADING_DAYS
+        annual_return = np.where(years > 0, (1 + total_return) ** (1 / years) - 1, np.nan)
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 \
+            else np.full(len(symbols), np.nan)
+        sharpe = annual_return / volatility
+    beta = np.full(len(symbols), np.nan)
+    if benchmark is not None:
+        bench_prices = forward_fill(benchmark[:, None])[:, 0]
+        bench_returns = simple_returns(bench_prices[:, None])[:, 0]
+        bench_returns[1:][np.isnan(benchmark[1:]) | np.isnan(benchmark[:-1])] = np.nan
+        beta = betas(returns, bench_returns)
+    return {
+        "dates": dates,
+        "symbols": symbols,
+        "total_return": total_return,
+        "annual_return": annual_return,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+        "beta": beta,
+        "covariance": cov * TRADING_DAYS,
+        "correlation": corr,
+        "observations": observed,
+    }
+
+
+def load_closes(symbols, api_key, period, workers=PORTFOLIO_WORKERS):
+    """Daily close series per symbol, fetched in parallel through the shared OHLCV cache"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        series = pool.map(lambda s: get_ohlcv(s, api_key, period, "daily"), symbols)
+        return dict(zip(symbols, series))
+
+
+def portfolio_analysis(symbols, api_key, period="1Y", benchmark=DEFAULT_BENCHMARK):
+    """Cached analytics for a symbol list over a range, with beta against `benchmark`"""
+    period = normalize_range(period)
+    symbols = list(dict.fromkeys(symbols))
+    benchmark = (benchmark or "").upper() or None
+
+    def build():
+        wanted = symbols + ([benchmark] if benchmark and benchmark not in symbols else [])
+        series = load_closes(wanted, api_key, period)
+        dates, loaded, closes = align_closes(series)
+        if not loaded:
+            return None
+        bench_column = closes[:, loaded.index(benchmark)] if benchmark in loaded else None
+        keep = [i for i, s in enumerate(loaded) if s in symbols]
+        result = analyze(dates, [loaded[i] for i in keep], closes[:, keep], bench_column)
+        result["missing"] = [s for s in symbols if s not in loaded]
+        result["benchmark"] = benchmark if bench_column is not None else None
+        return result
+
+    key = ("portfolio", tuple(symbols), period, benchmark)
+    return get_provider().cached(key, PORTFOLIO_CACHE_SECONDS, build)
+
+
+def _rounded(values, digits=4):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def summary_rows(result):
+    """Per-symbol statistics as template rows, NaN as None"""
+    columns = ("total_return", "annual_return", "volatility", "sharpe", "max_drawdown", "beta")
+    rounded = {column: _rounded(result[column]) for column in columns}
+    return [dict({"symbol": symbol, "observations": int(result["observations"][i])},
+                 **{column: rounded[column][i] for column in columns})
+            for i, symbol in enumerate(result["symbols"])]
+
+
+def heatmap_data(result, digits=3):
+    """Correlation matrix as nested lists for a Plotly heatmap (null for undefined pairs)"""
+    corr = np.round(result["correlation"], digits)
+    return {"symbols": result["symbols"],
+            "z": [[None if np.isnan(v) else float(v) for v in row] for row in corr]}
@@ -0,0 +1,12 @@
+"""
+Unified market data provider
+Both frontends fetch through get_provider() so they share one cache,
+connection pool and rate limiter, whichever backend is configured
+"""
+
+from .backends import DiskStoreBackend, FixtureBackend, LiveBackend, is_error_body, make_backend
+from .cache import POLICIES, TTLCache, approx_size
+from .core import DataProvider, get_provider, parse_historical
+from .ratelimit import RateLimiter
+from .resilience import (PAGE_DEADLINE_SECONDS, CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline,
+                         remaining)
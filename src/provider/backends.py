@@ -0,0 +1,104 @@
+"""
+Pluggable data sources behind the provider
+Every backend exposes fetch(path, params, api_key, timeout, ttl) returning decoded JSON,
+and fetch_series(path, params, api_key, timeout, ttl, fields) returning a price history
+as numpy columns (or None)
+"""
+
+import os
+import time
+
+import fmp_client
+from fmp_client import (FixtureMissingError, expected_rows, http_get_json, http_get_series, load_fixture, replay_json,
+                        save_fixture)
+from jsonstream import columns_from_body
+
+FMP_STORE_DIR = os.environ.get(
+    "FMP_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "fmp_store"),
+)
+
+
+def is_error_body(body):
+    """FMP reports failures as a JSON object with an error message"""
+    return isinstance(body, dict) and ("Error Message" in body or "error" in body)
+
+
+class LiveBackend:
+    """Calls the FMP API over the shared pooled session"""
+
+    name = "live"
+
+    def __init__(self, record=False):
+        self.record = record
+
+    def fetch(self, path, params, api_key, timeout, ttl=None):
+        return http_get_json(path, api_key, params, timeout, record=self.record)
+
+    def fetch_series(self, path, params, api_key, timeout, ttl, fields):
+        if self.record:
+            # Recording needs the whole body for the fixture
+            return columns_from_body(self.fetch(path, params, api_key, timeout, ttl), fields, expected_rows(params))
+        return http_get_series(path, api_key, params, fields, timeout)
+
+
+class FixtureBackend:
+    """Serves recorded fixtures only (FMP_MODE=replay)"""
+
+    name = "replay"
+
+    def fetch(self, path, params, api_key, timeout, ttl=None):
+        return replay_json(path, params)
+
+    def fetch_series(self, path, params, api_key, timeout, ttl, fields):
+        return columns_from_body(self.fetch(path, params, api_key, timeout, ttl), fields)
+
+
+class DiskStoreBackend:
+    """On-disk response store in front of another backend
+
+    Processes pointed at the same directory share fetched responses, so running
+    the Flask and Streamlit frontends side by side does not double upstream calls.
+    """
+
+    name = "store"
+
+    def __init__(self, upstream=None, directory=FMP_STORE_DIR):
+        self.upstream = upstream or LiveBackend()
+        self.directory = directory
+
+    def _read(self, path, params, ttl):
+        try:
+            record = load_fixture(path, params, directory=self.directory, fallback=False)
+        except (FixtureMissingError, OSError, ValueError):
+            return None
+        recorded_at = time.mktime(time.strptime(record["recorded_at"], "%Y-%m-%dT%H:%M:%S"))
+        if ttl is not None and time.time() - recorded_at > ttl:
+            return None
+        return record
+
+    def fetch(self, path, params, api_key, timeout, ttl=None):
+        record = self._read(path, params, ttl)
+        if record is not None:
+            return record["body"]
+        body = self.upstream.fetch(path, params, api_key, timeout, ttl)
+        if not is_error_body(body):
+            try:
+                save_fixture(path, params, 200, body, directory=self.directory)
+            except OSError as e:
+                print(f"Error writing response store for {path}: {e}")
+        return body
+
+    def fetch_series(self, path, params, api_key, timeout, ttl, fields):
+        # The store keeps whole bodies, so there is nothing to stream
+        return columns_from_body(self.fetch(path, params, api_key, timeout, ttl), fields)
+
+
+def make_backend(mode=None):
+    """Backend for an FMP_MODE value (live, record, replay or store)"""
+    mode = (mode or fmp_client.FMP_MODE).lower()
+    if mode == "replay":
+        return FixtureBackend()
+    if mode == "store":
+        return DiskStoreBackend()
+    return LiveBackend(record=(mode == "record"))
@@ -0,0 +1,476 @@
+"""
+In-process response cache shared by everything that talks to FMP
+Bounded by approximate bytes rather than entry count, since a quote is about 1 KB while
+a price history can be hundreds of KB, with a pluggable eviction policy
+"""
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import numpy as np
+
+from .resilience import DeadlineExceeded, remaining
+
+# Memory ceiling per process (each worker has its own cache)
+PROVIDER_CACHE_MB = float(os.environ.get("PROVIDER_CACHE_MB", "256"))
+PROVIDER_CACHE_POLICY = os.environ.get("PROVIDER_CACHE_POLICY", "tinylfu").lower()
+REFRESH_WORKERS = int(os.environ.get("PROVIDER_REFRESH_WORKERS", "4"))
+
+_MISSING = object()
+# Ages of the stale entries served inside the current staleness() block
+_stale_log = ContextVar("stale_log", default=None)
+
+
+def approx_size(value, _depth=0):
+    """Rough retained size of a cached value in bytes
+
+    Counts array buffers and walks containers a few levels deep; shared objects such as
+    interned strings are counted every time, so this errs on the large side.
+    """
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) if value.base is None else value.nbytes + 112
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if isinstance(value, array):
+        return sys.getsizeof(value)
+    if _depth > 4:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1)
+                                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(approx_size(item, _depth + 1) for item in value)
+    slots = getattr(type(value), "__slots__", None)
+    if slots is not None and not hasattr(value, "__dict__"):
+        names = {name for cls in type(value).__mro__ for name in getattr(cls, "__slots__", ())}
+        return sys.getsizeof(value) + sum(approx_size(getattr(value, name, None), _depth + 1) for name in names)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + approx_size(vars(value), _depth + 1)
+    return sys.getsizeof(value)
+
+
+class LRUPolicy:
+    """Evict the least recently used entry"""
+
+    name = "lru"
+
+    def __init__(self, max_bytes):
+        self._order = OrderedDict()
+
+    def record(self, key):
+        pass
+
+    def on_hit(self, key):
+        self._order.move_to_end(key)
+
+    def on_insert(self, key, size):
+        self._order[key] = size
+        self._order.move_to_end(key)
+
+    def on_remove(self, key):
+        self._order.pop(key, None)
+
+    def victim(self):
+        return next(iter(self._order), None)
+
+
+class LFUPolicy:
+    """Evict the least frequently used entry, oldest first among equals (O(1) frequency buckets)"""
+
+    name = "lfu"
+
+    def __init__(self, max_bytes):
+        self._freq = {}
+        self._buckets = {}
+        self._min = 0
+
+    def record(self, key):
+        pass
+
+    def _move(self, key, old, new):
+        if old:
+            bucket = self._buckets[old]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old]
+                if self._min == old:
+                    self._min = new
+        self._buckets.setdefault(new, OrderedDict())[key] = None
+        self._freq[key] = new
+
+    def on_hit(self, key):
+        count = self._freq[key]
+        self._move(key, count, count + 1)
+
+    def on_insert(self, key, size):
+        if key in self._freq:
+            self.on_hit(key)
+            return
+        self._move(key, 0, 1)
+        self._min = 1
+
+    def on_remove(self, key):
+        count = self._freq.pop(key, None)
+        if count is None:
+            return
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._min == count:
+                self._min = min(self._buckets, default=0)
+
+    def victim(self):
+        bucket = self._buckets.get(self._min)
+        if not bucket:
+            self._min = min(self._buckets, default=0)
+            bucket = self._buckets.get(self._min)
+        return next(iter(bucket), None) if bucket else None
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access frequency, halved periodically so old popularity fades"""
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width=1 << 14):
+        self.width = 1 << max(int(width - 1).bit_length(), 4)
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self._seeds = (0x9E3779B9, 0x85EBCA6B, 0xC2B2AE35, 0x27D4EB2F)
+        self._additions = 0
+        self._sample = 10 * self.width
+
+    def _slots(self, key):
+        h = hash(key)
+        return [((h ^ seed) * 0x01000193 >> 7) & self._mask for seed in self._seeds]
+
+    def add(self, key):
+        for row, slot in zip(self._rows, self._slots(key)):
+            if row[slot] < self.MAX_COUNT:
+                row[slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample:
+            self._age()
+
+    def estimate(self, key):
+        return min(row[slot] for row, slot in zip(self._rows, self._slots(key)))
+
+    def _age(self):
+        for row in self._rows:
+            row[:] = bytes(count >> 1 for count in row)
+        self._additions //= 2
+
+
+class TinyLFUPolicy:
+    """W-TinyLFU: a small LRU window in front of a segmented LRU main area
+
+    New entries land in the window; when it overflows, its oldest entries move to the main
+    area's probation segment and only stay there if the frequency sketch says they are used
+    more often than the oldest probation entry. One-off scans therefore cannot flush
+    frequently used entries.
+    """
+
+    name = "tinylfu"
+    WINDOW_SHARE = 0.01
+    PROTECTED_SHARE = 0.8
+
+    def __init__(self, max_bytes):
+        self.window_max = max(max_bytes * self.WINDOW_SHARE, 1)
+        self.protected_max = (max_bytes - self.window_max) * self.PROTECTED_SHARE
+        # Assume ~4 KB entries to size the sketch for the expected population
+        self.sketch = FrequencySketch(max(int(max_bytes // 4096), 64))
+        self._window = OrderedDict()
+        self._probation = OrderedDict()
+        self._protected = OrderedDict()
+        self._window_bytes = 0
+        self._protected_bytes = 0
+
+    def record(self, key):
+        self.sketch.add(key)
+
+    def on_hit(self, key):
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+        elif key in self._probation:
+            size = self._probation.pop(key)
+            self._protected[key] = size
+            self._protected_bytes += size
+            while self._protected_bytes > self.protected_max and len(self._protected) > 1:
+                demoted, demoted_size = self._protected.popitem(last=False)
+                self._protected_bytes -= demoted_size
+                self._probation[demoted] = demoted_size
+
+    def on_insert(self, key, size):
+        self.on_remove(key)
+        self._window[key] = size
+        self._window_bytes += size
+
+    def on_remove(self, key):
+        if key in self._window:
+            self._window_bytes -= self._window.pop(key)
+        elif key in self._protected:
+            self._protected_bytes -= self._protected.pop(key)
+        else:
+            self._probation.pop(key, None)
+
+    def victim(self):
+        # Window overflow moves into probation; the newest arrival there then has to beat
+        # the oldest probation entry on frequency to stay
+        while self._window_bytes > self.window_max and len(self._window) > 1:
+            key, size = self._window.popitem(last=False)
+            self._window_bytes -= size
+            self._probation[key] = size
+        if len(self._probation) > 1:
+            main_victim = next(iter(self._probation))
+            candidate = next(reversed(self._probation))
+            if self.sketch.estimate(candidate) > self.sketch.estimate(main_victim):
+                return main_victim
+            return candidate
+        for segment in (self._probation, self._protected, self._window):
+            if segment:
+                return next(iter(segment))
+        return None
+
+
+POLICIES = {policy.name: policy for policy in (LRUPolicy, LFUPolicy, TinyLFUPolicy)}
+
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key wait on"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe cache with per-entry TTL, a byte budget, pluggable eviction and single-flight loading
+
+    policy is "lru", "lfu" or "tinylfu" (W-TinyLFU). Values larger than the whole budget
+    are returned to the caller but never stored. Entries stored with a stale_ttl keep
+    being served for that long after they expire while one background load refreshes them.
+    """
+
+    def __init__(self, max_bytes=None, policy=None, refresh_workers=REFRESH_WORKERS):
+        self.max_bytes = int(max_bytes if max_bytes is not None else PROVIDER_CACHE_MB * 1024 * 1024)
+        policy = policy or PROVIDER_CACHE_POLICY
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        self.policy = POLICIES[policy](self.max_bytes)
+        self.refresh_workers = max(refresh_workers, 1)
+        self._refresher = None
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.expirations = 0
+        self.rejected = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry[3]
+        self.policy.on_remove(key)
+        return entry[3]
+
+    def _lookup(self, key, allow_stale=False):
+        """(value, stored_at) for a usable entry, (_MISSING, None) otherwise; call with the lock held"""
+        self.policy.record(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING, None
+        value, expires_at, stale_until, _, stored_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if now >= stale_until:
+                self._remove(key)
+                self.expirations += 1
+                return _MISSING, None
+            if not allow_stale:
+                return _MISSING, None
+        self.policy.on_hit(key)
+        return value, stored_at if expires_at <= now else None
+
+    def _note_stale(self, key, stored_at):
+        self.stale_hits += 1
+        log = _stale_log.get()
+        if log is not None:
+            log.append((key, time.monotonic() - stored_at))
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, _ = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_stale(self, key, default=None):
+        """(value, is_stale): like get() but also returns expired entries still inside their stale window"""
+        with self._lock:
+            value, stale_stored_at = self._lookup(key, allow_stale=True)
+            if value is _MISSING:
+                self.misses += 1
+                return default, False
+            self.hits += 1
+            if stale_stored_at is not None:
+                self._note_stale(key, stale_stored_at)
+            return value, stale_stored_at is not None
+
+    def set(self, key, value, ttl, size=None, stale_ttl=0):
+        if ttl <= 0:
+            return
+        size = approx_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                self.rejected += 1
+                return
+            now = time.monotonic()
+            self._entries[key] = (value, now + ttl, now + ttl + max(stale_ttl, 0), size, now)
+            self.bytes += size
+            self.policy.on_insert(key, size)
+            while self.bytes > self.max_bytes:
+                victim = self.policy.victim()
+                if victim is None:
+                    break
+                self.evicted_bytes += self._remove(victim)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _finish(self, key, flight, loader, ttl, cacheable, stale_ttl):
+        """Run a flight's loader, store a cacheable result and release any waiters"""
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if flight.error is None and (cacheable is None or cacheable(flight.value)):
+                self.set(key, flight.value, ttl, stale_ttl=stale_ttl)
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def refresh(self, key, loader, ttl=0, cacheable=None, stale_ttl=0):
+        """Start a background load for key unless one is already running"""
+        with self._lock:
+            if key in self._inflight:
+                return
+            flight = self._inflight[key] = _Flight()
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                     thread_name_prefix="cache-refresh")
+            self.refreshes += 1
+
+        def run():
+            self._finish(key, flight, loader, ttl, cacheable, stale_ttl)
+            if flight.error is not None:
+                with self._lock:
+                    self.refresh_errors += 1
+                print(f"Background refresh of {key!r} failed: {flight.error}")
+
+        self._refresher.submit(run)
+
+    def get_or_load(self, key, ttl, loader, cacheable=None, stale_ttl=0):
+        """Return the cached value or call loader() once, even under concurrent callers
+
+        Values rejected by cacheable(value) are returned but not stored. With stale_ttl,
+        an expired entry is returned at once while loader() refreshes it in the background.
+        """
+        with self._lock:
+            value, stale_stored_at = self._lookup(key, allow_stale=stale_ttl > 0)
+            if value is not _MISSING:
+                self.hits += 1
+                if stale_stored_at is not None:
+                    self._note_stale(key, stale_stored_at)
+            else:
+                self.misses += 1
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _Flight()
+
+        if value is not _MISSING:
+            if stale_stored_at is not None:
+                self.refresh(key, loader, ttl, cacheable, stale_ttl)
+            return value
+
+        if not leader:
+            # Another caller is loading this key; wait for it, but not past our own deadline
+            left = remaining()
+            if not flight.event.wait(None if left is None else max(left, 0)):
+                raise DeadlineExceeded(f"Timed out waiting for a concurrent load of {key!r}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._finish(key, flight, loader, ttl, cacheable, stale_ttl)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "policy": self.policy.name,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+@contextlib.contextmanager
+def staleness():
+    """Collect (key, age_seconds) for every stale entry served inside the block
+
+    The log follows contextvars, so work submitted with contextvars.copy_context().run
+    from inside the block is included.
+    """
+    log = []
+    token = _stale_log.set(log)
+    try:
+        yield log
+    finally:
+        _stale_log.reset(token)
@@ -0,0 +1,255 @@
+"""
+Data provider shared by both frontends
+One cache, one connection pool and one rate limiter in front of a pluggable backend,
+with every endpoint returning a consistent shape
+"""
+
+import os
+import threading
+import time
+
+from fundamentals_store import FundamentalsStore, superseded
+from jsonstream import columns_from_body
+from records import (STATEMENT_RECORDS, AdvancedDcfRecord, DcfRecord, GrowthRecord, KeyMetricsRecord,
+                     QuoteRecord, RatiosRecord)
+
+from .backends import is_error_body, make_backend
+from .cache import TTLCache, staleness
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, endpoint_name, remaining
+
+# Cache lifetimes in seconds per endpoint
+QUOTE_TTL = 30
+TTM_TTL = 6 * 60 * 60
+STATEMENT_TTL = 24 * 60 * 60
+DCF_TTL = 60 * 60
+HISTORY_TTL = 15 * 60
+
+# Expired entries keep being served (marked stale) for up to STALE_FACTOR x their TTL while
+# a background load refreshes them, but never longer than the hard cutoff
+STALE_FACTOR = 10
+PROVIDER_MAX_STALE_SECONDS = float(os.environ.get("PROVIDER_MAX_STALE_SECONDS", str(24 * 60 * 60)))
+
+# Fetched depth is fixed so every caller shares one cache entry and slices what it needs
+STATEMENT_LIMIT = 5
+GROWTH_LIMIT = 10
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def stale_window(ttl):
+    """Seconds past expiry that an entry with this TTL may still be served"""
+    return max(min(ttl * STALE_FACTOR, PROVIDER_MAX_STALE_SECONDS), 0)
+
+
+def parse_historical(data):
+    """FMP historical-price-full payload -> dict of numpy arrays in chronological order"""
+    return columns_from_body(data, OHLCV_FIELDS)
+
+
+class DataProvider:
+    """Typed access to FMP data through a shared cache, pool and rate limiter
+
+    Single-record endpoints return a compact record (see records.py) or None,
+    multi-record endpoints a (possibly empty) list of records, and price history a
+    dict of numpy arrays or None. Records are built once at parse time, so the cache
+    never holds the full JSON payloads. Expired data is served stale-while-revalidate;
+    wrap a page's fetches in staleness() to learn which values were stale.
+
+    Upstream calls honour the caller's deadline (see resilience.deadline) and each
+    endpoint has a circuit breaker; both fail fast with DeadlineExceeded or
+    CircuitOpenError rather than waiting out a timeout.
+    """
+
+    def __init__(self, backend=None, cache=None, rate_limiter=None, fundamentals=None):
+        self.backend = backend or make_backend()
+        self.cache = cache or TTLCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.fundamentals = fundamentals or FundamentalsStore()
+        self.upstream_calls = 0
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self._lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker()
+            return self.breakers[endpoint]
+
+    def _fetch(self, path, params, api_key, timeout, ttl, fields=None):
+        """One upstream call under the breaker and deadline; with `fields`, a price history as columns"""
+        endpoint = endpoint_name(path)
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} is failing; skipped until its breaker resets")
+        left = remaining()
+        capped = False
+        if left is not None:
+            if left <= 0 or not self.rate_limiter.acquire(max_wait=left):
+                breaker.release()
+                raise DeadlineExceeded(f"No time left for {endpoint}")
+            left = remaining()
+            capped = left < timeout
+            timeout = min(timeout, left)
+        else:
+            self.rate_limiter.acquire()
+        with self._lock:
+            self.upstream_calls += 1
+        try:
+            timeout = max(timeout, 0.001)
+            if fields:
+                body = self.backend.fetch_series(path, params, api_key, timeout, ttl, fields)
+            else:
+                body = self.backend.fetch(path, params, api_key, timeout, ttl)
+        except Exception as e:
+            if capped and remaining() <= 0:
+                # Cut short by the page's budget, not by the endpoint: say nothing about its health
+                breaker.release()
+                raise DeadlineExceeded(f"Deadline passed during the {endpoint} call") from e
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return body
+
+    def get_json(self, path, api_key, params=None, ttl=QUOTE_TTL, timeout=10, parse=None):
+        """Cached JSON for an endpoint, optionally converted by `parse`; error bodies are never cached"""
+        key = ("json", path, tuple(sorted((params or {}).items())))
+
+        def load():
+            body = self._fetch(path, params, api_key, timeout, ttl)
+            if parse is None or is_error_body(body) or not isinstance(body, list):
+                return body
+            return parse(body)
+
+        return self.cache.get_or_load(key, ttl, load, cacheable=lambda body: not is_error_body(body),
+                                      stale_ttl=stale_window(ttl))
+
+    def cached(self, key, ttl, loader, cacheable=None):
+        """Cache a derived value (resampled series, computed analytics) alongside the raw data
+
+        Values rejected by cacheable(value) (by default None) are returned but not stored.
+        """
+        return self.cache.get_or_load(key, ttl, loader, cacheable=cacheable or (lambda value: value is not None))
+
+    def _one(self, path, api_key, ttl, record, params=None):
+        data = self.get_json(path, api_key, params, ttl, parse=record.from_list)
+        if isinstance(data, list):
+            return data[0] if data else None
+        return None
+
+    def _many(self, path, api_key, ttl, record=None, params=None):
+        data = self.get_json(path, api_key, params, ttl, parse=record.from_list if record else None)
+        return data if isinstance(data, list) else []
+
+    def quote(self, symbol, api_key):
+        return self._one(f"/api/v3/quote/{symbol}", api_key, QUOTE_TTL, QuoteRecord)
+
+    def quotes(self, symbols, api_key, timeout=10):
+        """Uncached batch quote for live polling"""
+        try:
+            data = self._fetch(f"/api/v3/quote/{','.join(symbols)}", None, api_key, timeout, None)
+        except Exception as e:
+            print(f"Error fetching batch quote: {e}")
+            return []
+        return data if isinstance(data, list) else []
+
+    def key_metrics_ttm(self, symbol, api_key):
+        return self._one(f"/api/v3/key-metrics-ttm/{symbol}", api_key, TTM_TTL, KeyMetricsRecord)
+
+    def ratios_ttm(self, symbol, api_key):
+        return self._one(f"/api/v3/ratios-ttm/{symbol}", api_key, TTM_TTL, RatiosRecord)
+
+    def financial_growth(self, symbol, api_key):
+        """Annual growth rows, most recent first"""
+        return self._many(f"/api/v3/financial-growth/{symbol}", api_key, STATEMENT_TTL, GrowthRecord,
+                          {"limit": GROWTH_LIMIT})
+
+    def _statement(self, statement, path, symbol, api_key):
+        """Annual statements from the ingested local store when it is current for the symbol, else the API
+
+        Stored rows are skipped once a later fiscal year should have been filed than the
+        newest one ingested, so the API (and its STATEMENT_TTL cache) picks up new reports.
+        """
+        record = STATEMENT_RECORDS[statement]
+        rows = self.fundamentals.rows(statement, symbol, STATEMENT_LIMIT)
+        if rows and not superseded(rows[0]["date"]):
+            return record.from_list(rows)
+        return self._many(f"/api/v3/{path}/{symbol}", api_key, STATEMENT_TTL, record,
+                          {"limit": STATEMENT_LIMIT})
+
+    def cash_flow_statement(self, symbol, api_key):
+        return self._statement("cash_flow", "cash-flow-statement", symbol, api_key)
+
+    def income_statement(self, symbol, api_key):
+        return self._statement("income", "income-statement", symbol, api_key)
+
+    def balance_sheet(self, symbol, api_key):
+        return self._statement("balance", "balance-sheet-statement", symbol, api_key)
+
+    def discounted_cash_flow(self, symbol, api_key):
+        return self._one(f"/api/v3/discounted-cash-flow/{symbol}", api_key, DCF_TTL, DcfRecord)
+
+    def advanced_dcf(self, symbol, api_key):
+        return self._one("/api/v4/advanced_discounted_cash_flow", api_key, DCF_TTL, AdvancedDcfRecord,
+                         {"symbol": symbol})
+
+    def constituents(self, index_name, api_key):
+        """Index membership rows (symbol, name, sector), e.g. index_name="sp500" """
+        return self._many(f"/api/v3/{index_name}_constituent", api_key, STATEMENT_TTL)
+
+    def daily_prices(self, symbol, api_key, start):
+        """Daily OHLCV arrays covering at least `start` onwards
+
+        Only the parsed arrays are cached (not the raw rows), and a cached series
+        reaching back far enough serves any later start date. An expired series is
+        returned as is while a background load brings it up to date.
+        """
+        key = ("daily", symbol)
+        entry, stale = self.cache.get_stale(key)
+
+        def load(start):
+            params = {"from": start.strftime('%Y-%m-%d'), "to": time.strftime('%Y-%m-%d')}
+            # Streamed straight into OHLCV columns; the other per-row fields are never materialized
+            series = self._fetch(f"/api/v3/historical-price-full/{symbol}", params, api_key, 15, HISTORY_TTL,
+                                 OHLCV_FIELDS)
+            if series is not None:
+                self.cache.set(key, {"start": start, "series": series, "version": time.time()}, HISTORY_TTL,
+                               stale_ttl=stale_window(HISTORY_TTL))
+            return series
+
+        if entry is not None and entry["start"] <= start:
+            if stale:
+                self.cache.refresh(("daily-load", symbol, entry["start"]), lambda: load(entry["start"]))
+            return entry["series"]
+
+        # Zero TTL: only collapses concurrent loads, the series itself is stored under `key`
+        return self.cache.get_or_load(("daily-load", symbol, start), 0, lambda: load(start))
+
+    def daily_version(self, symbol):
+        """Stamp of the cached daily series, for keying values derived from it"""
+        entry, _ = self.cache.get_stale(("daily", symbol))
+        return entry["version"] if entry else None
+
+    def staleness(self):
+        """Context manager collecting (key, age_seconds) for stale values served inside it"""
+        return staleness()
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {"upstream_calls": self.upstream_calls, "backend": self.backend.name,
+                "cache": self.cache.stats(), "rate_limit_wait_s": self.rate_limiter.waited_seconds,
+                "breakers": {endpoint: breaker.state for endpoint, breaker in breakers.items()}}
+
+
+_default_provider = None
+_default_lock = threading.Lock()
+
+
+def get_provider():
+    """Process-wide provider instance"""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            _default_provider = DataProvider()
+        return _default_provider
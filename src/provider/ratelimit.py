@@ -0,0 +1,43 @@
+"""
+Process-wide upstream rate limiting
+"""
+
+import os
+import threading
+import time
+
+# FMP plans are metered per minute; 0 disables limiting
+FMP_MAX_CALLS_PER_MINUTE = float(os.environ.get("FMP_MAX_CALLS_PER_MINUTE", "300"))
+FMP_RATE_BURST = int(os.environ.get("FMP_RATE_BURST", "20"))
+
+
+class RateLimiter:
+    """Token bucket shared by every upstream call"""
+
+    def __init__(self, calls_per_minute=FMP_MAX_CALLS_PER_MINUTE, burst=FMP_RATE_BURST):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, max_wait=None):
+        """Block until a call may be made; False if that would take longer than max_wait seconds"""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+                if max_wait is not None and wait > max_wait:
+                    return False
+                self.waited_seconds += wait
+            time.sleep(wait)
+            if max_wait is not None:
+                max_wait -= wait
@@ -0,0 +1,110 @@
+"""
+Request deadlines and per-endpoint circuit breakers
+A page sets one deadline for all of its upstream calls, and an endpoint that keeps
+failing is cut off for a cooldown so callers fail fast instead of waiting on timeouts
+"""
+
+import contextlib
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+# Whole-page budget for upstream calls, in seconds
+PAGE_DEADLINE_SECONDS = float(os.environ.get("PAGE_DEADLINE_SECONDS", "8"))
+# Consecutive failures that open an endpoint's breaker, and how long it stays open
+BREAKER_FAILURES = int(os.environ.get("FMP_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.environ.get("FMP_BREAKER_RESET_SECONDS", "30"))
+
+_deadline = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before an upstream call could be made, or cut one short"""
+
+
+class CircuitOpenError(RuntimeError):
+    """An endpoint's breaker is open, so the call was not attempted"""
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """Bound every upstream call made inside the block (and in contexts copied from it)
+
+    Nested deadlines never extend an outer one.
+    """
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left on the current deadline, or None when there is none"""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def endpoint_name(path):
+    """Endpoint of an API path: /api/v3/quote/AAPL -> quote"""
+    match = re.match(r"/api/v\d+/([^/?]+)", path)
+    return match.group(1) if match else path.strip("/").split("/")[0]
+
+
+class CircuitBreaker:
+    """Closed until `failures` consecutive errors, then open for `reset_seconds`
+
+    After the cooldown one probe call is let through (half-open); its result closes
+    the breaker again or reopens it for another cooldown.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(failures, 1)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """Give back an allowed call that was never made, without judging the endpoint"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self._probing = False
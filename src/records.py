@@ -0,0 +1,178 @@
+"""
+Compact records for cached fundamentals
+FMP payloads carry dozens of keys per entry; these keep only the fields the dashboards
+read, packed into one array('d') of numbers plus a tuple of strings per record. They
+answer get(), [] and attribute access like the raw dicts, so templates and callers
+work unchanged
+"""
+
+import math
+import sys
+from array import array
+
+from fundamentals_store import STATEMENTS
+
+_NAN = float("nan")
+
+
+def _text(value):
+    # Symbols, dates and periods repeat across records, so share one copy of each
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return _NAN
+    return float(value)
+
+
+class Record:
+    """Base for fixed-schema records; subclasses list NUMERIC and TEXT field names"""
+
+    __slots__ = ("_values", "_text")
+    NUMERIC = ()
+    TEXT = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._numeric_index = {name: i for i, name in enumerate(cls.NUMERIC)}
+        cls._text_index = {name: i for i, name in enumerate(cls.TEXT)}
+
+    def __init__(self, values, text):
+        self._values = values
+        self._text = text
+
+    @classmethod
+    def from_json(cls, data):
+        """Project one FMP JSON object onto the record's fields"""
+        return cls(array("d", [_number(data.get(name)) for name in cls.NUMERIC]),
+                   tuple(_text(data.get(name)) for name in cls.TEXT))
+
+    @classmethod
+    def from_list(cls, data):
+        """Records for every object in an FMP JSON array"""
+        return [cls.from_json(item) for item in data if isinstance(item, dict)]
+
+    def _lookup(self, name):
+        index = self._numeric_index.get(name)
+        if index is not None:
+            value = self._values[index]
+            return None if math.isnan(value) else value
+        index = self._text_index.get(name)
+        if index is not None:
+            return self._text[index]
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        """Like dict.get; missing and null values both return the default"""
+        try:
+            value = self._lookup(name)
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        return self._lookup(name)
+
+    def __getattr__(self, name):
+        # Only reached for names that are not real attributes, i.e. field lookups from templates
+        try:
+            return self._lookup(name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name):
+        try:
+            return self._lookup(name) is not None
+        except KeyError:
+            return False
+
+    def keys(self):
+        return [name for name in self.NUMERIC + self.TEXT if name in self]
+
+    def to_dict(self):
+        return {name: self._lookup(name) for name in self.keys()}
+
+    def __getstate__(self):
+        return self._values, self._text
+
+    def __setstate__(self, state):
+        self._values, self._text = state
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class QuoteRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("price", "change", "changesPercentage", "dayLow", "dayHigh", "yearLow", "yearHigh",
+               "open", "previousClose", "volume", "avgVolume", "marketCap", "sharesOutstanding",
+               "eps", "pe", "priceAvg50", "priceAvg200", "timestamp")
+    TEXT = ("symbol", "name", "exchange")
+
+
+class KeyMetricsRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("peRatioTTM", "pbRatioTTM", "pegRatioTTM", "pfcfRatioTTM", "psRatioTTM", "pocfratioTTM",
+               "evToSales", "enterpriseValueOverEBITDATTM", "enterpriseValueTTM", "marketCapTTM",
+               "bookValuePerShareTTM", "tangibleBookValuePerShareTTM", "revenuePerShareTTM",
+               "cashPerShareTTM", "netIncomePerShareTTM", "freeCashFlowPerShareTTM", "numberOfSharesTTM",
+               "roeTTM", "roaTTM", "roicTTM", "debtToEquityTTM", "currentRatioTTM",
+               "freeCashFlowYieldTTM", "earningsYieldTTM", "dividendYieldTTM")
+    TEXT = ()
+
+
+class RatiosRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("peRatioTTM", "priceToSalesRatioTTM", "priceToBookRatioTTM", "currentRatioTTM",
+               "quickRatioTTM", "cashRatioTTM", "grossProfitMarginTTM", "operatingProfitMarginTTM",
+               "pretaxProfitMarginTTM", "netProfitMarginTTM", "returnOnAssetsTTM", "returnOnEquityTTM",
+               "returnOnTangibleAssetsTTM", "debtRatioTTM", "debtEquityRatioTTM",
+               "longTermDebtToCapitalizationTTM", "timesInterestEarnedTTM", "receivablesTurnoverTTM",
+               "totalAssetsTurnoverTTM", "daysOfSalesOutstandingTTM", "daysOfInventoryOutstandingTTM",
+               "daysOfPayablesOutstandingTTM", "operatingCashFlowPerShareTTM", "dividendYielTTM",
+               "payoutRatioTTM", "dividendPerShareTTM")
+    TEXT = ()
+
+
+class GrowthRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("revenueGrowth", "grossProfitGrowth", "operatingIncomeGrowth", "netIncomeGrowth",
+               "epsgrowth", "freeCashFlowGrowth", "totalAssetsGrowth", "bookValuePerShareGrowth",
+               "dividendperShareGrowth")
+    TEXT = ("symbol", "date", "calendarYear")
+
+
+class _StatementRecord(Record):
+    __slots__ = ()
+    TEXT = ("symbol", "date", "calendarYear", "period")
+
+
+class IncomeRecord(_StatementRecord):
+    __slots__ = ()
+    NUMERIC = STATEMENTS["income"][1]
+
+
+class BalanceSheetRecord(_StatementRecord):
+    __slots__ = ()
+    NUMERIC = STATEMENTS["balance"][1]
+
+
+class CashFlowRecord(_StatementRecord):
+    __slots__ = ()
+    NUMERIC = STATEMENTS["cash_flow"][1]
+
+
+class DcfRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("dcf", "Stock Price")
+    TEXT = ("symbol", "date")
+
+
+class AdvancedDcfRecord(Record):
+    __slots__ = ()
+    NUMERIC = ("intrinsicValue", "price", "wacc")
+    TEXT = ("symbol", "year")
+
+
+STATEMENT_RECORDS = {"income": IncomeRecord, "balance": BalanceSheetRecord, "cash_flow": CashFlowRecord}
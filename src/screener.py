@@ -0,0 +1,244 @@
+"""
+Universe screener over TTM key metrics and ratios
+Loads the valuation and quality fields shown on the dashboard for many symbols in
+parallel into a columnar table that filters, sorts and ranks with numpy
+"""
+
+import contextvars
+import operator
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from provider import deadline, get_provider
+
+# (column, label, source, FMP field); percentages are stored as fractions
+SCREEN_FIELDS = (
+    ("pe", "P/E", "metrics", "peRatioTTM"),
+    ("pb", "P/B", "metrics", "pbRatioTTM"),
+    ("roe", "ROE", "metrics", "roeTTM"),
+    ("fcf_yield", "FCF Yield", "metrics", "freeCashFlowYieldTTM"),
+    ("debt_to_equity", "Debt/Equity", "metrics", "debtToEquityTTM"),
+    ("current_ratio", "Current Ratio", "metrics", "currentRatioTTM"),
+    ("net_margin", "Net Margin", "ratios", "netProfitMarginTTM"),
+    ("dividend_yield", "Dividend Yield", "ratios", "dividendYielTTM"),
+    ("price", "Price", "quote", "price"),
+    ("market_cap", "Market Cap", "quote", "marketCap"),
+)
+COLUMNS = tuple(field[0] for field in SCREEN_FIELDS)
+LABELS = {field[0]: field[1] for field in SCREEN_FIELDS}
+PERCENT_COLUMNS = ("roe", "fcf_yield", "net_margin", "dividend_yield")
+
+# Index name understood by provider.constituents -> label
+UNIVERSES = {"sp500": "S&P 500", "nasdaq": "Nasdaq 100", "dowjones": "Dow Jones 30"}
+
+# Direction used by score(): +1 when higher is better, -1 when lower is better
+DEFAULT_RANK = {"pe": -1, "pb": -1, "roe": 1, "fcf_yield": 1, "debt_to_equity": -1}
+
+SCREENER_WORKERS = int(os.environ.get("SCREENER_WORKERS", "16"))
+SCREEN_TTL = 5 * 60
+QUOTE_BATCH = 50
+# Upstream budget for one screen; symbols not loaded by then are returned as unavailable
+SCREEN_DEADLINE_SECONDS = float(os.environ.get("SCREEN_DEADLINE_SECONDS", "20"))
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+             "=": operator.eq, "==": operator.eq, "!=": operator.ne}
+FILTER_PATTERN = re.compile(r"^\s*([a-z_]+)\s*(<=|>=|==|!=|<|>|=)\s*(-?[\d.]+)\s*(%?)\s*$")
+
+
+class ScreenTable:
+    """Column-oriented screener rows: a symbol array plus one float64 array per field
+
+    Missing values are NaN, which fail every filter and sort last.
+    """
+
+    def __init__(self, symbols, columns, names=None, sectors=None, unavailable=None):
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        n = len(self.symbols)
+        self.names = np.asarray(names if names is not None else [""] * n, dtype=object)
+        self.sectors = np.asarray(sectors if sectors is not None else [""] * n, dtype=object)
+        # Symbols whose metrics could not be loaded; they stay in the table with NaN columns
+        self.unavailable = list(unavailable or [])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from dicts of {symbol, name, sector, metrics, ratios, quote}"""
+        columns = {}
+        for column, _, source, key in SCREEN_FIELDS:
+            values = np.full(len(records), np.nan)
+            for i, record in enumerate(records):
+                value = (record.get(source) or {}).get(key)
+                if isinstance(value, (int, float)):
+                    values[i] = value
+            columns[column] = values
+        return cls([r["symbol"] for r in records], columns,
+                   [r.get("name") or "" for r in records], [r.get("sector") or "" for r in records],
+                   [r["symbol"] for r in records if r.get("unavailable")])
+
+    def take(self, indices):
+        """New table holding only the given row positions, in that order"""
+        return ScreenTable(self.symbols[indices], {k: v[indices] for k, v in self.columns.items()},
+                           self.names[indices], self.sectors[indices])
+
+    def mask(self, filters):
+        """Boolean row mask for a list of (column, op, value) conditions"""
+        keep = np.ones(len(self), dtype=bool)
+        for column, op, value in filters:
+            values = self.columns[column]
+            with np.errstate(invalid="ignore"):
+                keep &= OPERATORS[op](values, value) & ~np.isnan(values)
+        return keep
+
+    def order(self, column, descending=False):
+        """Row positions sorted by a column with NaN last"""
+        values = self.columns[column]
+        keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+        return np.argsort(keys, kind="stable")
+
+    def score(self, weights=None):
+        """Composite percentile rank in [0, 1] across the weighted columns (1 is best)"""
+        weights = weights or DEFAULT_RANK
+        total = np.zeros(len(self))
+        weight_sum = 0.0
+        for column, weight in weights.items():
+            values = self.columns[column]
+            valid = ~np.isnan(values)
+            count = int(valid.sum())
+            if count < 2:
+                continue
+            ranks = np.full(len(self), 0.5)
+            ordered = np.argsort(values[valid] * np.sign(weight), kind="stable")
+            pct = np.empty(count)
+            pct[ordered] = np.arange(count) / (count - 1)
+            ranks[valid] = pct
+            total += abs(weight) * ranks
+            weight_sum += abs(weight)
+        return total / weight_sum if weight_sum else total
+
+    def screen(self, filters=(), sort_by=None, descending=False, limit=None, weights=None):
+        """Filter, then sort by a column (or by composite score when sort_by="score"), then cut"""
+        rows = np.flatnonzero(self.mask(filters))
+        subset = self.take(rows)
+        if sort_by == "score":
+            scores = subset.score(weights)
+            subset.columns["score"] = scores
+            subset = subset.take(np.argsort(-scores, kind="stable"))
+        elif sort_by:
+            subset = subset.take(subset.order(sort_by, descending))
+        return subset.head(limit) if limit else subset
+
+    def head(self, n):
+        """First n rows"""
+        return self.take(np.arange(min(n, len(self))))
+
+    def to_rows(self):
+        """Row dicts for templates and JSON, with NaN as None"""
+        rows = []
+        for i in range(len(self)):
+            row = {"symbol": self.symbols[i], "name": self.names[i], "sector": self.sectors[i]}
+            for column, values in self.columns.items():
+                value = values[i]
+                row[column] = None if np.isnan(value) else float(value)
+            rows.append(row)
+        return rows
+
+
+def parse_filters(text):
+    """Parse "pe<25, roe>=15%" into [(column, op, value)]; raises ValueError on bad input"""
+    filters = []
+    for part in re.split(r"[,;\n]", text or ""):
+        if not part.strip():
+            continue
+        match = FILTER_PATTERN.match(part.lower())
+        if not match or match.group(1) not in COLUMNS:
+            raise ValueError(f"Invalid filter '{part.strip()}' (columns: {', '.join(COLUMNS)})")
+        column, op, value, percent = match.groups()
+        value = float(value)
+        if percent or (column in PERCENT_COLUMNS and abs(value) > 1):
+            value /= 100
+        filters.append((column, op, value))
+    return filters
+
+
+def universe_symbols(universe, api_key, custom=""):
+    """Symbols plus {symbol: (name, sector)} for a named index or a custom comma separated list"""
+    if universe in UNIVERSES:
+        rows = get_provider().constituents(universe, api_key)
+        info = {row["symbol"]: (row.get("name"), row.get("sector")) for row in rows if row.get("symbol")}
+        return list(info), info
+    symbols = list(dict.fromkeys(s.strip().upper() for s in re.split(r"[,\s]+", custom or "") if s.strip()))
+    return symbols, {}
+
+
+def _load_record(symbol, api_key):
+    """Metrics and ratios for one symbol; a failure (HTTP error, deadline, open breaker) leaves them None"""
+    provider = get_provider()
+    try:
+        return {"symbol": symbol, "metrics": provider.key_metrics_ttm(symbol, api_key),
+                "ratios": provider.ratios_ttm(symbol, api_key)}
+    except Exception as e:
+        print(f"Error loading screener data for {symbol}: {e}")
+        return {"symbol": symbol, "metrics": None, "ratios": None, "unavailable": True}
+
+
+def _load_quotes(batch, api_key):
+    try:
+        return get_provider().quotes(batch, api_key)
+    except Exception as e:
+        print(f"Error loading quotes for {batch[0]}..{batch[-1]}: {e}")
+        return []
+
+
+def load_universe(symbols, api_key, info=None, workers=SCREENER_WORKERS):
+    """Fetch metrics and ratios for every symbol in parallel through the shared provider
+
+    Quotes use the batch endpoint, so a 500-symbol universe costs 10 quote calls
+    rather than 500; the TTM endpoints are per symbol but cached for hours. Symbols that
+    fail to load keep NaN columns and are listed in the table's `unavailable`. Each task
+    runs in a copy of the caller's context, so a deadline set by the caller bounds them all.
+    """
+    info = info or {}
+    batches = [symbols[i:i + QUOTE_BATCH] for i in range(0, len(symbols), QUOTE_BATCH)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Quotes first: ten batch calls, so they are not starved by a deadline spent on the TTM calls
+        quote_futures = [pool.submit(contextvars.copy_context().run, _load_quotes, b, api_key) for b in batches]
+        record_futures = [pool.submit(contextvars.copy_context().run, _load_record, s, api_key) for s in symbols]
+        quotes = {}
+        for future in quote_futures:
+            quotes.update({q.get("symbol"): q for q in future.result()})
+        records = [future.result() for future in record_futures]
+    for record in records:
+        name, sector = info.get(record["symbol"], (None, None))
+        quote = quotes.get(record["symbol"])
+        record.update({"quote": quote, "name": name or (quote or {}).get("name"), "sector": sector})
+    return ScreenTable.from_records(records)
+
+
+def get_universe_table(universe, api_key, custom="", seconds=SCREEN_DEADLINE_SECONDS):
+    """ScreenTable for a universe, loaded within `seconds`; repeated filter and sort calls never refetch
+
+    Only a complete table is cached. A partial one (symbols past the deadline or failing
+    are `unavailable`) is returned as is, and the next screen loads the rest on top of the
+    TTM values already cached.
+    """
+    with deadline(seconds):
+        symbols, info = universe_symbols(universe, api_key, custom)
+        if not symbols:
+            return None
+        key = ("screen", universe if universe in UNIVERSES else tuple(symbols))
+        return get_provider().cached(key, SCREEN_TTL, lambda: load_universe(symbols, api_key, info),
+                                     cacheable=lambda table: table is not None and not table.unavailable)
+
+
+def run_screen(table, filters=(), sort_by=None, descending=False, limit=None):
+    """Screen a table and report how long the columnar pass took"""
+    started = time.perf_counter()
+    result = table.screen(filters, sort_by, descending, limit)
+    return result, (time.perf_counter() - started) * 1000
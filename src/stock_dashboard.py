@@ -3,23 +3,46 @@ Flask Alternative to Streamlit Stock App
 This runs as a web app without the dependency issues
 """
 
-from flask import Flask, render_template_string, request, jsonify
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
+from flask import Flask, Response, render_template_string, request, jsonify
+import numpy as np
+from datetime import datetime
 import json
 import base64
 import io
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from assets import IMMUTABLE_CACHE_CONTROL, plotly_asset, plotly_src
+from backtest import ema_series, rolling_mean_std, run_backtest, summary_rows as backtest_rows
+from compare import (COMPARE_EMA_SPANS, DEFAULT_COMPARE_EMA, MAX_COMPARE_SYMBOLS, chart_payload,
+                     compare_symbols, parse_symbols, summary_rows as compare_rows)
+from export import (EXPORT_WORKERS, FORMATS, MAX_EXPORT_SYMBOLS, ExportError, check_format,
+                    stream as stream_export)
+from downsample import PIXELS_PER_CANDLE, lttb_indices, minmax_ohlc, take, target_points, window_bounds
+from live_quotes import quote_hub
+from provider import PAGE_DEADLINE_SECONDS, deadline, get_provider
+from portfolio import DEFAULT_BENCHMARK, heatmap_data, portfolio_analysis, summary_rows
+from screener import (COLUMNS, LABELS, PERCENT_COLUMNS, SCREEN_DEADLINE_SECONDS, UNIVERSES, get_universe_table,
+                      parse_filters, run_screen, universe_symbols)
+from sweep import SCORE_METRICS, heatmap as sweep_heatmap, sweep_symbol, top_configs
+from valuations import calculate_dcf_valuation, get_valuation_store, historical_dcf, history_start, live_valuation
+from timeframes import (RANGES, INTERVALS, get_ohlcv, load_daily_series, normalize_interval, normalize_range,
+                        slice_range, timeframe_label, to_chart_lists)
 
 app = Flask(__name__)
 
+@app.context_processor
+def asset_urls():
+    """Plotly script URL for every template: the fingerprinted local bundle, else the pinned CDN build"""
+    return {'plotly_src': plotly_src()}
+
 # HTML Template
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Stock Analysis Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <script id="plotlyScript" src="{{ plotly_src }}" defer></script>
     <style>
         body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f2f6; }
         .container { max-width: 1400px; margin: 0 auto; }
@@ -33,25 +56,28 @@ HTML_TEMPLATE = """
         .section-title { font-size: 24px; font-weight: bold; margin: 30px 0 20px 0; color: #333; border-bottom: 2px solid #1f77b4; padding-bottom: 10px; }
         .input-group { margin: 10px 0; }
         .input-group label { display: block; margin-bottom: 5px; font-weight: bold; }
-        .input-group input { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; }
+        .input-group input, .input-group select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; }
         .btn { background-color: #1f77b4; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
         .btn:hover { background-color: #155a8a; }
         .error { color: red; background-color: #fee; padding: 10px; border-radius: 4px; margin: 10px 0; }
         .success { color: green; background-color: #efe; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .stale { color: #8a6d3b; background-color: #fcf8e3; padding: 10px; border-radius: 4px; margin: 10px 0; }
         .two-column { display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }
         .three-column { display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 10px; }
         .four-column { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+        .chart-loading { min-height: 450px; display: flex; align-items: center; justify-content: center; color: #888; }
     </style>
 </head>
 <body>
     <div class="container">
         <div class="header">
             <h1>📊 Enhanced Stock Analysis Dashboard</h1>
-            <p>Comprehensive Financial Metrics, Ratios & Performance Analysis</p>
+            <p>Comprehensive Financial Metrics, Ratios & Performance Analysis · <a href="/screener">Stock screener</a> · <a href="/portfolio">Portfolio risk</a> · <a href="/compare">Compare symbols</a></p>
         </div>
         
         <div class="form-container">
-            <form method="POST">
+            <form method="POST" onsubmit="document.getElementById('chart_width').value = document.querySelector('.container').clientWidth;">
+                <input type="hidden" id="chart_width" name="chart_width" value="{{ chart_width or '' }}">
                 <div class="two-column">
                     <div class="input-group">
                         <label for="api_key">FMP API Key:</label>
@@ -62,6 +88,27 @@ HTML_TEMPLATE = """
                         <input type="text" id="symbol" name="symbol" value="{{ symbol or 'AAPL' }}" placeholder="e.g., AAPL">
                     </div>
                 </div>
+                <div class="two-column">
+                    <div class="input-group">
+                        <label for="range">Chart Range:</label>
+                        <select id="range" name="range">
+                            {% for key, option in ranges.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == chart_range }}>{{ option[0] }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="interval">Chart Interval:</label>
+                        <select id="interval" name="interval">
+                            {% for key, label in intervals.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == interval }}>{{ label }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                </div>
+                <div class="input-group">
+                    <label><input type="checkbox" name="valuation_history" style="width: auto;" {{ 'checked' if valuation_history }}> Intrinsic value history (DCF as of each fiscal year, from the same statements)</label>
+                </div>
                 <button type="submit" class="btn">🔍 Analyze Stock</button>
             </form>
         </div>
@@ -72,6 +119,9 @@ HTML_TEMPLATE = """
         
         {% if data %}
         <div class="success">✅ Analysis completed successfully!</div>
+        {% if data.stale %}
+        <div class="stale">⏳ Some figures are cached data up to {{ data.stale }} old and are refreshing in the background. Reload for the latest values.</div>
+        {% endif %}
         
         <!-- Current Quote -->
         {% if data.quote %}
@@ -128,11 +178,11 @@ HTML_TEMPLATE = """
             
             <div class="four-column">
                 <div>
-                    <div class="metric-value">${{ "%.2f"|format(data.quote.price) }}</div>
+                    <div class="metric-value" id="livePrice">${{ "%.2f"|format(data.quote.price) }}</div>
                     <div class="metric-label">Current Price</div>
                 </div>
                 <div>
-                    <div class="metric-value" style="color: {{ 'green' if data.quote.change >= 0 else 'red' }}">
+                    <div class="metric-value" id="liveChange" style="color: {{ 'green' if data.quote.change >= 0 else 'red' }}">
                         {{ "%.2f"|format(data.quote.change) }} ({{ "%.2f"|format(data.quote.changesPercentage) }}%)
                     </div>
                     <div class="metric-label">Change (24h)</div>
@@ -168,10 +218,10 @@ HTML_TEMPLATE = """
         {% endif %}
 
         <!-- Enhanced Price Chart with Candlesticks and Bollinger Bands -->
-        {% if data.chart_data %}
+        {% if data.charts %}
         <div class="chart-container">
-            <h2>📊 Enhanced Price Analysis - Candlestick Chart with Bollinger Bands (1 Year)</h2>
-            <div id="priceChart"></div>
+            <h2>📊 Enhanced Price Analysis - Candlestick Chart with Bollinger Bands ({{ data.timeframe }})</h2>
+            <div id="priceChart" class="chart-loading">Loading chart…</div>
             <div style="margin-top: 10px; padding: 10px; background-color: #f8f9fa; border-radius: 5px; font-size: 14px;">
                 <strong>📈 Chart Features:</strong><br>
                 • <span style="color: #00CC96;">🟢 Green Candles:</span> Closing price higher than opening price<br>
@@ -184,10 +234,10 @@ HTML_TEMPLATE = """
         {% endif %}
 
         <!-- Trend Analysis Chart with EMAs and Regression -->
-        {% if data.trend_data %}
+        {% if data.charts %}
         <div class="chart-container">
-            <h2>📈 Trend Analysis - EMAs, Linear Regression & Trend Lines (1 Year)</h2>
-            <div id="trendChart"></div>
+            <h2>📈 Trend Analysis - EMAs, Linear Regression & Trend Lines ({{ data.timeframe }})</h2>
+            <div id="trendChart" class="chart-loading">Loading chart…</div>
             <div style="margin-top: 10px; padding: 10px; background-color: #f0f8ff; border-radius: 5px; font-size: 14px;">
                 <strong>📊 Trend Analysis Features:</strong><br>
                 • <span style="color: #1f77b4;">🔵 Blue Line:</span> Stock closing price<br>
@@ -200,6 +250,54 @@ HTML_TEMPLATE = """
         </div>
         {% endif %}
         
+        <!-- Signal Backtest -->
+        {% if data.charts %}
+        <div class="chart-container">
+            <h2>🧪 Signal Backtest ({{ data.timeframe }})</h2>
+            <table id="backtestTable" style="width: 100%; border-collapse: collapse; font-size: 14px;">
+                <tr style="background-color: #1f77b4; color: white;">
+                    <th style="padding: 8px; text-align: left;">Strategy</th>
+                    <th style="padding: 8px; text-align: right;">Total Return</th>
+                    <th style="padding: 8px; text-align: right;">Annualized</th>
+                    <th style="padding: 8px; text-align: right;">Sharpe</th>
+                    <th style="padding: 8px; text-align: right;">Max Drawdown</th>
+                    <th style="padding: 8px; text-align: right;">Trades</th>
+                    <th style="padding: 8px; text-align: right;">Hit Rate</th>
+                    <th style="padding: 8px; text-align: right;">Time in Market</th>
+                </tr>
+                <tr><td colspan="8" style="padding: 8px; color: #888;">Running backtest…</td></tr>
+            </table>
+            <div style="margin-top: 10px; padding: 10px; background-color: #f8f9fa; border-radius: 5px; font-size: 14px;">
+                Long/flat positions taken at each daily close and held over the next bar, with 5 bps charged per position change.
+                EMA strategies are long while the fast EMA is above the slow one; mean reversion buys below the lower band and exits at the SMA;
+                breakout buys above the upper band and exits below the SMA.
+                <a href="/sweep?symbol={{ data.quote.symbol|urlencode }}&range={{ chart_range }}">Tune the windows and spans →</a>
+            </div>
+        </div>
+        {% endif %}
+
+        <!-- Export -->
+        <div class="chart-container">
+            <h2>📥 Export Data</h2>
+            <form method="POST" action="/export/indicators" style="display: flex; gap: 10px; align-items: center; flex-wrap: wrap;">
+                <input type="hidden" name="api_key" value="{{ api_key }}">
+                <input type="hidden" name="symbol" value="{{ symbol }}">
+                <input type="hidden" name="range" value="{{ chart_range }}">
+                <input type="hidden" name="interval" value="{{ interval }}">
+                <select name="format" style="padding: 8px; border: 1px solid #ddd; border-radius: 4px;">
+                    <option value="csv">CSV</option>
+                    <option value="parquet">Parquet</option>
+                    <option value="arrow">Arrow IPC</option>
+                </select>
+                <button type="submit" class="btn">Price &amp; indicators ({{ data.timeframe }})</button>
+                <button type="submit" class="btn" formaction="/export/dcf">DCF breakdown</button>
+            </form>
+            <div style="margin-top: 10px; font-size: 14px; color: #666;">
+                Every bar at full resolution with the Bollinger, EMA, regression and trend columns shown above.
+                For several symbols at once, use <code>/export/indicators?api_key=KEY&amp;symbols=AAPL,MSFT&amp;format=parquet</code>.
+            </div>
+        </div>
+
         <div class="section-title">💰 Valuation Metrics</div>
         <!-- Valuation Metrics -->
         {% if data.metrics %}
@@ -491,6 +589,9 @@ HTML_TEMPLATE = """
         <!-- DCF Intrinsic Value Analysis -->
         {% if data.dcf %}
         <div class="section-title">💎 DCF Intrinsic Value Analysis</div>
+        {% if data.dcf.valued_on %}
+        <p style="color: #666; font-size: 13px;">Valued by the batch job on {{ data.dcf.valued_on }} (statements {{ data.dcf.input_version.split('/')[0] }}); price, margin of safety and price/intrinsic use the live quote.</p>
+        {% endif %}
         <div class="metrics-grid">
             <div class="metric-card">
                 <h3>🎯 Valuation Results</h3>
@@ -600,17 +701,140 @@ HTML_TEMPLATE = """
             </div>
         </div>
         {% endif %}
+
+        <!-- Intrinsic value as of each fiscal year against the price -->
+        {% if data.valuation_history %}
+        <div class="section-title">📜 Intrinsic Value History</div>
+        <div class="chart-container">
+            <div id="valuationHistoryChart"></div>
+            <table style="width: 100%; margin-top: 10px; border-collapse: collapse; font-size: 14px;">
+                <tr style="background-color: #f8f9fa;"><th style="text-align: left; padding: 6px;">Fiscal year end</th><th style="text-align: right; padding: 6px;">Intrinsic value</th><th style="text-align: right; padding: 6px;">Price</th><th style="text-align: right; padding: 6px;">Margin of safety</th><th style="text-align: right; padding: 6px;">WACC</th></tr>
+                {% for row in data.valuation_history.rows %}
+                <tr>
+                    <td style="padding: 6px;">{{ row.date }}</td>
+                    <td style="text-align: right; padding: 6px;">{{ "$%.2f"|format(row.intrinsic_value) if row.intrinsic_value is not none else '-' }}</td>
+                    <td style="text-align: right; padding: 6px;">{{ "$%.2f"|format(row.price) if row.price is not none else '-' }}</td>
+                    <td style="text-align: right; padding: 6px; color: {{ 'green' if (row.margin_of_safety or 0) > 0 else 'red' }};">{{ "%.1f"|format(row.margin_of_safety) ~ '%' if row.margin_of_safety is not none else '-' }}</td>
+                    <td style="text-align: right; padding: 6px;">{{ "%.2f"|format(row.wacc) }}%</td>
+                </tr>
+                {% endfor %}
+            </table>
+        </div>
+        {% endif %}
         
         {% endif %}
     </div>
 
-    {% if data and data.chart_data %}
+    {% if data and data.charts %}
+    <script>
+        // The metrics above are already rendered; chart traces and the backtest are requested now,
+        // alongside the deferred Plotly bundle, and drawn once both have arrived
+        // Settles with the deferred bundle itself, so a failed download is reported instead of drawn into
+        var plotlyReady = new Promise(function(resolve, reject) {
+            if (window.Plotly) { resolve(); return; }
+            var script = document.getElementById('plotlyScript');
+            script.addEventListener('load', function() { resolve(); });
+            script.addEventListener('error', function() { reject(new Error('Plotly failed to load')); });
+        });
+
+        function showChartError(chart) {
+            chart.className = '';
+            chart.textContent = 'Charts are unavailable: the Plotly library failed to load';
+        }
+
+        function pageForm(fields) {
+            var form = new FormData();
+            form.append('api_key', document.getElementById('api_key').value);
+            form.append('symbol', '{{ data.quote.symbol }}');
+            form.append('range', '{{ chart_range }}');
+            form.append('interval', '{{ interval }}');
+            Object.keys(fields).forEach(function(key) { form.append(key, fields[key]); });
+            return form;
+        }
+
+        function postForm(url, form) {
+            return fetch(url, {method: 'POST', body: form})
+                .then(function(r) { return r.ok ? r.json() : null; })
+                .catch(function() { return null; });
+        }
+
+        // Charts arrive downsampled to the page width; zooming refetches that window at full resolution
+        function attachZoom(chart, kind) {
+            var pending = 0;
+            chart.on('plotly_relayout', function(ev) {
+                var start = ev['xaxis.range[0]'], end = ev['xaxis.range[1]'];
+                if (ev['xaxis.range']) { start = ev['xaxis.range'][0]; end = ev['xaxis.range'][1]; }
+                if (!(start && end) && !ev['xaxis.autorange']) return;
+
+                var fields = {kind: kind, width: chart.clientWidth};
+                if (start && end) { fields.start = start; fields.end = end; }
+                var request = ++pending;
+                postForm('/api/chart', pageForm(fields)).then(function(payload) {
+                    // Drop responses overtaken by a newer zoom
+                    if (!payload || !payload.traces || request !== pending) return;
+                    Plotly.react(chart, payload.traces, chart.layout);
+                });
+            });
+        }
+
+        function loadChart(divId, kind, layout, config) {
+            var chart = document.getElementById(divId);
+            var traces = postForm('/api/chart', pageForm({kind: kind, width: chart.clientWidth}));
+            Promise.all([traces, plotlyReady]).then(function(results) {
+                var payload = results[0];
+                if (!payload || !payload.traces) {
+                    chart.textContent = 'No chart data available';
+                    return;
+                }
+                chart.className = '';
+                chart.textContent = '';
+                Plotly.newPlot(chart, payload.traces, layout, config).then(function() { attachZoom(chart, kind); });
+            }, function() { showChartError(chart); });
+        }
+
+        function formatMetric(value, scale, digits, suffix) {
+            return value === null || value === undefined ? '-' : (value * scale).toFixed(digits) + suffix;
+        }
+
+        postForm('/api/backtest', pageForm({})).then(function(payload) {
+            var table = document.getElementById('backtestTable');
+            var rows = (payload && payload.rows) || [];
+            table.deleteRow(1);
+            if (!rows.length) {
+                var empty = table.insertRow().insertCell();
+                empty.colSpan = 8;
+                empty.style.padding = '8px';
+                empty.textContent = 'Not enough daily history to backtest this range';
+                return;
+            }
+            rows.forEach(function(row) {
+                var tr = table.insertRow();
+                tr.style.borderBottom = '1px solid #eee';
+                [
+                    [row.strategy],
+                    [formatMetric(row.total_return, 100, 2, '%'), (row.total_return || 0) >= 0 ? '#28a745' : '#dc3545'],
+                    [formatMetric(row.annual_return, 100, 2, '%'), (row.annual_return || 0) >= 0 ? '#28a745' : '#dc3545'],
+                    [formatMetric(row.sharpe, 1, 2, '')],
+                    [formatMetric(row.max_drawdown, 100, 2, '%')],
+                    [formatMetric(row.trades, 1, 0, '')],
+                    [formatMetric(row.hit_rate, 100, 1, '%')],
+                    [formatMetric(row.exposure, 100, 1, '%')]
+                ].forEach(function(cell, i) {
+                    var td = tr.insertCell();
+                    td.textContent = cell[0];
+                    td.style.padding = '8px';
+                    if (i) td.style.textAlign = 'right';
+                    if (cell[1]) td.style.color = cell[1];
+                });
+            });
+        });
+    </script>
+
     <script>
         // Enhanced Price Chart with Candlesticks and Bollinger Bands
-        var priceData = {{ data.chart_data|safe }};
         var layout = {
             title: {
-                text: '📊 {{ data.quote.symbol }} - Candlestick Chart with Bollinger Bands (1 Year)',
+                text: '📊 {{ data.quote.symbol }} - Candlestick Chart with Bollinger Bands ({{ data.timeframe }})',
                 font: { size: 18, color: '#333' }
             },
             xaxis: { 
@@ -645,17 +869,14 @@ HTML_TEMPLATE = """
             displaylogo: false
         };
         
-        Plotly.newPlot('priceChart', priceData, layout, config);
+        loadChart('priceChart', 'price', layout, config);
     </script>
-    {% endif %}
 
-    {% if data and data.trend_data %}
     <script>
         // Trend Analysis Chart with EMAs and Regression
-        var trendData = {{ data.trend_data|safe }};
         var trendLayout = {
             title: {
-                text: '📈 {{ data.quote.symbol }} - Trend Analysis with EMAs & Regression (1 Year)',
+                text: '📈 {{ data.quote.symbol }} - Trend Analysis with EMAs & Regression ({{ data.timeframe }})',
                 font: { size: 18, color: '#333' }
             },
             xaxis: { 
@@ -689,7 +910,597 @@ HTML_TEMPLATE = """
             displaylogo: false
         };
         
-        Plotly.newPlot('trendChart', trendData, trendLayout, trendConfig);
+        loadChart('trendChart', 'trend', trendLayout, trendConfig);
+    </script>
+    {% endif %}
+
+    {% if data and data.valuation_history %}
+    <script>
+        // Intrinsic value per fiscal year (held until the next report) against the daily close
+        var valuationHistory = {{ data.valuation_history.chart|tojson }};
+        plotlyReady.then(function() {
+            Plotly.newPlot('valuationHistoryChart', [
+                {x: valuationHistory.price_dates, y: valuationHistory.close, type: 'scatter', mode: 'lines',
+                 name: 'Close', line: {color: '#1f77b4', width: 1.5}},
+                {x: valuationHistory.dates, y: valuationHistory.intrinsic_value, type: 'scatter', mode: 'lines+markers',
+                 name: 'Intrinsic value', line: {color: '#2e7d32', width: 2, shape: 'hv'}, marker: {size: 8}}
+            ], {
+                title: {text: '📜 {{ data.quote.symbol }} - Intrinsic Value as of Each Fiscal Year vs Price', font: {size: 18, color: '#333'}},
+                xaxis: {title: 'Date', type: 'date', showgrid: true, gridcolor: 'rgba(128,128,128,0.2)'},
+                yaxis: {title: 'Price ($)', showgrid: true, gridcolor: 'rgba(128,128,128,0.2)'},
+                hovermode: 'x unified',
+                plot_bgcolor: 'rgba(0,0,0,0)',
+                paper_bgcolor: 'white',
+                legend: {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1},
+                margin: {l: 60, r: 60, t: 80, b: 60}
+            }, {responsive: true, displaylogo: false});
+        }, function() { showChartError(document.getElementById('valuationHistoryChart')); });
+    </script>
+    {% endif %}
+
+    {% if data and data.quote %}
+    <script>
+        // Live quote updates pushed over Server-Sent Events
+        function traceIndex(chart, name) {
+            if (!chart || !chart.data) return -1;
+            return chart.data.findIndex(function(t) { return t.name === name; });
+        }
+
+        function setLastPoint(chart, updates) {
+            // Intrabar tick: patch the latest point of each trace, then redraw without refetching
+            updates.forEach(function(u) {
+                var trace = chart.data[u.index];
+                Object.keys(u.values).forEach(function(key) {
+                    var arr = trace[key];
+                    if (arr && arr.length) arr[arr.length - 1] = u.values[key];
+                });
+            });
+            Plotly.react(chart, chart.data, chart.layout);
+        }
+
+        function applyUpdates(chart, updates, newBar, date) {
+            updates = updates.filter(function(u) { return u.index >= 0; });
+            if (!chart || !updates.length) return;
+            if (newBar) {
+                // New bar: append one point per trace without re-sending the series
+                updates.forEach(function(u) {
+                    var extension = {x: [[date]]};
+                    Object.keys(u.values).forEach(function(key) {
+                        extension[key] = [[u.values[key] !== undefined ? u.values[key] : null]];
+                    });
+                    Plotly.extendTraces(chart, extension, [u.index]);
+                });
+            } else {
+                setLastPoint(chart, updates);
+            }
+        }
+
+        function onQuote(q) {
+            var priceEl = document.getElementById('livePrice');
+            var changeEl = document.getElementById('liveChange');
+            if (priceEl) priceEl.textContent = '$' + q.price.toFixed(2);
+            if (changeEl && q.change !== null) {
+                changeEl.textContent = q.change.toFixed(2) + ' (' + (q.changesPercentage || 0).toFixed(2) + '%)';
+                changeEl.style.color = q.change >= 0 ? 'green' : 'red';
+            }
+            var ind = q.indicators || {};
+
+            // Live bars are daily, so only daily charts are extended in place
+            if (!{{ 'true' if data.interval == 'daily' else 'false' }}) return;
+
+            var priceChart = document.getElementById('priceChart');
+            applyUpdates(priceChart, [
+                {index: traceIndex(priceChart, '{{ data.quote.symbol }} Price'),
+                 values: {open: q.open || q.price, high: Math.max(q.dayHigh || q.price, q.price),
+                          low: Math.min(q.dayLow || q.price, q.price), close: q.price}},
+                {index: traceIndex(priceChart, 'Upper BB (20,2)'), values: {y: ind.bb_upper}},
+                {index: traceIndex(priceChart, 'SMA (20)'), values: {y: ind.sma}},
+                {index: traceIndex(priceChart, 'Lower BB (20,2)'), values: {y: ind.bb_lower}}
+            ], q.new_bar, q.date);
+
+            var trendChart = document.getElementById('trendChart');
+            applyUpdates(trendChart, [
+                {index: traceIndex(trendChart, '{{ data.quote.symbol }} Price'), values: {y: q.price}},
+                {index: traceIndex(trendChart, 'EMA 20'), values: {y: ind.ema20}},
+                {index: traceIndex(trendChart, 'EMA 50'), values: {y: ind.ema50}},
+                {index: traceIndex(trendChart, 'EMA 200'), values: {y: ind.ema200}}
+            ], q.new_bar, q.date);
+        }
+
+        if (window.EventSource) {
+            var quoteStream = new EventSource('/stream/quotes?symbols={{ data.quote.symbol|urlencode }}&token={{ data.quote_token|urlencode }}');
+            quoteStream.onmessage = function(event) { onQuote(JSON.parse(event.data)); };
+        }
+    </script>
+    {% endif %}
+</body>
+</html>
+"""
+
+SCREENER_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Stock Screener</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f2f6; }
+        .container { max-width: 1400px; margin: 0 auto; }
+        .header { text-align: center; background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .form-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .input-group { margin: 10px 0; }
+        .input-group label { display: block; margin-bottom: 5px; font-weight: bold; }
+        .input-group input, .input-group select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; box-sizing: border-box; }
+        .btn { background-color: #1f77b4; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
+        .btn:hover { background-color: #155a8a; }
+        .error { color: red; background-color: #fee; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .success { color: green; background-color: #efe; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .stale { color: #8a6d3b; background-color: #fcf8e3; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .two-column { display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }
+        .four-column { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+        .hint { color: #666; font-size: 13px; }
+        table { width: 100%; border-collapse: collapse; background: white; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        th, td { padding: 8px 10px; border-bottom: 1px solid #eee; text-align: right; font-size: 14px; }
+        th { background: #1f77b4; color: white; }
+        th:nth-child(-n+3), td:nth-child(-n+3) { text-align: left; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🔎 Stock Screener</h1>
+            <p>Filter, sort and rank a whole index on TTM valuation and quality metrics · <a href="/">Single stock analysis</a> · <a href="/portfolio">Portfolio risk</a></p>
+        </div>
+
+        <div class="form-container">
+            <form method="POST">
+                <div class="two-column">
+                    <div class="input-group">
+                        <label for="api_key">FMP API Key:</label>
+                        <input type="password" id="api_key" name="api_key" value="{{ api_key or '' }}" placeholder="Enter your Financial Modeling Prep API key">
+                    </div>
+                    <div class="input-group">
+                        <label for="universe">Universe:</label>
+                        <select id="universe" name="universe">
+                            {% for key, label in universes.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == universe }}>{{ label }}</option>
+                            {% endfor %}
+                            <option value="custom" {{ 'selected' if universe == 'custom' }}>Custom list</option>
+                        </select>
+                    </div>
+                </div>
+                <div class="input-group">
+                    <label for="symbols">Custom Symbols:</label>
+                    <input type="text" id="symbols" name="symbols" value="{{ symbols or '' }}" placeholder="e.g., AAPL, MSFT, GOOGL (used with Custom list)">
+                    <div class="hint">A first (uncached) screen makes two calls per symbol, about 1,010 for the S&amp;P 500, and stops after {{ screen_deadline|round|int }} s; run it again to fill in symbols it did not reach.</div>
+                </div>
+                <div class="input-group">
+                    <label for="filters">Filters:</label>
+                    <input type="text" id="filters" name="filters" value="{{ filters or '' }}" placeholder="e.g., pe<25, roe>15%, debt_to_equity<=1">
+                    <div class="hint">Columns: {{ columns|join(', ') }}. Percent columns accept 15% or 0.15.</div>
+                </div>
+                <div class="four-column">
+                    <div class="input-group">
+                        <label for="sort_by">Sort By:</label>
+                        <select id="sort_by" name="sort_by">
+                            <option value="score" {{ 'selected' if sort_by == 'score' }}>Composite rank</option>
+                            {% for key, label in labels.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == sort_by }}>{{ label }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="order">Order:</label>
+                        <select id="order" name="order">
+                            <option value="asc" {{ 'selected' if not descending }}>Ascending</option>
+                            <option value="desc" {{ 'selected' if descending }}>Descending</option>
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="limit">Show Top:</label>
+                        <input type="number" id="limit" name="limit" min="1" value="{{ limit }}">
+                    </div>
+                </div>
+                <button type="submit" class="btn">🔎 Run Screen</button>
+            </form>
+        </div>
+
+        {% if error %}
+        <div class="error">{{ error }}</div>
+        {% endif %}
+
+        {% if rows is not none %}
+        <div class="success">{{ matched }} of {{ total }} symbols matched · screened in {{ "%.2f"|format(elapsed_ms) }} ms</div>
+        {% if unavailable %}
+        <div class="stale">⚠️ {{ unavailable|length }} symbols were not loaded in time or returned errors; they are listed with empty metrics: {{ unavailable[:20]|join(', ') }}{% if unavailable|length > 20 %}, …{% endif %}. Loaded symbols stay cached, so screening again fills in more of them.</div>
+        {% endif %}
+        <table>
+            <tr>
+                <th>#</th><th>Symbol</th><th>Name</th>
+                {% if sort_by == 'score' %}<th>Score</th>{% endif %}
+                {% for key, label in labels.items() %}<th>{{ label }}</th>{% endfor %}
+            </tr>
+            {% for row in rows %}
+            <tr>
+                <td>{{ loop.index }}</td><td><b>{{ row.symbol }}</b></td><td>{{ row.name }}</td>
+                {% if sort_by == 'score' %}<td>{{ "%.2f"|format(row.score) }}</td>{% endif %}
+                {% for key in labels %}
+                <td>
+                    {% if row[key] is none %}-
+                    {% elif key in percent_columns %}{{ "%.2f"|format(row[key] * 100) }}%
+                    {% elif key == 'market_cap' %}${{ "%.1f"|format(row[key] / 1e9) }}B
+                    {% else %}{{ "%.2f"|format(row[key]) }}{% endif %}
+                </td>
+                {% endfor %}
+            </tr>
+            {% endfor %}
+        </table>
+        {% endif %}
+    </div>
+</body>
+</html>
+"""
+
+PORTFOLIO_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Portfolio Risk</title>
+    <script src="{{ plotly_src }}"></script>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f2f6; }
+        .container { max-width: 1400px; margin: 0 auto; }
+        .header { text-align: center; background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .form-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .chart-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .input-group { margin: 10px 0; }
+        .input-group label { display: block; margin-bottom: 5px; font-weight: bold; }
+        .input-group input, .input-group select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; box-sizing: border-box; }
+        .btn { background-color: #1f77b4; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
+        .btn:hover { background-color: #155a8a; }
+        .error { color: red; background-color: #fee; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .success { color: green; background-color: #efe; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .four-column { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+        table { width: 100%; border-collapse: collapse; background: white; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        th, td { padding: 8px 10px; border-bottom: 1px solid #eee; text-align: right; font-size: 14px; }
+        th { background: #1f77b4; color: white; }
+        th:first-child, td:first-child { text-align: left; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📐 Portfolio Risk & Correlation</h1>
+            <p>Returns, volatility, drawdowns, beta and correlations across many symbols · <a href="/">Single stock analysis</a> · <a href="/screener">Stock screener</a></p>
+        </div>
+
+        <div class="form-container">
+            <form method="POST">
+                <div class="four-column">
+                    <div class="input-group">
+                        <label for="api_key">FMP API Key:</label>
+                        <input type="password" id="api_key" name="api_key" value="{{ api_key or '' }}" placeholder="Enter your Financial Modeling Prep API key">
+                    </div>
+                    <div class="input-group">
+                        <label for="universe">Universe:</label>
+                        <select id="universe" name="universe">
+                            <option value="custom" {{ 'selected' if universe == 'custom' }}>Custom list</option>
+                            {% for key, label in universes.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == universe }}>{{ label }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="range">Range:</label>
+                        <select id="range" name="range">
+                            {% for key, option in ranges.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == chart_range }}>{{ option[0] }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="benchmark">Beta Benchmark:</label>
+                        <input type="text" id="benchmark" name="benchmark" value="{{ benchmark or '' }}" placeholder="e.g., SPY">
+                    </div>
+                </div>
+                <div class="input-group">
+                    <label for="symbols">Symbols:</label>
+                    <input type="text" id="symbols" name="symbols" value="{{ symbols or '' }}" placeholder="e.g., AAPL, MSFT, GOOGL, AMZN (used with Custom list)">
+                </div>
+                <button type="submit" class="btn">📐 Analyze Portfolio</button>
+            </form>
+        </div>
+
+        {% if error %}
+        <div class="error">{{ error }}</div>
+        {% endif %}
+
+        {% if rows %}
+        <div class="success">✅ {{ rows|length }} symbols over {{ days }} trading days{% if missing %} · no history for {{ missing|join(', ') }}{% endif %}</div>
+
+        <div class="chart-container">
+            <div id="heatmap" style="height: {{ heatmap_height }}px;"></div>
+        </div>
+
+        <table>
+            <tr>
+                <th>Symbol</th><th>Total Return</th><th>Annualized</th><th>Volatility</th>
+                <th>Sharpe</th><th>Max Drawdown</th><th>Beta{% if benchmark_used %} ({{ benchmark_used }}){% endif %}</th><th>Days</th>
+            </tr>
+            {% for row in rows %}
+            <tr>
+                <td><b>{{ row.symbol }}</b></td>
+                {% for key in ['total_return', 'annual_return', 'volatility'] %}
+                <td>{{ "%.2f"|format(row[key] * 100) ~ '%' if row[key] is not none else '-' }}</td>
+                {% endfor %}
+                <td>{{ "%.2f"|format(row.sharpe) if row.sharpe is not none else '-' }}</td>
+                <td>{{ "%.2f"|format(row.max_drawdown * 100) ~ '%' if row.max_drawdown is not none else '-' }}</td>
+                <td>{{ "%.2f"|format(row.beta) if row.beta is not none else '-' }}</td>
+                <td>{{ row.observations }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endif %}
+    </div>
+
+    {% if heatmap %}
+    <script>
+        var heatmap = {{ heatmap|tojson }};
+        Plotly.newPlot('heatmap', [{
+            type: 'heatmap',
+            z: heatmap.z,
+            x: heatmap.symbols,
+            y: heatmap.symbols,
+            zmin: -1,
+            zmax: 1,
+            colorscale: 'RdBu',
+            reversescale: true,
+            hoverongaps: false
+        }], {
+            title: 'Daily Return Correlation',
+            yaxis: {autorange: 'reversed'},
+            margin: {l: 70, b: 70}
+        }, {responsive: true});
+    </script>
+    {% endif %}
+</body>
+</html>
+"""
+
+COMPARE_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Compare Symbols</title>
+    <script src="{{ plotly_src }}"></script>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f2f6; }
+        .container { max-width: 1400px; margin: 0 auto; }
+        .header { text-align: center; background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .form-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .chart-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .input-group { margin: 10px 0; }
+        .input-group label { display: block; margin-bottom: 5px; font-weight: bold; }
+        .input-group input, .input-group select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; box-sizing: border-box; }
+        .btn { background-color: #1f77b4; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
+        .btn:hover { background-color: #155a8a; }
+        .error { color: red; background-color: #fee; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .success { color: green; background-color: #efe; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .four-column { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+        table { width: 100%; border-collapse: collapse; background: white; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        th, td { padding: 8px 10px; border-bottom: 1px solid #eee; text-align: right; font-size: 14px; }
+        th { background: #1f77b4; color: white; }
+        th:first-child, td:first-child { text-align: left; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📈 Compare Symbols</h1>
+            <p>Normalized price and EMA lines for up to {{ max_symbols }} tickers on one chart · <a href="/">Single stock analysis</a> · <a href="/portfolio">Portfolio risk</a></p>
+        </div>
+
+        <div class="form-container">
+            <form method="POST" onsubmit="document.getElementById('chart_width').value = document.querySelector('.container').clientWidth;">
+                <input type="hidden" id="chart_width" name="chart_width" value="{{ chart_width }}">
+                <div class="four-column">
+                    <div class="input-group">
+                        <label for="api_key">FMP API Key:</label>
+                        <input type="password" id="api_key" name="api_key" value="{{ api_key or '' }}" placeholder="Enter your Financial Modeling Prep API key">
+                    </div>
+                    <div class="input-group">
+                        <label for="range">Range:</label>
+                        <select id="range" name="range">
+                            {% for key, option in ranges.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == chart_range }}>{{ option[0] }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="interval">Interval:</label>
+                        <select id="interval" name="interval">
+                            {% for key, label in intervals.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == interval }}>{{ label }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="ema">EMA:</label>
+                        <select id="ema" name="ema">
+                            {% for span in ema_spans %}
+                            <option value="{{ span }}" {{ 'selected' if span == ema_span }}>EMA {{ span }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                </div>
+                <div class="input-group">
+                    <label for="symbols">Symbols:</label>
+                    <input type="text" id="symbols" name="symbols" value="{{ symbols or '' }}" placeholder="e.g., AAPL, MSFT, GOOGL, AMZN, NVDA">
+                </div>
+                <button type="submit" class="btn">📈 Compare</button>
+            </form>
+        </div>
+
+        {% if error %}
+        <div class="error">{{ error }}</div>
+        {% endif %}
+
+        {% if chart %}
+        <div class="success">✅ {{ chart.symbols|length }} symbols, {{ timeframe }}{% if dropped %} · only the first {{ max_symbols }} are shown, skipped {{ dropped|join(', ') }}{% endif %}{% if missing %} · no history for {{ missing|join(', ') }}{% endif %}</div>
+
+        <div class="chart-container">
+            <div id="compare" style="height: 600px;"></div>
+        </div>
+
+        <table>
+            <tr><th>Symbol</th><th>Change</th><th>vs EMA {{ ema_span }}</th></tr>
+            {% for row in rows %}
+            <tr>
+                <td><b>{{ row.symbol }}</b></td>
+                <td style="color: {{ '#28a745' if (row.change or 0) >= 0 else '#dc3545' }};">{{ "%.2f"|format(row.change * 100) ~ '%' if row.change is not none else '-' }}</td>
+                <td>{{ 'Above' if row.above_ema else 'Below' }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endif %}
+    </div>
+
+    {% if chart %}
+    <script>
+        var chart = {{ chart|tojson }};
+        var palette = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'];
+        var traces = [];
+        chart.symbols.forEach(function(symbol, i) {
+            var color = palette[i % palette.length];
+            var dash = i < palette.length ? 'solid' : 'dash';
+            traces.push({x: chart.dates, y: chart.price[i], type: 'scatter', mode: 'lines', name: symbol,
+                         legendgroup: symbol, line: {color: color, width: 2, dash: dash},
+                         hovertemplate: symbol + ': %{y:.1f}<extra></extra>'});
+            traces.push({x: chart.dates, y: chart.ema[i], type: 'scatter', mode: 'lines', name: symbol + ' EMA ' + chart.ema_span,
+                         legendgroup: symbol, showlegend: false, line: {color: color, width: 1, dash: 'dot'},
+                         hovertemplate: symbol + ' EMA: %{y:.1f}<extra></extra>'});
+        });
+        Plotly.newPlot('compare', traces, {
+            title: 'Price rebased to 100 with EMA ' + chart.ema_span,
+            hovermode: 'x unified',
+            yaxis: {title: 'Rebased price'},
+            margin: {t: 50}
+        }, {responsive: true});
+    </script>
+    {% endif %}
+</body>
+</html>
+"""
+
+SWEEP_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Indicator Parameter Sweep</title>
+    <script src="{{ plotly_src }}"></script>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f2f6; }
+        .container { max-width: 1400px; margin: 0 auto; }
+        .header { text-align: center; background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .form-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .chart-container { background: white; padding: 20px; margin: 20px 0; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .input-group { margin: 10px 0; }
+        .input-group label { display: block; margin-bottom: 5px; font-weight: bold; }
+        .input-group input, .input-group select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; box-sizing: border-box; }
+        .btn { background-color: #1f77b4; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
+        .btn:hover { background-color: #155a8a; }
+        .error { color: red; background-color: #fee; padding: 10px; border-radius: 4px; margin: 10px 0; }
+        .three-column { display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 10px; }
+        .four-column { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+        table { width: 100%; border-collapse: collapse; background: white; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        th, td { padding: 8px 10px; border-bottom: 1px solid #eee; text-align: right; font-size: 14px; }
+        th { background: #1f77b4; color: white; }
+        th:nth-child(-n+2), td:nth-child(-n+2) { text-align: left; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🎛️ Indicator Parameter Sweep</h1>
+            <p>Backtest every Bollinger window/multiplier and EMA span pair at once · <a href="/">Single stock analysis</a></p>
+        </div>
+
+        <div class="form-container">
+            <form method="POST">
+                <div class="four-column">
+                    <div class="input-group">
+                        <label for="api_key">FMP API Key:</label>
+                        <input type="password" id="api_key" name="api_key" value="{{ api_key or '' }}" placeholder="Enter your Financial Modeling Prep API key">
+                    </div>
+                    <div class="input-group">
+                        <label for="symbol">Stock Symbol:</label>
+                        <input type="text" id="symbol" name="symbol" value="{{ symbol or 'AAPL' }}" placeholder="e.g., AAPL">
+                    </div>
+                    <div class="input-group">
+                        <label for="range">Range:</label>
+                        <select id="range" name="range">
+                            {% for key, option in ranges.items() %}
+                            <option value="{{ key }}" {{ 'selected' if key == chart_range }}>{{ option[0] }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                    <div class="input-group">
+                        <label for="metric">Score By:</label>
+                        <select id="metric" name="metric">
+                            {% for key in metrics %}
+                            <option value="{{ key }}" {{ 'selected' if key == metric }}>{{ key.replace('_', ' ').title() }}</option>
+                            {% endfor %}
+                        </select>
+                    </div>
+                </div>
+                <button type="submit" class="btn">🎛️ Run Sweep</button>
+            </form>
+        </div>
+
+        {% if error %}
+        <div class="error">{{ error }}</div>
+        {% endif %}
+
+        {% if sweep %}
+        <div class="three-column">
+            <div class="chart-container"><div id="reversionMap"></div></div>
+            <div class="chart-container"><div id="breakoutMap"></div></div>
+            <div class="chart-container"><div id="emaMap"></div></div>
+        </div>
+
+        <table>
+            <tr>
+                <th>#</th><th>Configuration</th><th>Sharpe</th><th>Total Return</th><th>Max Drawdown</th><th>Trades</th><th>Hit Rate</th>
+            </tr>
+            {% for row in top %}
+            <tr>
+                <td>{{ loop.index }}</td>
+                <td>{{ strategy_labels[row.strategy] }} ({{ row.params }})</td>
+                <td>{{ "%.2f"|format(row.sharpe) if row.sharpe is not none else '-' }}</td>
+                <td>{{ "%.2f"|format(row.total_return * 100) ~ '%' if row.total_return is not none else '-' }}</td>
+                <td>{{ "%.2f"|format(row.max_drawdown * 100) ~ '%' if row.max_drawdown is not none else '-' }}</td>
+                <td>{{ row.trades|int if row.trades is not none else '-' }}</td>
+                <td>{{ "%.1f"|format(row.hit_rate * 100) ~ '%' if row.hit_rate is not none else '-' }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endif %}
+    </div>
+
+    {% if sweep %}
+    <script>
+        var sweep = {{ sweep|tojson }};
+        function drawMap(id, title, z, x, y, xTitle, yTitle) {
+            Plotly.newPlot(id, [{type: 'heatmap', z: z, x: x, y: y, colorscale: 'RdYlGn', hoverongaps: false}], {
+                title: title,
+                xaxis: {title: xTitle, type: 'category'},
+                yaxis: {title: yTitle, type: 'category'},
+                height: 380,
+                margin: {l: 60, r: 10, t: 50, b: 50}
+            }, {responsive: true});
+        }
+        drawMap('reversionMap', 'Mean Reversion ({{ metric_label }})', sweep.reversion, sweep.multipliers, sweep.windows, 'Std multiplier', 'Window');
+        drawMap('breakoutMap', 'Breakout ({{ metric_label }})', sweep.breakout, sweep.multipliers, sweep.windows, 'Std multiplier', 'Window');
+        drawMap('emaMap', 'EMA Crossover ({{ metric_label }})', sweep.ema, sweep.spans, sweep.spans, 'Slow span', 'Fast span');
     </script>
     {% endif %}
 </body>
@@ -700,10 +1511,7 @@ HTML_TEMPLATE = """
 def fetch_quote(symbol, api_key):
     """Fetch current stock quote"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={api_key}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data[0] if data and len(data) > 0 else None
+        return get_provider().quote(symbol, api_key)
     except Exception as e:
         print(f"Error fetching quote: {e}")
         return None
@@ -711,10 +1519,7 @@ def fetch_quote(symbol, api_key):
 def fetch_key_metrics(symbol, api_key):
     """Fetch key metrics TTM"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/key-metrics-ttm/{symbol}?apikey={api_key}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data[0] if data and len(data) > 0 else None
+        return get_provider().key_metrics_ttm(symbol, api_key)
     except Exception as e:
         print(f"Error fetching metrics: {e}")
         return None
@@ -722,10 +1527,7 @@ def fetch_key_metrics(symbol, api_key):
 def fetch_ratios(symbol, api_key):
     """Fetch financial ratios TTM"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/ratios-ttm/{symbol}?apikey={api_key}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data[0] if data and len(data) > 0 else None
+        return get_provider().ratios_ttm(symbol, api_key)
     except Exception as e:
         print(f"Error fetching ratios: {e}")
         return None
@@ -733,10 +1535,8 @@ def fetch_ratios(symbol, api_key):
 def fetch_financial_growth(symbol, api_key):
     """Fetch financial growth metrics"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/financial-growth/{symbol}?apikey={api_key}&limit=1"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data[0] if data and len(data) > 0 else None
+        data = get_provider().financial_growth(symbol, api_key)
+        return data[0] if data else None
     except Exception as e:
         print(f"Error fetching growth data: {e}")
         return None
@@ -746,12 +1546,9 @@ def calculate_bollinger_bands(prices, window=20, num_std=2):
     if len(prices) < window:
         return None, None, None
     
-    # Convert to pandas Series for easier calculation
-    price_series = pd.Series(prices)
-    
-    # Calculate moving average and standard deviation
-    sma = price_series.rolling(window=window).mean()
-    std = price_series.rolling(window=window).std()
+    # Calculate moving average and sample standard deviation (NaN until the window is full)
+    sma, std = rolling_mean_std(np.asarray(prices, dtype=np.float64)[:, None], window)
+    sma, std = sma[:, 0], std[:, 0]
     
     # Calculate Bollinger Bands
     upper_band = sma + (std * num_std)
@@ -765,17 +1562,12 @@ def calculate_ema(prices, window):
     if len(prices) < window:
         return [None] * len(prices)
     
-    price_series = pd.Series(prices)
-    ema = price_series.ewm(span=window, adjust=False).mean()
-    return ema.tolist()
+    return ema_series(np.asarray(prices, dtype=np.float64), window).tolist()
 
 
 def calculate_linear_regression(prices, dates):
     """Calculate linear regression line"""
     try:
-        import numpy as np
-        from datetime import datetime
-        
         # Convert dates to numeric values (days since first date)
         date_objects = [datetime.strptime(date, '%Y-%m-%d') for date in dates]
         start_date = date_objects[0]
@@ -808,8 +1600,6 @@ def calculate_linear_regression(prices, dates):
 def calculate_trend_line(prices, dates, lookback_period=50):
     """Calculate trend line based on significant highs and lows"""
     try:
-        import numpy as np
-        
         if len(prices) < lookback_period:
             return [None] * len(prices)
         
@@ -856,30 +1646,38 @@ def calculate_trend_line(prices, dates, lookback_period=50):
         print(f"Error calculating trend line: {e}")
         return [None] * len(prices)
 
-def fetch_historical_prices(symbol, api_key, period="1year"):
+def fetch_historical_prices(symbol, api_key, period="1Y", interval="daily", max_points=None, window=None):
     """Fetch historical price data for candlestick charts with Bollinger bands"""
     try:
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
-        
-        url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?from={start_date.strftime('%Y-%m-%d')}&to={end_date.strftime('%Y-%m-%d')}&apikey={api_key}"
-        response = requests.get(url, timeout=15)
-        data = response.json()
+        # Sliced and resampled from the locally cached daily series
+        series = get_ohlcv(symbol, api_key, period, interval)
         
-        if 'historical' in data and len(data['historical']) > 0:
+        if series is not None:
             # Prepare data for Plotly candlestick chart
-            historical = data['historical'][::-1]  # Reverse to get chronological order
+            bars = to_chart_lists(series)
             
-            dates = [item['date'] for item in historical]
-            opens = [item['open'] for item in historical]
-            highs = [item['high'] for item in historical]
-            lows = [item['low'] for item in historical]
-            closes = [item['close'] for item in historical]
+            dates = bars['dates']
+            opens = bars['open']
+            highs = bars['high']
+            lows = bars['low']
+            closes = bars['close']
             
             # Calculate Bollinger Bands
             sma, upper_band, lower_band = calculate_bollinger_bands(closes)
             
+            # Zoom window and downsampling come after the indicators so those see the full series
+            lo, hi = window_bounds(dates, window)
+            dates, opens, highs, lows, closes = (v[lo:hi] for v in (dates, opens, highs, lows, closes))
+            bands = [band[lo:hi] for band in (sma, upper_band, lower_band)] if sma else None
+            max_candles = max_points // PIXELS_PER_CANDLE if max_points else None
+            if max_candles and len(closes) > max_candles:
+                starts, ends, opens, highs, lows, closes = minmax_ohlc(opens, highs, lows, closes, max_candles)
+                dates = take(dates, starts)
+                opens, highs, lows, closes = opens.tolist(), highs.tolist(), lows.tolist(), closes.tolist()
+                bands = [take(band, ends) for band in bands] if bands else None
+            if bands:
+                sma, upper_band, lower_band = bands
+            
             # Candlestick chart data
             candlestick_trace = {
                 'x': dates,
@@ -944,23 +1742,18 @@ def fetch_historical_prices(symbol, api_key, period="1year"):
         return None
 
 
-def fetch_trend_analysis_data(symbol, api_key, period="1year"):
+def fetch_trend_analysis_data(symbol, api_key, period="1Y", interval="daily", max_points=None, window=None):
     """Fetch historical data for trend analysis with EMAs and regression"""
     try:
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
-        
-        url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?from={start_date.strftime('%Y-%m-%d')}&to={end_date.strftime('%Y-%m-%d')}&apikey={api_key}"
-        response = requests.get(url, timeout=15)
-        data = response.json()
+        # Shares the cached daily series with fetch_historical_prices
+        series = get_ohlcv(symbol, api_key, period, interval)
         
-        if 'historical' in data and len(data['historical']) > 0:
+        if series is not None:
             # Prepare data for trend analysis
-            historical = data['historical'][::-1]  # Reverse to get chronological order
+            bars = to_chart_lists(series)
             
-            dates = [item['date'] for item in historical]
-            closes = [item['close'] for item in historical]
+            dates = bars['dates']
+            closes = bars['close']
             
             # Calculate EMAs
             ema20 = calculate_ema(closes, 20)
@@ -973,6 +1766,14 @@ def fetch_trend_analysis_data(symbol, api_key, period="1year"):
             # Calculate trend line
             trend_line = calculate_trend_line(closes, dates)
             
+            # Zoom window, then LTTB on the closes; overlays keep the same points so traces stay aligned
+            lo, hi = window_bounds(dates, window)
+            lines = [v[lo:hi] for v in (dates, closes, ema20, ema50, ema200, regression_line, trend_line)]
+            if max_points and len(lines[1]) > max_points:
+                keep = lttb_indices(lines[1], max_points)
+                lines = [take(v, keep) for v in lines]
+            dates, closes, ema20, ema50, ema200, regression_line, trend_line = lines
+            
             # Create closing price line
             price_trace = {
                 'x': dates,
@@ -1058,10 +1859,8 @@ def fetch_trend_analysis_data(symbol, api_key, period="1year"):
 def fetch_cash_flow_statement(symbol, api_key):
     """Fetch cash flow statement for DCF analysis"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{symbol}?apikey={api_key}&limit=5"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data if data and len(data) > 0 else None
+        data = get_provider().cash_flow_statement(symbol, api_key)
+        return data if data else None
     except Exception as e:
         print(f"Error fetching cash flow statement: {e}")
         return None
@@ -1069,10 +1868,8 @@ def fetch_cash_flow_statement(symbol, api_key):
 def fetch_income_statement(symbol, api_key):
     """Fetch income statement for DCF analysis"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/income-statement/{symbol}?apikey={api_key}&limit=5"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data if data and len(data) > 0 else None
+        data = get_provider().income_statement(symbol, api_key)
+        return data if data else None
     except Exception as e:
         print(f"Error fetching income statement: {e}")
         return None
@@ -1080,130 +1877,153 @@ def fetch_income_statement(symbol, api_key):
 def fetch_balance_sheet(symbol, api_key):
     """Fetch balance sheet for DCF analysis"""
     try:
-        url = f"https://financialmodelingprep.com/api/v3/balance-sheet-statement/{symbol}?apikey={api_key}&limit=5"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        return data if data and len(data) > 0 else None
+        data = get_provider().balance_sheet(symbol, api_key)
+        return data if data else None
     except Exception as e:
         print(f"Error fetching balance sheet: {e}")
         return None
 
-def calculate_dcf_valuation(cash_flow_data, income_data, balance_sheet_data, growth_data, quote_data):
-    """Calculate DCF intrinsic value with detailed assumptions"""
+def fetch_backtest(symbol, api_key, period="1Y"):
+    """Backtest the chart's EMA crossover and Bollinger signals on the daily history"""
     try:
-        if not cash_flow_data or not income_data or not balance_sheet_data:
+        series = get_ohlcv(symbol, api_key, period, 'daily')
+        if series is None or len(series['close']) < 2:
             return None
-            
-        # Get latest financial data
-        latest_cf = cash_flow_data[0]
-        latest_income = income_data[0]
-        latest_bs = balance_sheet_data[0]
-        
-        # Key DCF inputs
-        free_cash_flow = latest_cf.get('freeCashFlow', 0)
-        revenue = latest_income.get('revenue', 0)
-        total_debt = latest_bs.get('totalDebt', 0)
-        cash_and_equivalents = latest_bs.get('cashAndCashEquivalents', 0)
-        shares_outstanding = quote_data.get('sharesOutstanding', 0)
-        
-        if free_cash_flow <= 0 or shares_outstanding <= 0:
+        return backtest_rows(run_backtest(series['close'][:, None]))
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        return None
+
+def fetch_dcf_valuation(symbol, api_key, quote, growth=None):
+    """DCF from the nightly batch with its price fields moved to the live quote, else computed from the statements"""
+    if not quote:
+        return None
+    stored = get_valuation_store().get(symbol)
+    if stored:
+        return live_valuation(stored, quote.get('price', 0))
+    cash_flow_data = fetch_cash_flow_statement(symbol, api_key)
+    income_data = fetch_income_statement(symbol, api_key)
+    balance_sheet_data = fetch_balance_sheet(symbol, api_key)
+    if not (cash_flow_data and income_data and balance_sheet_data):
+        return None
+    if growth is None:
+        growth = fetch_financial_growth(symbol, api_key)
+    return calculate_dcf_valuation(cash_flow_data, income_data, balance_sheet_data, growth, quote)
+
+INDICATOR_EXPORT_SCHEMA = [('symbol', 'string'), ('date', 'date'), ('open', 'float'), ('high', 'float'),
+                           ('low', 'float'), ('close', 'float'), ('volume', 'float'), ('sma_20', 'float'),
+                           ('bb_upper', 'float'), ('bb_lower', 'float'), ('ema_20', 'float'), ('ema_50', 'float'),
+                           ('ema_200', 'float'), ('regression', 'float'), ('trend_line', 'float')]
+DCF_SUMMARY_FIELDS = ('intrinsic_value', 'current_price', 'margin_of_safety', 'price_to_intrinsic', 'wacc',
+                      'terminal_growth', 'fcf_growth_5yr', 'enterprise_value', 'equity_value', 'total_debt',
+                      'cash_and_equivalents', 'free_cash_flow')
+DCF_EXPORT_SCHEMA = [('symbol', 'string'), ('period', 'string'), ('fcf', 'float'), ('present_value', 'float')] + \
+                    [(field, 'float') for field in DCF_SUMMARY_FIELDS]
+
+def indicator_columns(symbol, api_key, period="1Y", interval="daily"):
+    """Full-resolution OHLCV plus the chart's Bollinger, EMA, regression and trend columns for one symbol"""
+    series = get_ohlcv(symbol, api_key, period, interval)
+    if series is None:
+        return None
+    bars = to_chart_lists(series)
+    closes, dates = bars['close'], bars['dates']
+    sma, upper_band, lower_band = calculate_bollinger_bands(closes)
+    missing = [None] * len(closes)
+    return {
+        'symbol': [symbol] * len(closes),
+        'date': dates,
+        **{field: bars[field] for field in ('open', 'high', 'low', 'close', 'volume')},
+        'sma_20': sma or missing,
+        'bb_upper': upper_band or missing,
+        'bb_lower': lower_band or missing,
+        'ema_20': calculate_ema(closes, 20),
+        'ema_50': calculate_ema(closes, 50),
+        'ema_200': calculate_ema(closes, 200),
+        'regression': calculate_linear_regression(closes, dates),
+        'trend_line': calculate_trend_line(closes, dates),
+    }
+
+def dcf_columns(symbol, api_key):
+    """One row per projected year plus a terminal row, each carrying the valuation summary"""
+    dcf = fetch_dcf_valuation(symbol, api_key, fetch_quote(symbol, api_key))
+    if not dcf:
+        return None
+    periods = [str(year) for year in range(1, len(dcf['projected_fcf']) + 1)] + ['terminal']
+    return {
+        'symbol': [symbol] * len(periods),
+        'period': periods,
+        'fcf': dcf['projected_fcf'] + [dcf['terminal_value']],
+        'present_value': dcf['pv_fcf'] + [dcf['pv_terminal']],
+        **{field: [dcf[field]] * len(periods) for field in DCF_SUMMARY_FIELDS},
+    }
+
+def _finite_or_none(values):
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+def fetch_valuation_history(symbol, api_key, max_points=None):
+    """Intrinsic value as of each fetched fiscal year plus the daily closes since the oldest one
+
+    Reads only the statements, growth rows and daily history the page loads anyway. Call it
+    before the chart fetches: its longer daily series then serves the chart ranges from cache.
+    """
+    try:
+        cash_flow_data = fetch_cash_flow_statement(symbol, api_key)
+        start = history_start(cash_flow_data)
+        if start is None:
             return None
-            
-        # Growth assumptions
-        revenue_growth = growth_data.get('revenueGrowth', 0.05) if growth_data else 0.05
-        fcf_growth_5yr = min(max(revenue_growth, 0.02), 0.25)  # Cap between 2% and 25%
-        terminal_growth = 0.025  # Long-term GDP growth assumption
-        
-        # Discount rate calculation (WACC approximation)
-        risk_free_rate = 0.045  # Current 10-year treasury approximate
-        market_risk_premium = 0.06  # Historical equity risk premium
-        beta = 1.2  # Default beta assumption
-        cost_of_equity = risk_free_rate + (beta * market_risk_premium)
-        
-        # Weight of debt and equity (simplified)
-        market_cap = quote_data.get('marketCap', 0)
-        total_value = market_cap + total_debt
-        if total_value > 0:
-            equity_weight = market_cap / total_value
-            debt_weight = total_debt / total_value
-            cost_of_debt = 0.04  # Assumed cost of debt
-            tax_rate = 0.25  # Assumed tax rate
-            wacc = (equity_weight * cost_of_equity) + (debt_weight * cost_of_debt * (1 - tax_rate))
-        else:
-            wacc = cost_of_equity
-            
-        # Project future cash flows (5 years)
-        projected_fcf = []
-        current_fcf = free_cash_flow
-        
-        for year in range(1, 6):
-            # Declining growth rate over 5 years
-            growth_rate = fcf_growth_5yr * (0.8 ** (year - 1))  # Declining growth
-            current_fcf = current_fcf * (1 + growth_rate)
-            projected_fcf.append(current_fcf)
-            
-        # Terminal value calculation
-        terminal_fcf = projected_fcf[-1] * (1 + terminal_growth)
-        terminal_value = terminal_fcf / (wacc - terminal_growth)
-        
-        # Discount all cash flows to present value
-        present_values = []
-        for i, fcf in enumerate(projected_fcf):
-            pv = fcf / ((1 + wacc) ** (i + 1))
-            present_values.append(pv)
-            
-        # Present value of terminal value
-        pv_terminal = terminal_value / ((1 + wacc) ** 5)
-        
-        # Enterprise value
-        enterprise_value = sum(present_values) + pv_terminal
-        
-        # Equity value
-        equity_value = enterprise_value - total_debt + cash_and_equivalents
-        
-        # Intrinsic value per share
-        intrinsic_value = equity_value / shares_outstanding
-        
-        # Current price and margin of safety
-        current_price = quote_data.get('price', 0)
-        margin_of_safety = ((intrinsic_value - current_price) / intrinsic_value) * 100 if intrinsic_value > 0 else 0
-        
-        # Price to intrinsic value ratio
-        price_to_intrinsic = (current_price / intrinsic_value) if intrinsic_value > 0 else 0
-        
-        return {
-            'intrinsic_value': intrinsic_value,
-            'current_price': current_price,
-            'margin_of_safety': margin_of_safety,
-            'price_to_intrinsic': price_to_intrinsic,
-            'enterprise_value': enterprise_value,
-            'equity_value': equity_value,
-            'wacc': wacc * 100,  # Convert to percentage
-            'terminal_growth': terminal_growth * 100,
-            'fcf_growth_5yr': fcf_growth_5yr * 100,
-            'projected_fcf': projected_fcf,
-            'pv_fcf': present_values,
-            'terminal_value': terminal_value,
-            'pv_terminal': pv_terminal,
-            'total_debt': total_debt,
-            'cash_and_equivalents': cash_and_equivalents,
-            'free_cash_flow': free_cash_flow
-        }
-        
+        daily = load_daily_series(symbol, api_key, start)
+        prices = slice_range(daily, start) if daily is not None else None
+        history = historical_dcf(cash_flow_data, fetch_income_statement(symbol, api_key),
+                                 fetch_balance_sheet(symbol, api_key),
+                                 get_provider().financial_growth(symbol, api_key), prices)
+        if history is None or np.isnan(history['intrinsic_value']).all():
+            return None
+        chart = {'dates': history['dates'], 'intrinsic_value': _finite_or_none(history['intrinsic_value']),
+                 'price_dates': [], 'close': []}
+        if prices is not None and len(prices['dates']):
+            rows = np.arange(len(prices['dates']))
+            if max_points and len(rows) > max_points:
+                rows = lttb_indices(prices['close'], max_points)
+            chart['price_dates'] = np.datetime_as_string(prices['dates'][rows], unit='D').tolist()
+            chart['close'] = _finite_or_none(prices['close'][rows])
+        fields = ('intrinsic_value', 'price', 'margin_of_safety', 'wacc')
+        columns = {field: _finite_or_none(history[field]) for field in fields}
+        rows = [{'date': d, **{field: columns[field][i] for field in fields}}
+                for i, d in enumerate(history['dates'])]
+        return {'chart': chart, 'rows': rows[::-1]}
     except Exception as e:
-        print(f"Error calculating DCF: {e}")
+        print(f"Error building valuation history: {e}")
         return None
 
+def describe_staleness(stale):
+    """Age of the oldest stale value served for a page ("4 min", "2.5 h"), or None if all were fresh"""
+    if not stale:
+        return None
+    age = max(seconds for _, seconds in stale)
+    if age < 60:
+        return f"{age:.0f} s"
+    if age < 3600:
+        return f"{age / 60:.0f} min"
+    return f"{age / 3600:.1f} h"
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     error = None
     data = {}
     api_key = ""
     symbol = "AAPL"
+    chart_range = normalize_range(None)
+    interval = normalize_interval(None)
+    chart_width = ''
+    valuation_history = False
     
     if request.method == 'POST':
         api_key = request.form.get('api_key', '').strip()
         symbol = request.form.get('symbol', 'AAPL').upper().strip()
+        chart_range = normalize_range(request.form.get('range'))
+        interval = normalize_interval(request.form.get('interval'))
+        chart_width = request.form.get('chart_width', '')
+        valuation_history = request.form.get('valuation_history') == 'on'
         
         if not api_key:
             error = "Please enter your FMP API key"
@@ -1211,43 +2031,44 @@ def index():
             error = "Please enter a stock symbol"
         else:
             try:
-                print(f"Fetching data for {symbol}...")
-                
-                # Fetch all data
-                quote = fetch_quote(symbol, api_key)
-                metrics = fetch_key_metrics(symbol, api_key)
-                ratios = fetch_ratios(symbol, api_key)
-                growth = fetch_financial_growth(symbol, api_key)
-                chart_data = fetch_historical_prices(symbol, api_key)
-                trend_data = fetch_trend_analysis_data(symbol, api_key)
+                # One deadline for every upstream call on the page; sections whose data misses it are skipped
+                with get_provider().staleness() as stale, deadline(PAGE_DEADLINE_SECONDS):
+                    print(f"Fetching data for {symbol}...")
                 
-                # Fetch financial statements for DCF
-                cash_flow_data = fetch_cash_flow_statement(symbol, api_key)
-                income_data = fetch_income_statement(symbol, api_key)
-                balance_sheet_data = fetch_balance_sheet(symbol, api_key)
+                    # Fetch all data
+                    quote = fetch_quote(symbol, api_key)
+                    metrics = fetch_key_metrics(symbol, api_key)
+                    ratios = fetch_ratios(symbol, api_key)
+                    growth = fetch_financial_growth(symbol, api_key)
+                    # Its longer daily history is cached for the chart requests that follow the page
+                    history = (fetch_valuation_history(symbol, api_key, target_points(chart_width))
+                               if valuation_history and quote else None)
                 
-                # Calculate DCF valuation
-                dcf_analysis = None
-                if quote and cash_flow_data and income_data and balance_sheet_data:
-                    dcf_analysis = calculate_dcf_valuation(
-                        cash_flow_data, income_data, balance_sheet_data, growth, quote
-                    )
+                    # DCF valuation: precomputed by the batch job when available, else from the statements
+                    dcf_analysis = fetch_dcf_valuation(symbol, api_key, quote, growth)
                 
-                if not quote:
-                    error = f"Could not fetch data for symbol '{symbol}'. Please check the symbol and API key."
-                else:
-                    data = {
-                        'quote': quote,
-                        'metrics': metrics,
-                        'ratios': ratios,
-                        'growth': growth,
-                        'chart_data': json.dumps(chart_data) if chart_data else None,
-                        'trend_data': json.dumps(trend_data) if trend_data else None,
-                        'dcf': dcf_analysis
-                    }
-                    print(f"Successfully fetched data for {symbol}")
-                    if dcf_analysis:
-                        print(f"DCF Intrinsic Value: ${dcf_analysis['intrinsic_value']:.2f}")
+                    if not quote:
+                        error = f"Could not fetch data for symbol '{symbol}'. Please check the symbol and API key."
+                    else:
+                        # Register for live quote pushes; the first chart request seeds the overlays
+                        quote_token = quote_hub.track(symbol, api_key)
+                        data = {
+                            'quote': quote,
+                            'metrics': metrics,
+                            'ratios': ratios,
+                            'growth': growth,
+                            # Charts and the backtest are requested by the page after it renders
+                            'charts': True,
+                            'dcf': dcf_analysis,
+                            'valuation_history': history,
+                            'timeframe': timeframe_label(chart_range, interval),
+                            'interval': interval,
+                            'stale': describe_staleness(stale),
+                            'quote_token': quote_token
+                        }
+                        print(f"Successfully fetched data for {symbol}")
+                        if dcf_analysis:
+                            print(f"DCF Intrinsic Value: ${dcf_analysis['intrinsic_value']:.2f}")
                     
             except Exception as e:
                 error = f"Error occurred while fetching data: {str(e)}"
@@ -1257,7 +2078,388 @@ def index():
                                 error=error, 
                                 data=data, 
                                 api_key=api_key, 
-                                symbol=symbol)
+                                symbol=symbol,
+                                chart_range=chart_range,
+                                interval=interval,
+                                chart_width=chart_width,
+                                valuation_history=valuation_history,
+                                ranges=RANGES,
+                                intervals=INTERVALS)
+
+def _json_safe(traces):
+    """Replace NaN warm-up values with None so the payload is strict JSON"""
+    for trace in traces:
+        for key, values in trace.items():
+            if isinstance(values, list):
+                trace[key] = [None if isinstance(v, float) and v != v else v for v in values]
+    return traces
+
+@app.route('/api/chart', methods=['POST'])
+def chart_window():
+    """Chart traces for a zoom window, at full resolution up to the viewport width"""
+    api_key = request.form.get('api_key', '').strip()
+    symbol = request.form.get('symbol', '').upper().strip()
+    if not api_key or not symbol:
+        return jsonify({'error': 'api_key and symbol are required'}), 400
+    chart_range = normalize_range(request.form.get('range'))
+    interval = normalize_interval(request.form.get('interval'))
+    window = (request.form.get('start'), request.form.get('end'))
+    kind = request.form.get('kind')
+    fetcher = fetch_trend_analysis_data if kind == 'trend' else fetch_historical_prices
+    # Same upstream bound as the page that requested it
+    with deadline(PAGE_DEADLINE_SECONDS):
+        traces = fetcher(symbol, api_key, chart_range, interval, target_points(request.form.get('width')),
+                         window if all(window) else None)
+        if not traces:
+            return jsonify({'error': f'No chart data for {symbol}'}), 404
+        if kind != 'trend' and not all(window) and interval == 'daily':
+            # First load of the page's price chart: seed live overlays from the full (now cached) daily history
+            daily = get_ohlcv(symbol, api_key, chart_range, interval)
+            if daily is not None:
+                bars = to_chart_lists(daily)
+                quote_hub.seed(symbol, bars['dates'], bars['close'])
+    return jsonify({'traces': _json_safe(traces)})
+
+@app.route('/api/backtest', methods=['POST'])
+def backtest_table():
+    """Signal backtest rows for the page's range, requested once the page has rendered"""
+    api_key = request.form.get('api_key', '').strip()
+    symbol = request.form.get('symbol', '').upper().strip()
+    if not api_key or not symbol:
+        return jsonify({'error': 'api_key and symbol are required'}), 400
+    with deadline(PAGE_DEADLINE_SECONDS):
+        rows = fetch_backtest(symbol, api_key, normalize_range(request.form.get('range')))
+    return jsonify({'rows': rows or []})
+
+@app.route('/assets/<name>')
+def static_asset(name):
+    """Fingerprinted bundles: any change gets a new name, so responses are cached as immutable"""
+    asset = plotly_asset()
+    if asset is None or name != asset.filename:
+        return Response(status=404)
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = Response(asset.gzipped() if gzipped else asset.body, mimetype='text/javascript')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(asset.digest + ('-gz' if gzipped else ''))
+    return response.make_conditional(request)
+
+@app.route('/screener', methods=['GET', 'POST'])
+def screener():
+    """Screen an index or a custom symbol list on TTM metrics and ratios"""
+    error = None
+    rows = None
+    matched = total = 0
+    elapsed_ms = 0.0
+    unavailable = []
+    form = request.form if request.method == 'POST' else request.args
+    api_key = form.get('api_key', '').strip()
+    universe = form.get('universe', 'sp500')
+    symbols = form.get('symbols', '')
+    filters = form.get('filters', '')
+    sort_by = form.get('sort_by', 'score')
+    if sort_by != 'score' and sort_by not in COLUMNS:
+        sort_by = 'score'
+    descending = form.get('order') == 'desc'
+    try:
+        limit = max(int(form.get('limit') or 50), 1)
+    except ValueError:
+        limit = 50
+
+    if request.method == 'POST':
+        if not api_key:
+            error = "Please enter your FMP API key"
+        else:
+            try:
+                conditions = parse_filters(filters)
+                table = get_universe_table(universe, api_key, symbols)
+                if table is None:
+                    error = "No symbols to screen. Pick an index or enter a custom list."
+                else:
+                    result, elapsed_ms = run_screen(table, conditions, sort_by, descending)
+                    total, matched = len(table), len(result)
+                    rows = result.head(limit).to_rows()
+                    unavailable = table.unavailable
+            except ValueError as e:
+                error = str(e)
+            except Exception as e:
+                error = f"Error occurred while screening: {str(e)}"
+                print(f"Error: {e}")
+
+    return render_template_string(SCREENER_TEMPLATE,
+                                error=error,
+                                rows=rows,
+                                matched=matched,
+                                total=total,
+                                elapsed_ms=elapsed_ms,
+                                unavailable=unavailable,
+                                screen_deadline=SCREEN_DEADLINE_SECONDS,
+                                api_key=api_key,
+                                universe=universe,
+                                symbols=symbols,
+                                filters=filters,
+                                sort_by=sort_by,
+                                descending=descending,
+                                limit=limit,
+                                universes=UNIVERSES,
+                                columns=COLUMNS,
+                                labels=LABELS,
+                                percent_columns=PERCENT_COLUMNS)
+
+@app.route('/portfolio', methods=['GET', 'POST'])
+def portfolio():
+    """Correlation heatmap and risk statistics for a list of symbols"""
+    error = None
+    rows = heatmap = None
+    missing = []
+    days = 0
+    benchmark_used = None
+    form = request.form if request.method == 'POST' else request.args
+    api_key = form.get('api_key', '').strip()
+    universe = form.get('universe', 'custom')
+    symbols = form.get('symbols', '')
+    chart_range = normalize_range(form.get('range'))
+    benchmark = form.get('benchmark', DEFAULT_BENCHMARK).upper().strip()
+
+    if request.method == 'POST':
+        if not api_key:
+            error = "Please enter your FMP API key"
+        else:
+            try:
+                tickers, _ = universe_symbols(universe, api_key, symbols)
+                if len(tickers) < 2:
+                    error = "Please enter at least two symbols"
+                else:
+                    result = portfolio_analysis(tickers, api_key, chart_range, benchmark)
+                    if result is None:
+                        error = "Could not fetch price history for these symbols"
+                    else:
+                        rows = summary_rows(result)
+                        heatmap = heatmap_data(result)
+                        missing = result['missing']
+                        days = len(result['dates'])
+                        benchmark_used = result['benchmark']
+            except Exception as e:
+                error = f"Error occurred while analyzing portfolio: {str(e)}"
+                print(f"Error: {e}")
+
+    return render_template_string(PORTFOLIO_TEMPLATE,
+                                error=error,
+                                rows=rows,
+                                heatmap=heatmap,
+                                heatmap_height=min(max(400, 14 * len(rows or [])), 2000),
+                                missing=missing,
+                                days=days,
+                                benchmark_used=benchmark_used,
+                                api_key=api_key,
+                                universe=universe,
+                                symbols=symbols,
+                                chart_range=chart_range,
+                                benchmark=benchmark,
+                                universes=UNIVERSES,
+                                ranges=RANGES)
+
+@app.route('/sweep', methods=['GET', 'POST'])
+def sweep_page():
+    """Heatmaps and best configurations from an indicator parameter sweep"""
+    error = None
+    sweep_data = None
+    top = []
+    form = request.form if request.method == 'POST' else request.args
+    api_key = form.get('api_key', '').strip()
+    symbol = form.get('symbol', 'AAPL').upper().strip()
+    chart_range = normalize_range(form.get('range') or '5Y')
+    metric = form.get('metric', 'sharpe')
+    if metric not in SCORE_METRICS:
+        metric = 'sharpe'
+
+    if request.method == 'POST':
+        if not api_key:
+            error = "Please enter your FMP API key"
+        elif not symbol:
+            error = "Please enter a stock symbol"
+        else:
+            try:
+                result = sweep_symbol(symbol, api_key, chart_range)
+                if result is None:
+                    error = f"Could not fetch price history for '{symbol}'"
+                else:
+                    grid = result['grid']
+                    sweep_data = {
+                        'windows': grid['windows'],
+                        'multipliers': grid['multipliers'],
+                        'spans': grid['spans'],
+                        'reversion': sweep_heatmap(result['bollinger_reversion'], metric),
+                        'breakout': sweep_heatmap(result['bollinger_breakout'], metric),
+                        'ema': sweep_heatmap(result['ema_crossover'], metric),
+                    }
+                    top = top_configs(result, metric)
+            except Exception as e:
+                error = f"Error occurred while running sweep: {str(e)}"
+                print(f"Error: {e}")
+
+    return render_template_string(SWEEP_TEMPLATE,
+                                error=error,
+                                sweep=sweep_data,
+                                top=top,
+                                api_key=api_key,
+                                symbol=symbol,
+                                chart_range=chart_range,
+                                metric=metric,
+                                metric_label=metric.replace('_', ' ').title(),
+                                metrics=SCORE_METRICS,
+                                ranges=RANGES,
+                                strategy_labels={'bollinger_reversion': 'Bollinger mean reversion',
+                                                 'bollinger_breakout': 'Bollinger breakout',
+                                                 'ema_crossover': 'EMA crossover'})
+
+@app.route('/compare', methods=['GET', 'POST'])
+def compare_page():
+    """Normalized price and EMA overlay for several symbols from one concurrent history load"""
+    error = None
+    chart = rows = None
+    missing = dropped = []
+    form = request.form if request.method == 'POST' else request.args
+    api_key = form.get('api_key', '').strip()
+    symbols = form.get('symbols', '')
+    chart_range = normalize_range(form.get('range'))
+    interval = normalize_interval(form.get('interval'))
+    chart_width = form.get('chart_width', '')
+    try:
+        ema_span = int(form.get('ema', DEFAULT_COMPARE_EMA))
+    except ValueError:
+        ema_span = DEFAULT_COMPARE_EMA
+    if ema_span not in COMPARE_EMA_SPANS:
+        ema_span = DEFAULT_COMPARE_EMA
+
+    if request.method == 'POST':
+        tickers, dropped = parse_symbols(symbols)
+        if not api_key:
+            error = "Please enter your FMP API key"
+        elif not tickers:
+            error = "Please enter at least one symbol"
+        else:
+            try:
+                result = compare_symbols(tickers, api_key, chart_range, interval, ema_span)
+                if result is None:
+                    error = "Could not fetch price history for these symbols"
+                else:
+                    chart = chart_payload(result, target_points(chart_width))
+                    rows = sorted(compare_rows(result), key=lambda row: row['change'] or 0, reverse=True)
+                    missing = result['missing']
+            except Exception as e:
+                error = f"Error occurred while comparing symbols: {str(e)}"
+                print(f"Error: {e}")
+
+    return render_template_string(COMPARE_TEMPLATE,
+                                error=error,
+                                chart=chart,
+                                rows=rows,
+                                missing=missing,
+                                dropped=dropped,
+                                api_key=api_key,
+                                symbols=symbols,
+                                chart_range=chart_range,
+                                interval=interval,
+                                chart_width=chart_width,
+                                ema_span=ema_span,
+                                ema_spans=COMPARE_EMA_SPANS,
+                                max_symbols=MAX_COMPARE_SYMBOLS,
+                                timeframe=timeframe_label(chart_range, interval),
+                                ranges=RANGES,
+                                intervals=INTERVALS)
+
+@app.route('/export/<kind>', methods=['GET', 'POST'])
+def export_data(kind):
+    """Stream indicator series or DCF breakdowns for one or more symbols as CSV, Parquet or Arrow IPC
+
+    Symbols whose data could not be loaded are listed in the X-Export-Skipped header; when
+    none loaded the response is a 502 error instead of an empty file.
+    """
+    form = request.values
+    api_key = form.get('api_key', '').strip()
+    symbols = list(dict.fromkeys(s.strip().upper() for s in (form.get('symbols') or form.get('symbol', '')).split(',')
+                                 if s.strip()))
+    fmt = form.get('format', 'csv').lower()
+    chart_range = normalize_range(form.get('range'))
+    interval = normalize_interval(form.get('interval'))
+    if kind not in ('indicators', 'dcf'):
+        return jsonify({'error': f"Unknown export '{kind}' (expected indicators or dcf)"}), 404
+    if not api_key or not symbols:
+        return jsonify({'error': 'api_key and symbols are required'}), 400
+    if len(symbols) > MAX_EXPORT_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_EXPORT_SYMBOLS} symbols per export ({len(symbols)} given)'}), 400
+    try:
+        check_format(fmt)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400 if fmt not in FORMATS else 501
+
+    def load(symbol):
+        # Upstream data for one symbol: the (cached) price history, or the small DCF table itself
+        try:
+            if kind == 'indicators':
+                return get_ohlcv(symbol, api_key, chart_range, interval) is not None, None
+            columns = dcf_columns(symbol, api_key)
+            return columns is not None, columns
+        except Exception as e:
+            print(f"Error exporting {kind} for {symbol}: {e}")
+            return False, None
+
+    # Fetch everything before the response starts, so failures can still change the status and headers
+    with ThreadPoolExecutor(max_workers=max(1, min(EXPORT_WORKERS, len(symbols)))) as pool:
+        loaded = dict(zip(symbols, pool.map(load, symbols)))
+    available = [symbol for symbol in symbols if loaded[symbol][0]]
+    skipped = [symbol for symbol in symbols if not loaded[symbol][0]]
+    if not available:
+        return jsonify({'error': f'No {kind} data could be loaded for the requested symbols', 'skipped': skipped}), 502
+
+    def chunks():
+        # One symbol is computed and encoded at a time, from the data loaded above
+        for symbol in available:
+            try:
+                columns = loaded[symbol][1] or indicator_columns(symbol, api_key, chart_range, interval)
+            except Exception as e:
+                print(f"Error exporting {kind} for {symbol}: {e}")
+                columns = None
+            if columns:
+                yield columns
+
+    schema = INDICATOR_EXPORT_SCHEMA if kind == 'indicators' else DCF_EXPORT_SCHEMA
+    mimetype, extension = FORMATS[fmt]
+    name = symbols[0] if len(symbols) == 1 else f"{len(symbols)}-symbols"
+    filename = f"{kind}-{name}-{chart_range}.{extension}" if kind == 'indicators' else f"dcf-{name}.{extension}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if skipped:
+        headers['X-Export-Skipped'] = ','.join(skipped)
+    return Response(stream_export(fmt, schema, chunks()), mimetype=mimetype, headers=headers)
+
+@app.route('/stream/quotes')
+def stream_quotes():
+    """Server-Sent Events feed of live quote deltas for symbols loaded on the page
+
+    The page's token (from quote_hub.track) limits the stream to the symbols it tracked.
+    """
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    client = quote_hub.subscribe(symbols, request.args.get('token', ''))
+    if client is None:
+        # Unknown or expired token, or nothing tracked for these symbols; 204 tells EventSource not to reconnect
+        return Response(status=204)
+
+    def events():
+        try:
+            while True:
+                try:
+                    delta = client.get(timeout=15)
+                    yield f"data: {json.dumps(delta)}\n\n"
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            quote_hub.unsubscribe(client)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
     print("Starting Stock Analysis Dashboard...")
@@ -1,8 +1,11 @@
 import streamlit as st
-import requests
 import pandas as pd
 from datetime import datetime
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from provider import PAGE_DEADLINE_SECONDS, deadline, get_provider
 
 # Page configuration
 st.set_page_config(
@@ -29,47 +32,55 @@ with st.sidebar:
     st.markdown("- Fair Value Calculation")
 
 # Helper functions
+# All fetches go through the shared provider, which caches per symbol with endpoint TTLs
 def fetch_quote(symbol, api_key):
     """Fetch current stock quote"""
-    url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().quote(symbol, api_key)
 
 def fetch_key_metrics(symbol, api_key):
     """Fetch key metrics TTM"""
-    url = f"https://financialmodelingprep.com/api/v3/key-metrics-ttm/{symbol}?apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().key_metrics_ttm(symbol, api_key)
 
 def fetch_ratios(symbol, api_key):
     """Fetch financial ratios TTM"""
-    url = f"https://financialmodelingprep.com/api/v3/ratios-ttm/{symbol}?apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().ratios_ttm(symbol, api_key)
 
 def fetch_financial_growth(symbol, api_key):
     """Fetch financial growth metrics"""
-    url = f"https://financialmodelingprep.com/api/v3/financial-growth/{symbol}?limit=10&apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().financial_growth(symbol, api_key)
 
 def fetch_cash_flow(symbol, api_key):
     """Fetch cash flow statements"""
-    url = f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{symbol}?limit=3&apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().cash_flow_statement(symbol, api_key)[:3]
 
 def fetch_dcf(symbol, api_key):
     """Fetch DCF valuation"""
-    url = f"https://financialmodelingprep.com/api/v3/discounted-cash-flow/{symbol}?apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().discounted_cash_flow(symbol, api_key)
 
 def fetch_advanced_dcf(symbol, api_key):
     """Fetch advanced DCF"""
-    url = f"https://financialmodelingprep.com/api/v4/advanced_discounted_cash_flow?symbol={symbol}&apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_provider().advanced_dcf(symbol, api_key)
+
+def fetch_all(symbol, api_key):
+    """Run every fetch concurrently under one deadline; cached entries return immediately
+
+    A fetch that fails or misses the deadline yields None so its section is skipped.
+    Also returns (key, age_seconds) for every expired value served while it refreshes.
+    """
+    fetchers = [fetch_quote, fetch_key_metrics, fetch_ratios, fetch_financial_growth,
+                fetch_cash_flow, fetch_dcf, fetch_advanced_dcf]
+    with get_provider().staleness() as stale, deadline(PAGE_DEADLINE_SECONDS), \
+            ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
+        # Each worker runs in a copy of this context so it shares the stale log and the deadline
+        futures = [pool.submit(contextvars.copy_context().run, fetcher, symbol, api_key) for fetcher in fetchers]
+        results = []
+        for fetcher, future in zip(fetchers, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"{fetcher.__name__} failed for {symbol}: {e}")
+                results.append(None)
+        return results, stale
 
 def calculate_margin_of_safety(fair_value, current_price):
     """Calculate margin of safety"""
@@ -82,7 +93,7 @@ def safe_get(data, key, default="N/A"):
     try:
         if isinstance(data, list) and len(data) > 0:
             value = data[0].get(key, default)
-        elif isinstance(data, dict):
+        elif hasattr(data, 'get'):
             value = data.get(key, default)
         else:
             return default
@@ -93,18 +104,19 @@ def safe_get(data, key, default="N/A"):
     except:
         return default
 
+# Keep showing the last analyzed symbol across reruns triggered by other widgets
+if analyze_button and stock_symbol:
+    st.session_state["analyzed_symbol"] = stock_symbol
+analyzed_symbol = st.session_state.get("analyzed_symbol")
+
 # Main analysis logic
-if analyze_button and api_key and stock_symbol:
+if analyzed_symbol and api_key:
+    stock_symbol = analyzed_symbol
     try:
         with st.spinner(f"Fetching data for {stock_symbol}..."):
-            # Fetch all data
-            quote_data = fetch_quote(stock_symbol, api_key)
-            key_metrics_data = fetch_key_metrics(stock_symbol, api_key)
-            ratios_data = fetch_ratios(stock_symbol, api_key)
-            growth_data = fetch_financial_growth(stock_symbol, api_key)
-            cash_flow_data = fetch_cash_flow(stock_symbol, api_key)
-            dcf_data = fetch_dcf(stock_symbol, api_key)
-            advanced_dcf_data = fetch_advanced_dcf(stock_symbol, api_key)
+            # Fetch all data concurrently (served from the cache on reruns)
+            ((quote_data, key_metrics_data, ratios_data, growth_data,
+              cash_flow_data, dcf_data, advanced_dcf_data), stale) = fetch_all(stock_symbol, api_key)
         
         # Check if data is valid
         if not quote_data or (isinstance(quote_data, dict) and 'Error Message' in quote_data):
@@ -130,6 +142,11 @@ if analyze_button and api_key and stock_symbol:
                 else:
                     st.metric("Market Cap", "N/A")
             
+            if stale:
+                oldest = max(age for _, age in stale)
+                st.caption(f"⏳ Some figures are cached data up to {oldest / 60:.0f} min old and are "
+                           "refreshing in the background. Rerun for the latest values.")
+            
             st.markdown("---")
             
             # Section 1: Key Metrics & Ratios
@@ -0,0 +1,145 @@
+"""
+Indicator parameter sweeps
+Scores grids of Bollinger windows x band multipliers and EMA fast/slow span pairs in one
+go: every rolling window comes from a single pair of cumulative sums, every configuration
+is a column of one position matrix, and the backtest kernels score them all together
+"""
+
+import numpy as np
+
+from backtest import DEFAULT_COST_BPS, _latch, ema_matrix, evaluate
+from portfolio import forward_fill
+from provider import get_provider
+from timeframes import HISTORY_CACHE_SECONDS, get_ohlcv, normalize_range
+
+BOLLINGER_WINDOWS = (10, 15, 20, 25, 30, 40, 50, 60)
+BOLLINGER_MULTIPLIERS = (1.5, 2.0, 2.5, 3.0)
+EMA_SPANS = (5, 10, 20, 50, 100, 200)
+SCORE_METRICS = ("sharpe", "total_return", "annual_return", "hit_rate")
+
+
+def rolling_windows(closes, windows):
+    """Rolling means and sample stds for several windows, shape (len(windows), bars)
+
+    Built from one cumulative sum and one cumulative sum of squares over the centred
+    series, so adding windows costs a subtraction each rather than another pass.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    offset = closes.mean() if len(closes) else 0.0
+    centred = closes - offset
+    sums = np.concatenate([[0.0], np.cumsum(centred)])
+    squares = np.concatenate([[0.0], np.cumsum(centred * centred)])
+    means = np.full((len(windows), len(closes)), np.nan)
+    stds = np.full((len(windows), len(closes)), np.nan)
+    for i, window in enumerate(windows):
+        if window < 2 or window > len(closes):
+            continue
+        window_sums = sums[window:] - sums[:-window]
+        window_squares = squares[window:] - squares[:-window]
+        mean = window_sums / window
+        means[i, window - 1:] = mean + offset
+        stds[i, window - 1:] = np.sqrt(np.maximum(window_squares - window * mean * mean, 0.0) / (window - 1))
+    return means, stds
+
+
+def _score(prices, positions, cost_bps):
+    """Backtest metrics for every configuration column at once"""
+    tiled = np.broadcast_to(prices[:, None], positions.shape)
+    return evaluate(tiled, positions, cost_bps)
+
+
+def sweep_bollinger(closes, windows=BOLLINGER_WINDOWS, multipliers=BOLLINGER_MULTIPLIERS,
+                    cost_bps=DEFAULT_COST_BPS):
+    """Mean reversion and breakout metrics over windows x multipliers, each shaped (W, K)"""
+    closes = np.asarray(closes, dtype=np.float64)
+    means, stds = rolling_windows(closes, windows)
+    k = np.asarray(multipliers, dtype=np.float64)[None, :, None]
+    n_configs = len(windows) * len(multipliers)
+    # (W, K, bars) -> (bars, W*K): one column per configuration
+    sma = np.broadcast_to(means[:, None, :], (len(windows), len(multipliers), len(closes)))
+    upper = (means[:, None, :] + k * stds[:, None, :]).reshape(n_configs, -1).T
+    lower = (means[:, None, :] - k * stds[:, None, :]).reshape(n_configs, -1).T
+    sma = sma.reshape(n_configs, -1).T
+    prices = closes[:, None]
+    results = {}
+    with np.errstate(invalid="ignore"):
+        for strategy, positions in (("bollinger_reversion", _latch(prices < lower, prices >= sma)),
+                                    ("bollinger_breakout", _latch(prices > upper, prices <= sma))):
+            metrics = _score(closes, positions, cost_bps)
+            results[strategy] = {name: values.reshape(len(windows), len(multipliers))
+                                 for name, values in metrics.items()}
+    return results
+
+
+def sweep_ema(closes, spans=EMA_SPANS, cost_bps=DEFAULT_COST_BPS):
+    """EMA crossover metrics for every fast < slow span pair, each shaped (S, S) with NaN elsewhere"""
+    closes = np.asarray(closes, dtype=np.float64)
+    spans = np.asarray(spans, dtype=np.float64)
+    emas = ema_matrix(np.repeat(closes[:, None], len(spans), axis=1), spans)
+    pairs = [(f, s) for f in range(len(spans)) for s in range(len(spans)) if spans[f] < spans[s]]
+    bars = np.arange(1, len(closes) + 1)[:, None]
+    fast = np.array([f for f, _ in pairs], dtype=int)
+    slow = np.array([s for _, s in pairs], dtype=int)
+    positions = ((emas[:, fast] > emas[:, slow]) & (bars >= spans[slow])).astype(np.float64)
+    metrics = _score(closes, positions, cost_bps)
+    grid = {}
+    for name, values in metrics.items():
+        table = np.full((len(spans), len(spans)), np.nan)
+        table[fast, slow] = values
+        grid[name] = table
+    return grid
+
+
+def sweep(closes, windows=BOLLINGER_WINDOWS, multipliers=BOLLINGER_MULTIPLIERS, spans=EMA_SPANS,
+          cost_bps=DEFAULT_COST_BPS):
+    """Every grid for one close series; missing closes carry the last one, leading ones are dropped"""
+    closes = forward_fill(np.asarray(closes, dtype=np.float64)[:, None])[:, 0]
+    closes = closes[~np.isnan(closes)]
+    result = sweep_bollinger(closes, windows, multipliers, cost_bps)
+    result["ema_crossover"] = sweep_ema(closes, spans, cost_bps)
+    result["grid"] = {"windows": list(windows), "multipliers": list(multipliers), "spans": list(spans)}
+    return result
+
+
+def top_configs(result, metric="sharpe", n=10):
+    """Best configurations across all strategies as template rows"""
+    grid = result["grid"]
+    rows = []
+    for strategy in ("bollinger_reversion", "bollinger_breakout"):
+        table = result[strategy]
+        for i, window in enumerate(grid["windows"]):
+            for j, multiplier in enumerate(grid["multipliers"]):
+                rows.append(_config_row(strategy, f"window {window}, {multiplier:g} std", table, (i, j)))
+    table = result["ema_crossover"]
+    for i, fast in enumerate(grid["spans"]):
+        for j, slow in enumerate(grid["spans"]):
+            if fast < slow:
+                rows.append(_config_row("ema_crossover", f"EMA {fast}/{slow}", table, (i, j)))
+    rows = [row for row in rows if row[metric] is not None]
+    rows.sort(key=lambda row: row[metric], reverse=True)
+    return rows[:n]
+
+
+def _config_row(strategy, params, table, index):
+    row = {"strategy": strategy, "params": params}
+    for name, values in table.items():
+        value = values[index]
+        row[name] = None if np.isnan(value) else float(value)
+    return row
+
+
+def sweep_symbol(symbol, api_key, period="5Y", cost_bps=DEFAULT_COST_BPS):
+    """Cached sweep of a symbol's daily closes over a range (rebuilt when the history refreshes)"""
+    period = normalize_range(period)
+    series = get_ohlcv(symbol, api_key, period, "daily")
+    if series is None or np.count_nonzero(~np.isnan(series["close"])) < 2:
+        return None
+    provider = get_provider()
+    key = ("sweep", symbol, period, cost_bps, provider.daily_version(symbol))
+    return provider.cached(key, HISTORY_CACHE_SECONDS, lambda: sweep(series["close"], cost_bps=cost_bps))
+
+
+def heatmap(table, metric="sharpe", digits=3):
+    """Nested lists with None for undefined cells, for a Plotly heatmap"""
+    values = np.round(table[metric], digits)
+    return [[None if np.isnan(v) else float(v) for v in row] for row in values]
@@ -0,0 +1,133 @@
+"""
+Multi-timeframe OHLCV engine
+Fetches one daily series per symbol, keeps it cached locally, and serves any
+range/interval combination by slicing and vectorized resampling of that series
+"""
+
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from downsample import first_valid, last_valid
+from provider import get_provider
+
+# Selectable ranges: key -> (label, calendar days or None for the full history)
+RANGES = {
+    "1M": ("1 Month", 31),
+    "3M": ("3 Months", 92),
+    "6M": ("6 Months", 183),
+    "1Y": ("1 Year", 365),
+    "2Y": ("2 Years", 730),
+    "5Y": ("5 Years", 1826),
+    "10Y": ("10 Years", 3652),
+    "20Y": ("20 Years", 7305),
+    "MAX": ("Max", None),
+}
+INTERVALS = {"daily": "Daily", "weekly": "Weekly", "monthly": "Monthly"}
+DEFAULT_RANGE = "1Y"
+DEFAULT_INTERVAL = "daily"
+
+# Earliest date requested for the full history
+MAX_HISTORY_START = date(1970, 1, 1)
+HISTORY_CACHE_SECONDS = float(os.environ.get("HISTORY_CACHE_SECONDS", "900"))
+# The first fetch for a symbol covers at least this range so switching between
+# shorter timeframes never goes back upstream
+HISTORY_PREFETCH_RANGE = os.environ.get("HISTORY_PREFETCH_RANGE", "5Y")
+
+# Older spellings accepted by the fetch_* period argument
+_RANGE_ALIASES = {"1year": "1Y", "1month": "1M", "3month": "3M", "6month": "6M",
+                  "2year": "2Y", "5year": "5Y", "10year": "10Y", "20year": "20Y", "max": "MAX"}
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def normalize_range(period):
+    """Map a period argument to a RANGES key (defaults to 1Y)"""
+    if not period:
+        return DEFAULT_RANGE
+    key = _RANGE_ALIASES.get(str(period).lower(), str(period).upper())
+    return key if key in RANGES else DEFAULT_RANGE
+
+
+def normalize_interval(interval):
+    interval = (interval or DEFAULT_INTERVAL).lower()
+    return interval if interval in INTERVALS else DEFAULT_INTERVAL
+
+
+def timeframe_label(period, interval):
+    """Human readable description such as '5 Years, Weekly'"""
+    return f"{RANGES[normalize_range(period)][0]}, {INTERVALS[normalize_interval(interval)]}"
+
+
+def range_start(period, today=None):
+    """First calendar date covered by a range"""
+    days = RANGES[normalize_range(period)][1]
+    if days is None:
+        return MAX_HISTORY_START
+    return (today or date.today()) - timedelta(days=days)
+
+
+def load_daily_series(symbol, api_key, start):
+    """Cached daily OHLCV for a symbol covering at least `start` onwards"""
+    start = min(start, range_start(HISTORY_PREFETCH_RANGE))
+    return get_provider().daily_prices(symbol, api_key, start)
+
+
+def slice_range(series, start):
+    """Bars on or after `start`"""
+    first = np.searchsorted(series["dates"], np.datetime64(start, "D"))
+    return {key: values[first:] for key, values in series.items()}
+
+
+def resample_ohlcv(series, interval):
+    """Aggregate daily bars into weekly or monthly bars, labelled by their first trading day
+
+    Like pandas resample().ohlc(), missing (NaN) values are skipped within a bar.
+    """
+    interval = normalize_interval(interval)
+    if interval == "daily" or len(series["dates"]) == 0:
+        return series
+    dates = series["dates"]
+    if interval == "weekly":
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday
+        buckets = (dates.astype(np.int64) + 3) // 7
+    else:
+        buckets = dates.astype("datetime64[M]").astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(dates)] - 1
+    return {
+        "dates": dates[starts],
+        "open": first_valid(series["open"], starts, ends),
+        "high": np.fmax.reduceat(series["high"], starts),
+        "low": np.fmin.reduceat(series["low"], starts),
+        "close": last_valid(series["close"], starts, ends),
+        "volume": np.add.reduceat(np.nan_to_num(series["volume"]), starts),
+    }
+
+
+def get_ohlcv(symbol, api_key, period=DEFAULT_RANGE, interval=DEFAULT_INTERVAL):
+    """OHLCV arrays for a symbol at the requested range and interval (cached per timeframe)"""
+    period = normalize_range(period)
+    interval = normalize_interval(interval)
+    start = range_start(period)
+    daily = load_daily_series(symbol, api_key, start)
+    if daily is None:
+        return None
+
+    def build():
+        result = resample_ohlcv(slice_range(daily, start), interval)
+        return result if len(result["dates"]) else None
+
+    # Keyed by the daily series version so a refreshed history rebuilds its aggregates
+    provider = get_provider()
+    key = ("ohlcv", symbol, period, interval, start, provider.daily_version(symbol))
+    return provider.cached(key, HISTORY_CACHE_SECONDS, build)
+
+
+def to_chart_lists(series):
+    """Plain lists (ISO date strings and floats) ready for the chart builders"""
+    return {
+        "dates": np.datetime_as_string(series["dates"], unit="D").tolist(),
+        **{field: series[field].tolist() for field in OHLCV_FIELDS},
+    }
@@ -0,0 +1,490 @@
+"""
+Precomputed DCF valuations
+A batch job (meant to run nightly) loads annual statements, growth and quotes for a
+universe, runs the DCF for every symbol in a process pool and writes one row per symbol
+to an indexed SQLite table stamped with the version of its input statements. Pages read
+these rows and only recompute the price-dependent fields against the live quote
+
+    python src/valuations.py --universe sp500 --api-key KEY
+    python src/valuations.py --symbols AAPL,MSFT,NVDA --api-key KEY
+    python src/valuations.py --info
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+VALUATIONS_DB = os.environ.get(
+    "VALUATIONS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "valuations.sqlite"),
+)
+# Rows older than this are ignored and the page computes the DCF itself
+VALUATION_MAX_AGE_HOURS = float(os.environ.get("VALUATION_MAX_AGE_HOURS", "36"))
+VALUATION_PROCESSES = int(os.environ.get("VALUATION_PROCESSES", str(os.cpu_count() or 1)))
+VALUATION_FETCH_WORKERS = int(os.environ.get("VALUATION_FETCH_WORKERS", "16"))
+QUOTE_BATCH = 50
+
+# DCF assumptions, shared by the single valuation and the historical series
+DEFAULT_REVENUE_GROWTH = 0.05
+FCF_GROWTH_FLOOR, FCF_GROWTH_CAP = 0.02, 0.25
+GROWTH_DECAY = 0.8
+PROJECTION_YEARS = 5
+TERMINAL_GROWTH = 0.025  # Long-term GDP growth assumption
+RISK_FREE_RATE = 0.045  # Current 10-year treasury approximate
+MARKET_RISK_PREMIUM = 0.06  # Historical equity risk premium
+BETA = 1.2  # Default beta assumption
+COST_OF_DEBT = 0.04  # Assumed cost of debt
+TAX_RATE = 0.25  # Assumed tax rate
+
+# Statement fields the DCF reads; only these cross into the worker processes
+CASH_FLOW_FIELDS = ("date", "freeCashFlow")
+INCOME_FIELDS = ("date", "revenue")
+BALANCE_FIELDS = ("date", "totalDebt", "cashAndCashEquivalents")
+GROWTH_FIELDS = ("date", "revenueGrowth")
+QUOTE_FIELDS = ("price", "marketCap", "sharesOutstanding")
+
+# Stored per symbol; projected_fcf and pv_fcf are JSON lists
+NUMBER_COLUMNS = ("price", "intrinsic_value", "margin_of_safety", "price_to_intrinsic", "enterprise_value",
+                  "equity_value", "wacc", "terminal_growth", "fcf_growth_5yr", "terminal_value", "pv_terminal",
+                  "total_debt", "cash_and_equivalents", "free_cash_flow")
+LIST_COLUMNS = ("projected_fcf", "pv_fcf")
+COLUMNS = ("symbol", "input_version", "computed_at") + NUMBER_COLUMNS + LIST_COLUMNS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS valuations (
+    symbol TEXT PRIMARY KEY,
+    input_version TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    {", ".join(f"{name} REAL" for name in NUMBER_COLUMNS)},
+    {", ".join(f"{name} TEXT" for name in LIST_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS valuations_margin ON valuations (margin_of_safety);
+CREATE INDEX IF NOT EXISTS valuations_computed_at ON valuations (computed_at);
+"""
+
+
+def price_fields(intrinsic_value, current_price):
+    """The valuation fields that move with the share price"""
+    margin_of_safety = ((intrinsic_value - current_price) / intrinsic_value) * 100 if intrinsic_value > 0 else 0
+    price_to_intrinsic = (current_price / intrinsic_value) if intrinsic_value > 0 else 0
+    return {
+        'current_price': current_price,
+        'margin_of_safety': margin_of_safety,
+        'price_to_intrinsic': price_to_intrinsic,
+    }
+
+
+def calculate_dcf_valuation(cash_flow_data, income_data, balance_sheet_data, growth_data, quote_data):
+    """Calculate DCF intrinsic value with detailed assumptions"""
+    try:
+        if not cash_flow_data or not income_data or not balance_sheet_data:
+            return None
+
+        # Get latest financial data
+        latest_cf = cash_flow_data[0]
+        latest_income = income_data[0]
+        latest_bs = balance_sheet_data[0]
+
+        # Key DCF inputs
+        free_cash_flow = latest_cf.get('freeCashFlow', 0)
+        revenue = latest_income.get('revenue', 0)
+        total_debt = latest_bs.get('totalDebt', 0)
+        cash_and_equivalents = latest_bs.get('cashAndCashEquivalents', 0)
+        shares_outstanding = quote_data.get('sharesOutstanding', 0)
+
+        if free_cash_flow <= 0 or shares_outstanding <= 0:
+            return None
+
+        # Growth assumptions
+        revenue_growth = (growth_data.get('revenueGrowth', DEFAULT_REVENUE_GROWTH) if growth_data
+                          else DEFAULT_REVENUE_GROWTH)
+        fcf_growth_5yr = min(max(revenue_growth, FCF_GROWTH_FLOOR), FCF_GROWTH_CAP)  # Cap between 2% and 25%
+        terminal_growth = TERMINAL_GROWTH
+
+        # Discount rate calculation (WACC approximation)
+        cost_of_equity = RISK_FREE_RATE + (BETA * MARKET_RISK_PREMIUM)
+
+        # Weight of debt and equity (simplified)
+        market_cap = quote_data.get('marketCap', 0)
+        total_value = market_cap + total_debt
+        if total_value > 0:
+            equity_weight = market_cap / total_value
+            debt_weight = total_debt / total_value
+            wacc = (equity_weight * cost_of_equity) + (debt_weight * COST_OF_DEBT * (1 - TAX_RATE))
+        else:
+            wacc = cost_of_equity
+
+        # Project future cash flows (5 years)
+        projected_fcf = []
+        current_fcf = free_cash_flow
+
+        for year in range(1, PROJECTION_YEARS + 1):
+            # Declining growth rate over 5 years
+            growth_rate = fcf_growth_5yr * (GROWTH_DECAY ** (year - 1))  # Declining growth
+            current_fcf = current_fcf * (1 + growth_rate)
+            projected_fcf.append(current_fcf)
+
+        # Terminal value calculation
+        terminal_fcf = projected_fcf[-1] * (1 + terminal_growth)
+        terminal_value = terminal_fcf / (wacc - terminal_growth)
+
+        # Discount all cash flows to present value
+        present_values = []
+        for i, fcf in enumerate(projected_fcf):
+            pv = fcf / ((1 + wacc) ** (i + 1))
+            present_values.append(pv)
+
+        # Present value of terminal value
+        pv_terminal = terminal_value / ((1 + wacc) ** PROJECTION_YEARS)
+
+        # Enterprise value
+        enterprise_value = sum(present_values) + pv_terminal
+
+        # Equity value
+        equity_value = enterprise_value - total_debt + cash_and_equivalents
+
+        # Intrinsic value per share
+        intrinsic_value = equity_value / shares_outstanding
+
+        return {
+            'intrinsic_value': intrinsic_value,
+            # Current price, margin of safety and price to intrinsic value ratio
+            **price_fields(intrinsic_value, quote_data.get('price', 0)),
+            'enterprise_value': enterprise_value,
+            'equity_value': equity_value,
+            'wacc': wacc * 100,  # Convert to percentage
+            'terminal_growth': terminal_growth * 100,
+            'fcf_growth_5yr': fcf_growth_5yr * 100,
+            'projected_fcf': projected_fcf,
+            'pv_fcf': present_values,
+            'terminal_value': terminal_value,
+            'pv_terminal': pv_terminal,
+            'total_debt': total_debt,
+            'cash_and_equivalents': cash_and_equivalents,
+            'free_cash_flow': free_cash_flow
+        }
+
+    except Exception as e:
+        print(f"Error calculating DCF: {e}")
+        return None
+
+
+def _column(rows, field):
+    return np.array([row.get(field, np.nan) for row in rows], dtype=np.float64)
+
+
+def historical_dcf(cash_flow_data, income_data, balance_sheet_data, growth_data, prices=None):
+    """Intrinsic value per share as of each fiscal year in the statements, oldest first
+
+    The statements are stacked by fiscal date and the whole DCF runs once over the
+    stacked arrays with the same assumptions as calculate_dcf_valuation. Each year uses
+    its own free cash flow, debt, cash, revenue growth and diluted share count. WACC
+    weights use that year's market cap (the close on the fiscal date from `prices`,
+    a dict of numpy dates/close) and fall back to the cost of equity when the price
+    history does not reach back that far. Years with non-positive free cash flow give NaN.
+    """
+    try:
+        income_by_date = {row.get('date'): row for row in income_data or []}
+        balance_by_date = {row.get('date'): row for row in balance_sheet_data or []}
+        growth_by_date = {row.get('date'): row for row in growth_data or []}
+        cash_flow = sorted((row for row in cash_flow_data or []
+                            if row.get('date') in income_by_date and row.get('date') in balance_by_date),
+                           key=lambda row: row.get('date'))
+        if not cash_flow:
+            return None
+        fiscal_dates = [row.get('date') for row in cash_flow]
+        income = [income_by_date[d] for d in fiscal_dates]
+        balance = [balance_by_date[d] for d in fiscal_dates]
+        growth = [growth_by_date.get(d) or {} for d in fiscal_dates]
+
+        free_cash_flow = _column(cash_flow, 'freeCashFlow')
+        total_debt = np.nan_to_num(_column(balance, 'totalDebt'))
+        cash_and_equivalents = np.nan_to_num(_column(balance, 'cashAndCashEquivalents'))
+        shares = _column(income, 'weightedAverageShsOutDil')
+        shares = np.where(np.isnan(shares), _column(income, 'weightedAverageShsOut'), shares)
+        revenue_growth = np.nan_to_num(_column(growth, 'revenueGrowth'), nan=DEFAULT_REVENUE_GROWTH)
+
+        price = np.full(len(fiscal_dates), np.nan)
+        if prices is not None and len(prices["dates"]):
+            when = np.array(fiscal_dates, dtype="datetime64[D]")
+            # Last reported close on or before each fiscal date
+            reported = ~np.isnan(prices["close"])
+            closes, close_dates = prices["close"][reported], prices["dates"][reported]
+            at = np.searchsorted(close_dates, when, side="right") - 1
+            known = at >= 0
+            price[known] = closes[at[known]]
+
+        fcf_growth_5yr = np.clip(revenue_growth, FCF_GROWTH_FLOOR, FCF_GROWTH_CAP)
+        cost_of_equity = RISK_FREE_RATE + (BETA * MARKET_RISK_PREMIUM)
+        market_cap = price * shares
+        total_value = market_cap + total_debt
+        with np.errstate(invalid="ignore", divide="ignore"):
+            wacc = np.where(total_value > 0,
+                            (market_cap / total_value) * cost_of_equity
+                            + (total_debt / total_value) * COST_OF_DEBT * (1 - TAX_RATE),
+                            cost_of_equity)
+
+            # years x projection years
+            growth_rates = fcf_growth_5yr[:, None] * GROWTH_DECAY ** np.arange(PROJECTION_YEARS)
+            projected_fcf = free_cash_flow[:, None] * np.cumprod(1 + growth_rates, axis=1)
+            discount = (1 + wacc)[:, None] ** np.arange(1, PROJECTION_YEARS + 1)
+            terminal_value = projected_fcf[:, -1] * (1 + TERMINAL_GROWTH) / (wacc - TERMINAL_GROWTH)
+            enterprise_value = (projected_fcf / discount).sum(axis=1) + terminal_value / discount[:, -1]
+            intrinsic_value = (enterprise_value - total_debt + cash_and_equivalents) / shares
+            intrinsic_value[(free_cash_flow <= 0) | ~(shares > 0)] = np.nan
+            margin_of_safety = np.where(intrinsic_value > 0, (intrinsic_value - price) / intrinsic_value * 100, np.nan)
+
+        return {
+            'dates': fiscal_dates,
+            'intrinsic_value': intrinsic_value,
+            'price': price,
+            'margin_of_safety': margin_of_safety,
+            'wacc': wacc * 100,
+            'fcf_growth_5yr': fcf_growth_5yr * 100,
+        }
+
+    except Exception as e:
+        print(f"Error calculating historical DCF: {e}")
+        return None
+
+
+def history_start(statement_rows):
+    """First date of price history the historical DCF needs: a little before the oldest fiscal year end"""
+    dates = [row.get('date') for row in statement_rows or [] if row.get('date')]
+    if not dates:
+        return None
+    return date.fromisoformat(min(dates)) - timedelta(days=7)
+
+
+def live_valuation(stored, current_price):
+    """A stored valuation with its price-dependent fields recomputed at the current price
+
+    WACC weights (and so the intrinsic value) stay at the market cap of the batch run.
+    """
+    return {**stored, **price_fields(stored['intrinsic_value'], current_price)}
+
+
+def _plain(row, fields):
+    """Just the named fields of a record or dict, as a picklable dict"""
+    if not row:
+        return None
+    return {field: row.get(field) for field in fields if row.get(field) is not None}
+
+
+def input_version(cash_flow, income, balance, growth):
+    """Latest fiscal date of the statements plus a digest of every value the DCF reads"""
+    rows = (cash_flow, income, balance, growth)
+    digest = hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    dates = [row.get("date") for row in rows[:3] if row and row.get("date")]
+    return f"{max(dates) if dates else 'undated'}/{digest}"
+
+
+def load_inputs(symbol, api_key, quote):
+    """Plain-dict DCF inputs for one symbol, or None when any statement is missing"""
+    from provider import get_provider
+
+    provider = get_provider()
+    cash_flow = provider.cash_flow_statement(symbol, api_key)
+    income = provider.income_statement(symbol, api_key)
+    balance = provider.balance_sheet(symbol, api_key)
+    if not (quote and cash_flow and income and balance):
+        return None
+    growth = provider.financial_growth(symbol, api_key)
+    return (symbol, _plain(cash_flow[0], CASH_FLOW_FIELDS), _plain(income[0], INCOME_FIELDS),
+            _plain(balance[0], BALANCE_FIELDS), _plain(growth[0], GROWTH_FIELDS) if growth else None,
+            _plain(quote, QUOTE_FIELDS))
+
+
+def value_symbol(inputs):
+    """Worker: (symbol, cash flow, income, balance, growth, quote) -> table row, or None"""
+    symbol, cash_flow, income, balance, growth, quote = inputs
+    dcf = calculate_dcf_valuation([cash_flow], [income], [balance], growth, quote)
+    if dcf is None:
+        return None
+    row = {"symbol": symbol, "input_version": input_version(cash_flow, income, balance, growth),
+           "computed_at": time.time(), "price": dcf["current_price"]}
+    row.update({name: dcf[name] for name in NUMBER_COLUMNS if name != "price"})
+    row.update({name: json.dumps(dcf[name]) for name in LIST_COLUMNS})
+    return row
+
+
+def connect(path=None):
+    path = path or VALUATIONS_DB
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path)
+    # Readers keep serving the previous night's rows while the batch writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def write_rows(rows, path=None):
+    """Insert or replace rows in one transaction; returns the previous input versions"""
+    connection = connect(path)
+    try:
+        symbols = [row["symbol"] for row in rows]
+        previous = {}
+        for start in range(0, len(symbols), 500):
+            batch = symbols[start:start + 500]
+            previous.update(connection.execute(
+                f"SELECT symbol, input_version FROM valuations WHERE symbol IN ({','.join('?' * len(batch))})",
+                batch).fetchall())
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO valuations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[name] for name in COLUMNS) for row in rows])
+        return previous
+    finally:
+        connection.close()
+
+
+def run_batch(symbols, api_key, processes=VALUATION_PROCESSES, fetch_workers=VALUATION_FETCH_WORKERS, path=None):
+    """Value every symbol and store the results; returns a summary dict
+
+    Inputs are fetched in threads through the shared provider (one cache and one rate
+    limit for the whole run), then the DCF runs in a process pool.
+    """
+    from provider import get_provider
+
+    provider = get_provider()
+    started = time.perf_counter()
+    batches = [symbols[i:i + QUOTE_BATCH] for i in range(0, len(symbols), QUOTE_BATCH)]
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as pool:
+        quotes = {}
+        for batch in pool.map(lambda b: provider.quotes(b, api_key), batches):
+            quotes.update({q.get("symbol"): q for q in batch})
+
+        def fetch(symbol):
+            try:
+                return load_inputs(symbol, api_key, quotes.get(symbol))
+            except Exception as e:
+                print(f"Error fetching inputs for {symbol}: {e}")
+                return None
+
+        inputs = [item for item in pool.map(fetch, symbols) if item is not None]
+    fetched = time.perf_counter()
+
+    processes = max(1, min(processes, len(inputs) or 1))
+    if processes == 1:
+        rows = [value_symbol(item) for item in inputs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rows = list(pool.map(value_symbol, inputs, chunksize=max(1, len(inputs) // (processes * 4))))
+    rows = [row for row in rows if row is not None]
+    valued = time.perf_counter()
+
+    previous = write_rows(rows, path) if rows else {}
+    changed = sum(1 for row in rows if previous.get(row["symbol"]) != row["input_version"])
+    return {"symbols": len(symbols), "inputs": len(inputs), "valued": len(rows), "changed_inputs": changed,
+            "fetch_s": fetched - started, "value_s": valued - fetched, "write_s": time.perf_counter() - valued}
+
+
+class ValuationStore:
+    """Read side of the table: one primary-key lookup per page"""
+
+    def __init__(self, path=None, max_age_hours=VALUATION_MAX_AGE_HOURS):
+        self.path = path or VALUATIONS_DB
+        self.max_age = max_age_hours * 3600
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if not os.path.exists(self.path):
+                return None
+            connection = sqlite3.connect(self.path)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def get(self, symbol):
+        """Stored valuation for a symbol in calculate_dcf_valuation's shape, or None if absent or too old"""
+        try:
+            connection = self._connection()
+            if connection is None:
+                return None
+            row = connection.execute("SELECT * FROM valuations WHERE symbol = ? AND computed_at >= ?",
+                                     (symbol, time.time() - self.max_age)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading stored valuation: {e}")
+            return None
+        if row is None:
+            return None
+        valuation = {name: row[name] for name in NUMBER_COLUMNS if name != "price"}
+        valuation.update({name: json.loads(row[name]) for name in LIST_COLUMNS})
+        valuation.update({"current_price": row["price"], "input_version": row["input_version"],
+                          "computed_at": row["computed_at"],
+                          "valued_on": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["computed_at"]))})
+        return valuation
+
+
+_default_store = None
+
+
+def get_valuation_store():
+    """Process-wide store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ValuationStore()
+    return _default_store
+
+
+def describe(path=None):
+    path = path or VALUATIONS_DB
+    if not os.path.exists(path):
+        print(f"No valuations stored at {path}")
+        return
+    connection = sqlite3.connect(path)
+    try:
+        count, oldest, newest = connection.execute(
+            "SELECT COUNT(*), MIN(computed_at), MAX(computed_at) FROM valuations").fetchone()
+        print(f"{count} symbols in {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+        if count:
+            print(f"computed {time.strftime('%Y-%m-%d %H:%M', time.localtime(oldest))} to "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(newest))}")
+            for symbol, margin in connection.execute(
+                    "SELECT symbol, margin_of_safety FROM valuations ORDER BY margin_of_safety DESC LIMIT 5"):
+                print(f"  {symbol:<8} margin of safety {margin:6.1f}%")
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    from screener import UNIVERSES, universe_symbols
+
+    parser = argparse.ArgumentParser(description="Precompute DCF valuations for a universe")
+    parser.add_argument("--universe", choices=list(UNIVERSES), help="index to value")
+    parser.add_argument("--symbols", default="", help="comma separated list instead of an index")
+    parser.add_argument("--api-key", default=os.environ.get("FMP_API_KEY", ""), help="FMP API key")
+    parser.add_argument("--processes", type=int, default=VALUATION_PROCESSES, help="DCF worker processes")
+    parser.add_argument("--db", default=VALUATIONS_DB, help="SQLite file")
+    parser.add_argument("--info", action="store_true", help="describe the stored valuations and exit")
+    args = parser.parse_args(argv)
+
+    if args.info or not (args.universe or args.symbols):
+        describe(args.db)
+        return 0
+    if not args.api_key:
+        parser.error("--api-key (or FMP_API_KEY) is required")
+    symbols, _ = universe_symbols(args.universe or "custom", args.api_key, args.symbols)
+    if not symbols:
+        print("No symbols to value")
+        return 1
+    summary = run_batch(symbols, args.api_key, args.processes, path=args.db)
+    print(f"valued {summary['valued']} of {summary['symbols']} symbols "
+          f"({summary['inputs']} with complete inputs, {summary['changed_inputs']} with new statements); "
+          f"fetch {summary['fetch_s']:.1f}s, DCF {summary['value_s']:.2f}s, write {summary['write_s']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Unit tests for the indicator kernels that replaced pandas
+ema_series and rolling_mean_std against pandas ewm/rolling, including NaN gaps, short
+series and empty input, plus the backtest's handling of missing closes
+"""
+
+import numpy as np
+import pytest
+
+from backtest import STRATEGIES, ema_series, rolling_mean_std, run_backtest
+
+pd = pytest.importorskip("pandas")
+
+
+def random_walk(n, seed=0, gaps=0.0):
+    rng = np.random.default_rng(seed)
+    prices = 100 + np.cumsum(rng.normal(size=n))
+    if gaps:
+        prices[rng.random(n) < gaps] = np.nan
+    return prices
+
+
+def pandas_ema(values, span):
+    return pd.Series(values, dtype=float).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+@pytest.mark.parametrize("span", [20, 50, 200])
+def test_ema_matches_pandas(span):
+    prices = random_walk(5000)
+    np.testing.assert_allclose(ema_series(prices, span), pandas_ema(prices, span), rtol=1e-10)
+
+
+@pytest.mark.parametrize("span", [2, 20, 50])
+def test_ema_matches_pandas_across_nan_gaps(span):
+    prices = random_walk(2000, seed=1, gaps=0.05)
+    prices[:5] = np.nan
+    prices[100:130] = np.nan
+    prices[-3:] = np.nan
+    expected = pandas_ema(prices, span)
+    result = ema_series(prices, span)
+    np.testing.assert_allclose(result, expected, rtol=1e-10)
+    # A gap never pulls the average towards zero
+    assert np.nanmin(result) > np.nanmin(prices) - 1
+
+
+@pytest.mark.parametrize("values", [[], [np.nan], [np.nan, np.nan, np.nan], [42.0], [1.0, 2.0, 3.0]])
+def test_ema_short_and_empty_input(values):
+    values = np.asarray(values, dtype=np.float64)
+    np.testing.assert_allclose(ema_series(values, 20), pandas_ema(values, 20), equal_nan=True)
+
+
+def pandas_rolling(prices, window):
+    frame = pd.DataFrame(prices)
+    return frame.rolling(window).mean().to_numpy(), frame.rolling(window).std().to_numpy()
+
+
+@pytest.mark.parametrize("window", [2, 20, 50])
+def test_rolling_mean_std_matches_pandas(window):
+    prices = np.column_stack([random_walk(1500, seed=s) for s in range(3)])
+    prices[:, 1] += 1e6  # precision with a large level
+    mean, std = rolling_mean_std(prices, window)
+    expected_mean, expected_std = pandas_rolling(prices, window)
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-9)
+    # Running sums lose a few digits on window-2 spreads of a 1e6 level; 1e-10 of the price
+    np.testing.assert_allclose(std, expected_std, rtol=1e-6, atol=1e-4)
+
+
+def test_rolling_windows_with_a_gap_are_nan_like_pandas():
+    prices = np.column_stack([random_walk(300, seed=2, gaps=0.03), np.full(300, np.nan)])
+    prices[:10, 0] = np.nan
+    mean, std = rolling_mean_std(prices, 20)
+    expected_mean, expected_std = pandas_rolling(prices, 20)
+    np.testing.assert_array_equal(np.isnan(mean), np.isnan(expected_mean))
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-9)
+    np.testing.assert_allclose(std, expected_std, rtol=1e-6)
+
+
+@pytest.mark.parametrize("n", [0, 1, 19, 20])
+def test_rolling_short_series(n):
+    prices = random_walk(n)[:, None]
+    mean, std = rolling_mean_std(prices, 20)
+    assert mean.shape == std.shape == (n, 1)
+    assert np.isnan(mean[:19]).all()
+    if n == 20:
+        assert mean[-1, 0] == pytest.approx(prices.mean())
+        assert std[-1, 0] == pytest.approx(prices.std(ddof=1))
+
+
+def test_missing_close_is_carried_not_a_total_loss():
+    closes = random_walk(300, seed=3)
+    gapped = closes.copy()
+    gapped[150] = np.nan
+    results = run_backtest(gapped[:, None], cost_bps=0)
+    hold = results["buy_and_hold"]["total_return"][0]
+    assert hold == pytest.approx(closes[-1] / closes[0] - 1, rel=1e-9)
+    for strategy in STRATEGIES:
+        assert results[strategy]["max_drawdown"][0] > -0.5
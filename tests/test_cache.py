@@ -0,0 +1,142 @@
+"""
+Unit tests for the provider cache
+Byte budget accounting, oversize rejection, W-TinyLFU scan resistance and TTL expiry
+interacting with eviction; run with python -m pytest tests
+"""
+
+import pytest
+
+from provider import cache as cache_module
+from provider.cache import POLICIES, TTLCache
+
+ENTRY_BYTES = 100
+
+
+class FakeClock:
+    """Stand-in for the time module so expiry can be stepped without sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def stored_bytes(cache):
+    return sum(entry[3] for entry in cache._entries.values())
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_size_budget_is_respected(policy):
+    cache = TTLCache(max_bytes=50 * ENTRY_BYTES, policy=policy)
+    for i in range(500):
+        cache.set(("key", i), i, ttl=60, size=ENTRY_BYTES + (i % 7) * 10)
+        if i % 3 == 0:
+            cache.get(("key", i // 2))
+        assert cache.bytes <= cache.max_bytes
+        assert cache.bytes == stored_bytes(cache)
+
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert stats["entries"] == len(cache._entries)
+    # Replacing a key swaps its size instead of adding to it
+    key = next(iter(cache._entries))
+    before = cache.bytes - cache._entries[key][3]
+    cache.set(key, "new", ttl=60, size=ENTRY_BYTES)
+    assert cache.bytes == before + ENTRY_BYTES == stored_bytes(cache)
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_oversize_value_is_returned_but_not_stored(policy):
+    cache = TTLCache(max_bytes=1000, policy=policy)
+    cache.set("small", 1, ttl=60, size=ENTRY_BYTES)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return b"x" * 5000
+
+    assert cache.get_or_load("big", 60, load) == b"x" * 5000
+    assert cache.get_or_load("big", 60, load) == b"x" * 5000
+    assert len(calls) == 2
+    assert cache.get("big") is None
+    assert cache.get("small") == 1
+    assert cache.stats()["rejected"] == 2
+    assert cache.bytes == ENTRY_BYTES
+
+
+def hot_key_misses(policy, scan=5000, every=150):
+    """Misses on one frequently read key while one-off keys stream through a 100-entry cache
+
+    The hot key is read every `every` scan keys, less often than LRU can keep it, and
+    reloaded on a miss. Entries are 4 KB, the size the frequency sketch is scaled for.
+    """
+    size = 4096
+    cache = TTLCache(max_bytes=100 * size, policy=policy)
+    cache.set("hot", "value", ttl=600, size=size)
+    for _ in range(5):
+        cache.get("hot")
+    misses = 0
+    for i in range(scan):
+        if cache.get(("scan", i)) is None:
+            cache.set(("scan", i), i, ttl=600, size=size)
+        if i % every == every - 1 and cache.get("hot") is None:
+            misses += 1
+            cache.set("hot", "value", ttl=600, size=size)
+        assert cache.bytes <= cache.max_bytes
+    return misses
+
+
+def test_frequent_key_survives_scan_under_tinylfu():
+    assert hot_key_misses("tinylfu") == 0
+
+
+def test_scan_flushes_frequent_key_under_lru():
+    # The contrast that makes tinylfu the default
+    assert hot_key_misses("lru") == 5000 // 150
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_expired_entries_free_their_bytes(clock, policy):
+    cache = TTLCache(max_bytes=3 * ENTRY_BYTES, policy=policy)
+    cache.set("short", 1, ttl=10, size=ENTRY_BYTES)
+    cache.set("long", 2, ttl=100, size=ENTRY_BYTES)
+    clock.now += 20
+
+    assert cache.get("short") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.bytes == ENTRY_BYTES
+    # With the expired entry gone, two more fit without evicting the live one
+    cache.set("a", 3, ttl=100, size=ENTRY_BYTES)
+    cache.set("b", 4, ttl=100, size=ENTRY_BYTES)
+    assert cache.stats()["evictions"] == 0
+    assert cache.get("long") == 2
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_eviction_and_stale_window(clock, policy):
+    cache = TTLCache(max_bytes=2 * ENTRY_BYTES, policy=policy)
+    cache.set("stale", 1, ttl=10, size=ENTRY_BYTES, stale_ttl=50)
+    clock.now += 20
+    # Past its TTL but inside the stale window: only stale-tolerant reads see it
+    assert cache.get("stale") is None
+    assert cache.get_stale("stale") == (1, True)
+    clock.now += 60
+    assert cache.get_stale("stale") == (None, False)
+    assert cache.bytes == 0
+
+    # A live entry pushed out by the budget is a miss even though it has not expired
+    cache.set("first", 1, ttl=100, size=ENTRY_BYTES)
+    cache.set("second", 2, ttl=100, size=ENTRY_BYTES)
+    cache.set("third", 3, ttl=100, size=ENTRY_BYTES)
+    present = [key for key in ("first", "second", "third") if cache.get(key) is not None]
+    assert len(present) == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes == 2 * ENTRY_BYTES == stored_bytes(cache)
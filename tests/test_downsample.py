@@ -0,0 +1,90 @@
+"""
+Unit tests for chart downsampling
+LTTB point selection and NaN-aware candlestick bucketing, including gaps, short series
+and empty input
+"""
+
+import numpy as np
+import pytest
+
+from downsample import bucket_bounds, first_valid, last_valid, lttb_indices, minmax_ohlc
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(size=n))
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 500, 1499])
+def test_lttb_keeps_endpoints_and_returns_n_out_increasing_indices(n_out):
+    indices = lttb_indices(random_walk(1500), n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == 1499
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    values = np.zeros(1000)
+    values[437] = 50.0
+    assert 437 in lttb_indices(values, 50)
+
+
+@pytest.mark.parametrize("n, n_out", [(0, 100), (1, 100), (5, 5), (5, 10), (100, 2)])
+def test_lttb_short_series_pass_through(n, n_out):
+    np.testing.assert_array_equal(lttb_indices(random_walk(n), n_out), np.arange(n))
+
+
+def test_lttb_handles_nan_gaps():
+    values = random_walk(1000, seed=1)
+    values[200:260] = np.nan
+    values[-1] = np.nan
+    indices = lttb_indices(values, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    indices = lttb_indices(np.full(1000, np.nan), 100)
+    assert len(indices) == 100 and np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (1000, 7), (1001, 1000), (5, 10), (0, 5)])
+def test_bucket_bounds_cover_every_bar_once(n, n_out):
+    starts, ends = bucket_bounds(n, n_out)
+    assert len(starts) <= max(n_out, 0)
+    covered = np.concatenate([np.arange(s, e + 1) for s, e in zip(starts, ends)]) if n else []
+    np.testing.assert_array_equal(covered, np.arange(n))
+
+
+def test_first_and_last_valid_skip_nan():
+    values = np.array([np.nan, 2.0, 3.0, np.nan, np.nan, np.nan, 7.0, np.nan])
+    starts, ends = np.array([0, 3, 6]), np.array([2, 5, 7])
+    np.testing.assert_array_equal(first_valid(values, starts, ends), [2.0, np.nan, 7.0])
+    np.testing.assert_array_equal(last_valid(values, starts, ends), [3.0, np.nan, 7.0])
+
+
+def test_minmax_ohlc_skips_missing_bars():
+    opens = np.array([np.nan, 11.0, 12.0, 13.0, np.nan, np.nan])
+    highs = np.array([np.nan, 15.0, 14.0, 16.0, np.nan, np.nan])
+    lows = np.array([np.nan, 9.0, 10.0, 8.0, np.nan, np.nan])
+    closes = np.array([np.nan, 12.0, np.nan, 14.0, np.nan, np.nan])
+    starts, ends, o, h, l, c = minmax_ohlc(opens, highs, lows, closes, 3)
+    np.testing.assert_array_equal(starts, [0, 2, 4])
+    np.testing.assert_array_equal(ends, [1, 3, 5])
+    np.testing.assert_array_equal(o, [11.0, 12.0, np.nan])
+    np.testing.assert_array_equal(h, [15.0, 16.0, np.nan])
+    np.testing.assert_array_equal(l, [9.0, 8.0, np.nan])
+    np.testing.assert_array_equal(c, [12.0, 14.0, np.nan])
+
+
+def test_minmax_ohlc_matches_bucketwise_reduction():
+    closes = random_walk(997, seed=2)
+    closes[::13] = np.nan
+    opens, highs, lows = closes - 0.5, closes + 1.0, closes - 1.0
+    starts, ends, o, h, l, c = minmax_ohlc(opens, highs, lows, closes, 40)
+    assert len(starts) == 40
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        bucket = slice(s, e + 1)
+        observed = closes[bucket][~np.isnan(closes[bucket])]
+        assert o[i] == opens[bucket][~np.isnan(opens[bucket])][0]
+        assert h[i] == np.nanmax(highs[bucket])
+        assert l[i] == np.nanmin(lows[bucket])
+        assert c[i] == observed[-1]
@@ -0,0 +1,87 @@
+"""
+Unit tests for the streaming price history decoder
+Chunked decoding against whole-body decoding, null and missing fields, ordering and
+malformed payloads
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from jsonstream import ColumnBuffer, columns_from_body, loads, stream_columns
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def history(n=40, nulls=()):
+    """FMP-shaped body, newest row first, with close set to null on the given day offsets"""
+    rows = []
+    for i in reversed(range(n)):
+        day = np.datetime64("2024-01-01") + i
+        rows.append({"date": str(day), "open": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i,
+                     "close": None if i in nulls else 100.5 + i, "volume": 1000 + i, "label": "x"})
+    return {"symbol": "TEST", "historical": rows}
+
+
+def chunked(body, size):
+    data = json.dumps(body).encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 1 << 20])
+def test_stream_matches_whole_body_for_any_chunking(size):
+    body = history(nulls=(3, 17))
+    streamed = stream_columns(chunked(body, size), FIELDS, capacity=8)
+    whole = columns_from_body(body, FIELDS)
+    assert list(streamed) == ["dates"] + list(FIELDS)
+    np.testing.assert_array_equal(streamed["dates"], whole["dates"])
+    for field in FIELDS:
+        np.testing.assert_array_equal(streamed[field], whole[field])
+
+
+def test_rows_are_returned_oldest_first():
+    series = columns_from_body(history(5), FIELDS)
+    assert series["dates"][0] == np.datetime64("2024-01-01")
+    assert np.all(np.diff(series["dates"]).astype(int) == 1)
+    np.testing.assert_allclose(series["close"], 100.5 + np.arange(5))
+
+
+def test_null_and_missing_values_are_nan_not_zero():
+    body = history(6, nulls=(2,))
+    del body["historical"][0]["volume"]
+    series = columns_from_body(body, FIELDS)
+    assert np.isnan(series["close"][2])
+    assert np.isnan(series["volume"][-1])
+    others = np.delete(series["close"], 2)
+    assert np.all(others > 0)
+
+
+def test_buffer_grows_past_its_capacity():
+    buffer = ColumnBuffer(("close",), capacity=1)
+    rows = history(100)["historical"]
+    buffer.extend(rows[:30])
+    buffer.extend(rows[30:])
+    assert len(buffer.series()["close"]) == 100
+
+
+@pytest.mark.parametrize("body", [{}, {"symbol": "TEST"}, {"historical": []},
+                                  {"Error Message": "Invalid API KEY."}, []])
+def test_bodies_without_rows_give_none(body):
+    assert stream_columns(chunked(body, 5), FIELDS) is None
+    assert columns_from_body(body, FIELDS) is None
+
+
+def test_empty_response_gives_none():
+    assert stream_columns([], FIELDS) is None
+
+
+def test_truncated_array_raises():
+    data = b"".join(chunked(history(10), 50))
+    with pytest.raises(ValueError):
+        stream_columns([data[:len(data) // 2]], FIELDS)
+
+
+def test_loads_accepts_non_strict_json():
+    assert loads(b'{"a": 1}') == {"a": 1}
+    assert np.isnan(loads('{"a": NaN}')["a"])
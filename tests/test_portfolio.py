@@ -0,0 +1,103 @@
+"""
+Unit tests for the portfolio risk kernels
+Pairwise-complete covariance, correlation and beta against pandas, plus alignment and
+forward filling of ragged close series
+"""
+
+import numpy as np
+import pytest
+
+from portfolio import MIN_OVERLAP, align_closes, betas, drawdowns, forward_fill, pairwise_cov
+
+pd = pytest.importorskip("pandas")
+
+
+def ragged_returns(n=600, k=6, seed=0):
+    """Correlated returns with late listings, random gaps and one short-lived column"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, n)
+    returns = market[:, None] * rng.uniform(0.5, 1.5, k) + rng.normal(0, 0.01, (n, k))
+    returns[rng.random((n, k)) < 0.1] = np.nan
+    returns[:200, 1] = np.nan
+    returns[:, 2] = np.nan
+    returns[300:300 + MIN_OVERLAP - 5, 2] = 0.01 * rng.normal(size=MIN_OVERLAP - 5)
+    return returns, market
+
+
+def test_pairwise_cov_matches_pandas():
+    returns, _ = ragged_returns()
+    cov, corr, counts = pairwise_cov(returns)
+    frame = pd.DataFrame(returns)
+    np.testing.assert_allclose(cov, frame.cov(min_periods=2).to_numpy(), rtol=1e-8, atol=1e-15)
+    np.testing.assert_allclose(corr, frame.corr(min_periods=MIN_OVERLAP).to_numpy(), rtol=1e-8, atol=1e-12)
+    observed = (~np.isnan(returns)).astype(int)
+    np.testing.assert_array_equal(counts, observed.T @ observed)
+
+
+def test_correlation_needs_min_overlap():
+    returns, _ = ragged_returns()
+    _, corr, counts = pairwise_cov(returns)
+    assert np.isnan(corr[counts < MIN_OVERLAP]).all()
+    assert np.isnan(corr[2]).all()
+    assert not np.isnan(corr[counts >= MIN_OVERLAP]).any()
+    assert np.all(np.abs(corr[counts >= MIN_OVERLAP]) <= 1.0)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_pairwise_cov_short_input(n):
+    returns = np.arange(n * 3, dtype=np.float64).reshape(n, 3)
+    cov, corr, counts = pairwise_cov(returns)
+    assert cov.shape == corr.shape == counts.shape == (3, 3)
+    assert np.isnan(corr).all()
+    assert np.isnan(cov).all() == (n < 2)
+
+
+def test_betas_match_pairwise_complete_regression():
+    returns, market = ragged_returns(seed=1)
+    market = market.copy()
+    market[::17] = np.nan
+    beta = betas(returns, market)
+    for column in range(returns.shape[1]):
+        pair = pd.DataFrame({"x": returns[:, column], "b": market}).dropna()
+        if len(pair) < MIN_OVERLAP:
+            assert np.isnan(beta[column])
+            continue
+        expected = pair["x"].cov(pair["b"]) / pair["b"].var()
+        assert beta[column] == pytest.approx(expected, rel=1e-9)
+
+
+def test_betas_of_empty_input():
+    assert betas(np.empty((0, 2)), np.empty(0)).shape == (2,)
+    assert np.isnan(betas(np.empty((0, 2)), np.empty(0))).all()
+
+
+def test_forward_fill_keeps_pre_listing_head():
+    matrix = np.array([[1.0, np.nan], [np.nan, np.nan], [3.0, 5.0], [np.nan, np.nan]])
+    np.testing.assert_array_equal(forward_fill(matrix), [[1.0, np.nan], [1.0, np.nan], [3.0, 5.0], [3.0, 5.0]])
+    np.testing.assert_array_equal(forward_fill(matrix), pd.DataFrame(matrix).ffill().to_numpy())
+    assert forward_fill(np.empty((0, 3))).shape == (0, 3)
+
+
+def test_align_closes_unions_dates():
+    day = np.datetime64("2024-01-01")
+    series = {
+        "A": {"dates": day + np.array([0, 1, 3]), "close": np.array([1.0, 2.0, 4.0])},
+        "B": {"dates": day + np.array([1, 2]), "close": np.array([20.0, 30.0])},
+        "C": None,
+        "D": {"dates": np.array([], dtype="datetime64[D]"), "close": np.array([])},
+    }
+    dates, symbols, matrix = align_closes(series)
+    np.testing.assert_array_equal(dates, day + np.arange(4))
+    assert symbols == ["A", "B"]
+    np.testing.assert_array_equal(matrix, [[1.0, np.nan], [2.0, 20.0], [np.nan, 30.0], [4.0, np.nan]])
+    dates, symbols, matrix = align_closes({"C": None})
+    assert len(dates) == 0 and symbols == [] and matrix.shape == (0, 0)
+
+
+def test_drawdowns_ignore_pre_listing_nan():
+    prices = np.array([[np.nan, 10.0], [100.0, 12.0], [50.0, 6.0], [75.0, 12.0]])
+    drawdown, max_drawdown = drawdowns(prices)
+    np.testing.assert_allclose(max_drawdown, [-0.5, -0.5])
+    assert np.isnan(drawdown[0, 0])
+    _, max_drawdown = drawdowns(np.full((3, 1), np.nan))
+    assert np.isnan(max_drawdown).all()
@@ -0,0 +1,82 @@
+"""
+Unit tests for the multi-timeframe resampler
+Weekly and monthly bars against a pandas groupby of the same daily series, with NaN gaps,
+short series and empty input
+"""
+
+import numpy as np
+import pytest
+
+from timeframes import OHLCV_FIELDS, resample_ohlcv, slice_range
+
+pd = pytest.importorskip("pandas")
+
+
+def daily_series(start="2019-12-30", days=900, seed=0, gaps=0.0):
+    """Weekday bars with random NaN fields"""
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days)
+    dates = dates[np.is_busday(dates)]
+    close = 100 + np.cumsum(rng.normal(size=len(dates)))
+    series = {"dates": dates, "open": close - 0.3, "high": close + 1.0, "low": close - 1.0,
+              "close": close.copy(), "volume": rng.integers(1000, 5000, len(dates)).astype(np.float64)}
+    if gaps:
+        for field in OHLCV_FIELDS:
+            series[field][rng.random(len(dates)) < gaps] = np.nan
+    return series
+
+
+def pandas_resample(series, freq):
+    frame = pd.DataFrame({field: series[field] for field in OHLCV_FIELDS}, index=pd.DatetimeIndex(series["dates"]))
+    periods = frame.index.to_period(freq)
+    grouped = frame.groupby(periods, sort=True)
+    return grouped.agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}), \
+        grouped.apply(lambda group: group.index[0]).to_numpy()
+
+
+@pytest.mark.parametrize("interval, freq", [("weekly", "W-SUN"), ("monthly", "M")])
+@pytest.mark.parametrize("gaps", [0.0, 0.1])
+def test_resample_matches_pandas(interval, freq, gaps):
+    series = daily_series(gaps=gaps)
+    # A whole week and a whole month with nothing reported
+    for field in OHLCV_FIELDS:
+        series[field][(series["dates"] >= np.datetime64("2020-03-09")) & (series["dates"] <= np.datetime64("2020-03-13"))] = np.nan
+        series[field][series["dates"].astype("datetime64[M]") == np.datetime64("2021-02")] = np.nan
+    result = resample_ohlcv(series, interval)
+    expected, first_days = pandas_resample(series, freq)
+    np.testing.assert_array_equal(result["dates"], first_days.astype("datetime64[D]"))
+    for field in OHLCV_FIELDS:
+        np.testing.assert_allclose(result[field], expected[field].to_numpy(), rtol=1e-12, err_msg=field)
+    assert np.isnan(result["close"]).any()
+
+
+def test_daily_and_empty_series_pass_through():
+    series = daily_series(days=30)
+    assert resample_ohlcv(series, "daily") is series
+    assert resample_ohlcv(series, "bogus") is series
+    empty = slice_range(series, "2030-01-01")
+    assert all(len(values) == 0 for values in empty.values())
+    assert resample_ohlcv(empty, "weekly") is empty
+
+
+def test_single_bar_and_short_series():
+    single = slice_range(daily_series(days=40), "2020-02-07")
+    for interval in ("weekly", "monthly"):
+        bar = resample_ohlcv(single, interval)
+        assert {field: values.tolist() for field, values in bar.items()} == \
+            {field: values.tolist() for field, values in single.items()}
+
+    series = slice_range(daily_series(days=50), "2020-02-06")
+    weekly = resample_ohlcv(series, "weekly")
+    np.testing.assert_array_equal(weekly["dates"], np.array(["2020-02-06", "2020-02-10", "2020-02-17"],
+                                                            dtype="datetime64[D]"))
+    assert weekly["open"][0] == series["open"][0]
+    assert weekly["close"][-1] == series["close"][-1]
+
+
+def test_slice_range():
+    series = daily_series(days=30)
+    sliced = slice_range(series, "2020-01-04")
+    assert sliced["dates"][0] == np.datetime64("2020-01-06")
+    assert len(sliced["close"]) == len(series["close"]) - 5
+    assert len(slice_range(series, "1970-01-01")["dates"]) == len(series["dates"])
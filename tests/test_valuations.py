@@ -0,0 +1,95 @@
+"""
+Unit tests for the historical DCF
+The stacked per-year DCF against calculate_dcf_valuation run one fiscal year at a time,
+with missing closes, non-positive cash flow, no price history and empty input
+"""
+
+import numpy as np
+import pytest
+
+from valuations import BETA, MARKET_RISK_PREMIUM, RISK_FREE_RATE, calculate_dcf_valuation, historical_dcf
+
+YEARS = ("2019-09-28", "2020-09-26", "2021-09-25", "2022-09-24", "2023-09-30")
+
+
+def statements(fcf=(50e9, 60e9, 90e9, 110e9, 100e9)):
+    cash_flow = [{"date": d, "freeCashFlow": f} for d, f in zip(YEARS, fcf)]
+    income = [{"date": d, "revenue": 250e9 + i * 30e9, "weightedAverageShsOutDil": 18e9 - i * 5e8}
+              for i, d in enumerate(YEARS)]
+    balance = [{"date": d, "totalDebt": 100e9 + i * 5e9, "cashAndCashEquivalents": 40e9 - i * 3e9}
+               for i, d in enumerate(YEARS)]
+    growth = [{"date": d, "revenueGrowth": g} for d, g in zip(YEARS, (-0.02, 0.055, 0.33, 0.08, -0.03))]
+    # FMP returns statements newest first
+    return cash_flow[::-1], income[::-1], balance[::-1], growth[::-1]
+
+
+def daily_prices(start="2019-01-01", end="2024-01-01"):
+    dates = np.arange(np.datetime64(start), np.datetime64(end))
+    return {"dates": dates, "close": 50.0 + 0.1 * np.arange(len(dates))}
+
+
+def year_by_year(cash_flow, income, balance, growth, prices):
+    """calculate_dcf_valuation on each fiscal year alone, using the close on its fiscal date"""
+    results = []
+    for cf, inc, bal, gr in zip(cash_flow[::-1], income[::-1], balance[::-1], growth[::-1]):
+        at = np.searchsorted(prices["dates"], np.datetime64(cf["date"]), side="right") - 1
+        price = prices["close"][at]
+        shares = inc["weightedAverageShsOutDil"]
+        quote = {"price": price, "sharesOutstanding": shares, "marketCap": price * shares}
+        results.append(calculate_dcf_valuation([cf], [inc], [bal], gr, quote))
+    return results
+
+
+def test_each_year_matches_the_single_year_dcf():
+    cash_flow, income, balance, growth = statements()
+    prices = daily_prices()
+    history = historical_dcf(cash_flow, income, balance, growth, prices)
+    assert history["dates"] == list(YEARS)
+    for i, expected in enumerate(year_by_year(cash_flow, income, balance, growth, prices)):
+        assert history["intrinsic_value"][i] == pytest.approx(expected["intrinsic_value"], rel=1e-9)
+        assert history["wacc"][i] == pytest.approx(expected["wacc"], rel=1e-12)
+        assert history["fcf_growth_5yr"][i] == pytest.approx(expected["fcf_growth_5yr"], rel=1e-12)
+        assert history["price"][i] == expected["current_price"]
+        assert history["margin_of_safety"][i] == pytest.approx(expected["margin_of_safety"], rel=1e-9)
+
+
+def test_non_positive_cash_flow_gives_nan():
+    history = historical_dcf(*statements(fcf=(50e9, -1e9, 0.0, 110e9, 100e9)), daily_prices())
+    valid = ~np.isnan(history["intrinsic_value"])
+    np.testing.assert_array_equal(valid, [True, False, False, True, True])
+    assert np.isnan(history["margin_of_safety"][~valid]).all()
+
+
+def test_missing_closes_use_the_last_reported_one():
+    prices = daily_prices()
+    fiscal = np.datetime64(YEARS[2])
+    at = np.searchsorted(prices["dates"], fiscal)
+    prices["close"][at - 3:at + 1] = np.nan
+    history = historical_dcf(*statements(), prices)
+    assert history["price"][2] == prices["close"][at - 4]
+    assert not np.isnan(history["intrinsic_value"]).any()
+
+
+def test_years_before_the_price_history_use_the_cost_of_equity():
+    cost_of_equity = (RISK_FREE_RATE + BETA * MARKET_RISK_PREMIUM) * 100
+    history = historical_dcf(*statements(), daily_prices(start="2022-01-01"))
+    assert np.isnan(history["price"][:3]).all()
+    np.testing.assert_allclose(history["wacc"][:3], cost_of_equity)
+    assert (history["wacc"][3:] < cost_of_equity).all()
+    assert np.isnan(history["margin_of_safety"][:3]).all()
+    assert not np.isnan(history["intrinsic_value"]).any()
+
+    no_prices = historical_dcf(*statements())
+    np.testing.assert_allclose(no_prices["wacc"], cost_of_equity)
+    empty = {"dates": np.array([], dtype="datetime64[D]"), "close": np.array([])}
+    np.testing.assert_allclose(historical_dcf(*statements(), empty)["wacc"], cost_of_equity)
+
+
+def test_unmatched_or_empty_statements_give_none():
+    cash_flow, income, balance, growth = statements()
+    assert historical_dcf([], income, balance, growth) is None
+    assert historical_dcf(None, None, None, None) is None
+    assert historical_dcf(cash_flow, income, [], growth) is None
+    # Growth is optional per year
+    history = historical_dcf(cash_flow, income, balance, [], daily_prices())
+    assert len(history["dates"]) == len(YEARS)